@@ -0,0 +1,295 @@
+"""
+Offline retrieval benchmark: hybrid search (+ optional cross-encoder rerank) without the gateway or Gemini.
+
+1. Snapshot the live collection and embed the labelled queries once (needs Qdrant + the inference service):
+       INFERENCE_API_URL=http://localhost:8001 python benchmark_retrieval.py snapshot --qdrant-url http://localhost:6333
+2. Benchmark against the snapshot, loaded into Qdrant's in-memory mode (or a local instance via --qdrant-url):
+       python benchmark_retrieval.py run --k 5,10,20 --prefetch 1,2,4 --threshold -5,-3,-1
+
+`run` drives the gateway's own HybridRetriever and ContextEvaluator, so results reflect the production code path.
+Reranking calls the inference service (INFERENCE_API_URL); pass --no-rerank to benchmark fused retrieval only.
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import logging
+from typing import Dict, List, Optional
+
+GATEWAY_SRC = os.getenv("GATEWAY_SRC", os.path.join(os.path.dirname(os.path.abspath(__file__)), "../rag_system/api_gateway/src"))
+sys.path.insert(0, GATEWAY_SRC)
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, models
+from core.config import settings
+from integration.qdrant_client import qdrant_client
+from services.hybrid_retriever import HybridRetriever
+from services.context_evaluator import ContextEvaluator
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+# The gateway modules log every search and rerank; keep the benchmark output readable
+for noisy in ("services", "integration"):
+    logging.getLogger(noisy).setLevel(logging.WARNING)
+
+DATA_DIR = os.getenv("BENCHMARK_DATA_DIR", "benchmark_data")
+
+def _read_jsonl(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _write_jsonl(path: str, rows: List[dict]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+# ---------------------------------------------------------------- snapshot
+
+async def snapshot(args):
+    """Exports every point (vectors + payload) and embeds the labelled queries, so `run` needs neither again."""
+    from integration.inference_client import inference_client
+
+    source = AsyncQdrantClient(url=args.qdrant_url)
+    corpus, offset = [], None
+    while True:
+        points, offset = await source.scroll(
+            collection_name=settings.COLLECTION_NAME, limit=256, offset=offset, with_payload=True, with_vectors=True
+        )
+        for point in points:
+            sparse = point.vector["sparse"]
+            corpus.append({
+                "id": str(point.id),
+                "dense": point.vector["dense"],
+                "sparse_idx": list(sparse.indices),
+                "sparse_val": list(sparse.values),
+                "payload": point.payload,
+            })
+        if offset is None:
+            break
+    await source.close()
+    _write_jsonl(os.path.join(args.data_dir, "corpus.jsonl"), corpus)
+    logger.info(f"Snapshotted {len(corpus)} points from '{settings.COLLECTION_NAME}'.")
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    embeddings = await inference_client.get_embeddings([case["query"] for case in cases])
+    queries = [
+        {
+            "id": case["id"],
+            "query": case["query"],
+            "expected_source": case.get("expected_source"),
+            "relevant_ids": case.get("relevant_ids"),
+            "dense": np.asarray(dense).tolist(),
+            "sparse_idx": np.asarray(s_idx).tolist(),
+            "sparse_val": np.asarray(s_val).tolist(),
+        }
+        for case, (dense, s_idx, s_val) in zip(cases, embeddings)
+    ]
+    _write_jsonl(os.path.join(args.data_dir, "queries.jsonl"), queries)
+    logger.info(f"Embedded {len(queries)} labelled queries.")
+
+# ---------------------------------------------------------------- metrics
+
+def _is_relevant(chunk_id: str, source: str, case: dict) -> bool:
+    if case.get("relevant_ids"):
+        return chunk_id in case["relevant_ids"]
+    # Same source-level relevance as evaluate_pipeline.py
+    return case["expected_source"] in source
+
+def score_ranking(ranked: List[tuple], case: dict, k: int, relevant_total: int) -> Dict[str, float]:
+    """Recall@K, MRR and binary-gain nDCG@K for one ranked list of (chunk_id, source_document)."""
+    hits = [_is_relevant(chunk_id, source, case) for chunk_id, source in ranked[:k]]
+    first = next((rank for rank, hit in enumerate(hits) if hit), None)
+    if case.get("relevant_ids"):
+        recall = sum(hits) / len(case["relevant_ids"])
+    else:
+        # A source document spans many chunks; finding any of them counts as recalled
+        recall = 1.0 if first is not None else 0.0
+    dcg = sum(1.0 / math.log2(rank + 2) for rank, hit in enumerate(hits) if hit)
+    idcg = sum(1.0 / math.log2(rank + 2) for rank in range(min(k, relevant_total)))
+    return {
+        "recall": recall,
+        "mrr": 1.0 / (first + 1) if first is not None else 0.0,
+        "ndcg": dcg / idcg if idcg else 0.0,
+    }
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+# ---------------------------------------------------------------- run
+
+async def load_corpus(corpus: List[dict], qdrant_url: Optional[str]):
+    """Points the gateway's Qdrant integration at a fresh collection holding the snapshot."""
+    client = AsyncQdrantClient(url=qdrant_url) if qdrant_url else AsyncQdrantClient(location=":memory:")
+    if await client.collection_exists(settings.COLLECTION_NAME):
+        await client.delete_collection(settings.COLLECTION_NAME)
+    dim = len(corpus[0]["dense"]) if corpus else 1024
+    await client.create_collection(
+        collection_name=settings.COLLECTION_NAME,
+        vectors_config={"dense": models.VectorParams(size=dim, distance=models.Distance.COSINE)},
+        sparse_vectors_config={"sparse": models.SparseVectorParams()},
+    )
+    for start in range(0, len(corpus), 256):
+        await client.upsert(
+            collection_name=settings.COLLECTION_NAME,
+            points=[
+                models.PointStruct(
+                    id=row["id"],
+                    vector={
+                        "dense": row["dense"],
+                        "sparse": models.SparseVector(indices=row["sparse_idx"], values=row["sparse_val"]),
+                    },
+                    payload=row["payload"],
+                )
+                for row in corpus[start:start + 256]
+            ],
+        )
+    qdrant_client.client = client
+
+async def run_configuration(queries: List[dict], rerank: bool, concurrency: int) -> dict:
+    """One pass over every query at the current settings; returns rankings and per-stage latencies."""
+    slots = asyncio.Semaphore(concurrency)
+    rankings, search_ms, rerank_ms, total_ms = {}, [], [], []
+
+    async def run_one(case: dict):
+        async with slots:
+            embedding = (np.asarray(case["dense"], dtype=np.float32), case["sparse_idx"], case["sparse_val"])
+            start = time.perf_counter()
+            chunks = await HybridRetriever.search(embedding)
+            searched = time.perf_counter()
+            fused = [(c.id, c.source_document, None) for c in chunks]
+            reranked = None
+            if rerank:
+                # Threshold filtering is applied per sweep value afterwards (adaptive passes run at their own threshold)
+                ranked_chunks, _ = await ContextEvaluator.evaluate_and_rerank(case["query"], chunks)
+                reranked = [(c.id, c.source_document, c.score) for c in ranked_chunks]
+            done = time.perf_counter()
+            search_ms.append((searched - start) * 1000)
+            rerank_ms.append((done - searched) * 1000)
+            total_ms.append((done - start) * 1000)
+            rankings[case["id"]] = (fused, reranked)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[run_one(case) for case in queries])
+    wall = time.perf_counter() - start
+    return {
+        "rankings": rankings,
+        "search": _percentiles(search_ms),
+        "rerank": _percentiles(rerank_ms),
+        "total": _percentiles(total_ms),
+        "qps": len(queries) / wall if wall else 0.0,
+    }
+
+def summarize(queries: List[dict], rankings: dict, k: int, threshold: Optional[float], relevant_totals: dict) -> dict:
+    """Mean quality over the labelled, in-scope queries. `threshold=None` scores the fused (pre-rerank) order."""
+    scores, returned = [], []
+    for case in queries:
+        fused, reranked = rankings[case["id"]]
+        if threshold is None:
+            ranked = [(cid, src) for cid, src, _ in fused]
+        else:
+            ranked = [(cid, src) for cid, src, score in reranked if score >= threshold]
+        returned.append(len(ranked))
+        if case.get("expected_source") in (None, "None") and not case.get("relevant_ids"):
+            continue
+        scores.append(score_ranking(ranked, case, k, relevant_totals[case["id"]]))
+    mean = lambda key: sum(s[key] for s in scores) / len(scores) if scores else 0.0
+    return {"recall": mean("recall"), "mrr": mean("mrr"), "ndcg": mean("ndcg"), "avg_returned": sum(returned) / len(returned)}
+
+async def run(args):
+    corpus = _read_jsonl(os.path.join(args.data_dir, "corpus.jsonl"))
+    queries = _read_jsonl(os.path.join(args.data_dir, "queries.jsonl"))
+    await load_corpus(corpus, args.qdrant_url)
+    logger.info(f"Loaded {len(corpus)} points and {len(queries)} labelled queries.")
+
+    # Number of relevant chunks per query, for the nDCG ideal ranking
+    relevant_totals = {
+        case["id"]: sum(_is_relevant(row["id"], (row["payload"] or {}).get("source_document", ""), case) for row in corpus)
+        if case.get("expected_source") not in (None, "None") or case.get("relevant_ids") else 0
+        for case in queries
+    }
+
+    ks = [int(v) for v in args.k.split(",")]
+    multipliers = [int(v) for v in args.prefetch.split(",")]
+    thresholds = [float(v) for v in args.threshold.split(",")] if not args.no_rerank else []
+    # Early exit drops the unscored tail; --adaptive measures its recall and latency
+    settings.RERANK_ADAPTIVE = args.adaptive
+    if args.adaptive and thresholds:
+        # Whether early exit fires depends on the threshold, so each swept value gets its own pass
+        passes = [(threshold, [threshold]) for threshold in thresholds]
+        passes[0] = (thresholds[0], [None, thresholds[0]])
+    else:
+        # One pass keeps every score; each swept threshold filters it afterwards
+        passes = [(float("-inf"), [None] + thresholds)]
+
+    rows = []
+    for k in ks:
+        for multiplier in multipliers:
+            settings.RETRIEVAL_K, settings.PREFETCH_MULTIPLIER = k, multiplier
+            for rerank_threshold, swept in passes:
+                settings.RERANK_THRESHOLD = rerank_threshold
+                for _ in range(args.warmup):
+                    await run_configuration(queries, not args.no_rerank, args.concurrency)
+                result = await run_configuration(queries, not args.no_rerank, args.concurrency)
+                for threshold in swept:
+                    rows.append({
+                        "k": k,
+                        "prefetch_multiplier": multiplier,
+                        "rerank_threshold": threshold,
+                        **summarize(queries, result["rankings"], k, threshold, relevant_totals),
+                        "search_ms": result["search"],
+                        "rerank_ms": result["rerank"],
+                        "total_ms": result["total"],
+                        "qps": result["qps"],
+                    })
+
+    header = f"{'K':>4} {'pre':>4} {'thresh':>7} {'Recall':>7} {'MRR':>6} {'nDCG':>6} {'ret':>5} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'QPS':>7}"
+    print("\n" + header)
+    print("-" * len(header))
+    for row in rows:
+        thresh = "fused" if row["rerank_threshold"] is None else f"{row['rerank_threshold']:g}"
+        # Fused rows report search-only latency; reranked rows the full search + rerank path
+        latency = row["search_ms"] if row["rerank_threshold"] is None else row["total_ms"]
+        print(
+            f"{row['k']:>4} {row['prefetch_multiplier']:>4} {thresh:>7} {row['recall']:>7.3f} {row['mrr']:>6.3f} "
+            f"{row['ndcg']:>6.3f} {row['avg_returned']:>5.1f} {latency['p50']:>8.1f} {latency['p95']:>8.1f} "
+            f"{latency['p99']:>8.1f} {row['qps']:>7.1f}"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        logger.info(f"Wrote {len(rows)} result rows to {args.out}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark for the hybrid retriever and reranker.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="Export the live collection and embed the labelled queries.")
+    snap.add_argument("--qdrant-url", default=f"http://{settings.QDRANT_HOST}:{settings.QDRANT_PORT}")
+    snap.add_argument("--queries", default="test_cases.json")
+
+    bench = sub.add_parser("run", help="Benchmark against the snapshot.")
+    bench.add_argument("--qdrant-url", default=None, help="Local Qdrant to load the snapshot into (default: in-memory).")
+    bench.add_argument("--k", default=str(settings.RETRIEVAL_K), help="Comma-separated RETRIEVAL_K values.")
+    bench.add_argument("--prefetch", default=str(settings.PREFETCH_MULTIPLIER), help="Comma-separated prefetch multipliers.")
+    bench.add_argument("--threshold", default=str(settings.RERANK_THRESHOLD), help="Comma-separated RERANK_THRESHOLD values.")
+    bench.add_argument("--no-rerank", action="store_true", help="Skip the cross-encoder (no inference service needed).")
+    bench.add_argument("--adaptive", action="store_true", help="Use adaptive (early-exit) reranking.")
+    bench.add_argument("--concurrency", type=int, default=1)
+    bench.add_argument("--warmup", type=int, default=1, help="Untimed passes per configuration.")
+    bench.add_argument("--out", default=None, help="Write result rows as JSON.")
+
+    args = parser.parse_args()
+    if args.command == "snapshot":
+        asyncio.run(snapshot(args))
+    else:
+        asyncio.run(run(args))
@@ -1,8 +1,9 @@
 import json
 import asyncio
 import httpx
-import time
 import os
+import time
+import random
 import logging
 from pydantic import BaseModel
 from google import genai
@@ -13,8 +14,13 @@ logger = logging.getLogger(__name__)
 
 # Environment Configuration
 API_URL = "http://rag_api:8080/query"
-LOG_FILE = "/app/logs/rag_events.jsonl"
+EVENTS_URL = "http://rag_api:8080/events"
 API_KEY = os.getenv("GEMINI_API_KEY")
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", 4))  # Test cases in flight against the gateway
+JUDGE_RPM = float(os.getenv("JUDGE_RPM", 60))  # Sustained judge calls per minute (token-bucket refill rate)
+JUDGE_BURST = int(os.getenv("JUDGE_BURST", 5))
+JUDGE_MAX_RETRIES = int(os.getenv("JUDGE_MAX_RETRIES", 5))
+RESULTS_FILE = os.getenv("EVAL_RESULTS_FILE", "evaluation_results.jsonl")  # Appended per test case as it finishes
 
 class GenMetrics(BaseModel):
     answer_correctness: float  # 0.0 to 1.0
@@ -22,10 +28,33 @@ class GenMetrics(BaseModel):
     citation_accuracy: float   # 0.0 to 1.0
     reasoning: str
 
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Callers queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
 class Evaluator:
     def __init__(self):
         self.gemini_client = genai.Client(api_key=API_KEY)
         self.http_client = httpx.AsyncClient(timeout=60.0)
+        self.judge_limiter = TokenBucket(rate=JUDGE_RPM / 60.0, capacity=JUDGE_BURST)
 
     async def run_test_case(self, tc: dict) -> dict:
         query = tc["query"]
@@ -38,17 +67,14 @@ class Evaluator:
         response = await self.http_client.post(API_URL, json={"query": query})
         actual_answer = response.text
         
-        # 2. Allow disk I/O to flush the JSONL log from the API Gateway
-        time.sleep(1.5)
-        
-        # 3. Read the exact internal state from the log file
-        log_entry = self._get_latest_log_entry(query)
+        # 2. Fetch the exact internal state for this request (logged before the stream closes, so no waiting)
+        log_entry = await self._get_log_entry(response.headers.get("X-Request-ID"))
         retrieved_chunks = log_entry.get("retrieved_chunks", []) if log_entry else []
         
-        # 4. Calculate Deterministic Retrieval Metrics
+        # 3. Calculate Deterministic Retrieval Metrics
         recall, mrr = self._calculate_retrieval_metrics(retrieved_chunks, expected_source)
         
-        # 5. Calculate Probabilistic Generation Metrics using LLM-as-a-Judge
+        # 4. Calculate Probabilistic Generation Metrics using LLM-as-a-Judge
         gen_metrics = await self._evaluate_generation(query, expected_facts, retrieved_chunks, actual_answer, expected_source)
         
         return {
@@ -62,20 +88,17 @@ class Evaluator:
             "judge_reasoning": gen_metrics.reasoning
         }
 
-    def _get_latest_log_entry(self, query: str):
-        """Reads the shared volume log file backwards to find the telemetry for this query."""
-        if not os.path.exists(LOG_FILE):
+    async def _get_log_entry(self, request_id: str):
+        """Looks up the gateway's telemetry for one request by its X-Request-ID."""
+        if not request_id:
+            logger.error("Gateway response carried no X-Request-ID; retrieval metrics will be empty.")
             return None
-        with open(LOG_FILE, 'r') as f:
-            lines = f.readlines()
-            for line in reversed(lines):
-                try:
-                    data = json.loads(line)
-                    if data.get("query") == query:
-                        return data
-                except json.JSONDecodeError:
-                    continue
-        return None
+        response = await self.http_client.get(f"{EVENTS_URL}/{request_id}")
+        if response.status_code == 404:
+            logger.error(f"No telemetry logged for request {request_id}.")
+            return None
+        response.raise_for_status()
+        return response.json()
 
     def _calculate_retrieval_metrics(self, chunks: list, expected_source: str):
         """Calculates Recall@K and Mean Reciprocal Rank (MRR)."""
@@ -111,20 +134,62 @@ class Evaluator:
         3. citation_accuracy: Did the answer explicitly cite the '{expected_source}' document? (Score 1.0 if cited or if expected_source is 'None' and it declined to answer).
         """
         
-        try:
-            response = await self.gemini_client.aio.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=GenMetrics,
-                    temperature=0.0,
-                ),
+        for attempt in range(JUDGE_MAX_RETRIES + 1):
+            await self.judge_limiter.acquire()
+            try:
+                response = await self.gemini_client.aio.models.generate_content(
+                    model='gemini-2.5-flash',
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        response_mime_type="application/json",
+                        response_schema=GenMetrics,
+                        temperature=0.0,
+                    ),
+                )
+                if response.parsed is None:
+                    raise ValueError("Judge returned no parseable verdict")
+                return response.parsed
+            except Exception as e:
+                if attempt == JUDGE_MAX_RETRIES:
+                    logger.error(f"LLM Judge failed after {attempt + 1} attempts: {e}")
+                    return GenMetrics(answer_correctness=0.0, hallucination_score=0.0, citation_accuracy=0.0, reasoning=f"Error: {e}")
+                # Exponential backoff with jitter (rate-limit errors are the usual cause)
+                delay = min(60.0, 2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"LLM Judge attempt {attempt + 1} failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+async def run_all(evaluator: Evaluator, test_cases: list, concurrency: int) -> list:
+    """Runs up to `concurrency` test cases at once, appending each result to RESULTS_FILE as it lands."""
+    slots = asyncio.Semaphore(concurrency)
+    start = time.monotonic()
+    results, failed = [], 0
+
+    async def run_one(tc: dict):
+        async with slots:
+            return tc, await evaluator.run_test_case(tc)
+
+    with open(RESULTS_FILE, "w") as out:
+        for finished in asyncio.as_completed([run_one(tc) for tc in test_cases]):
+            try:
+                tc, res = await finished
+            except Exception as e:
+                failed += 1
+                logger.error(f"Test case failed: {e}")
+                continue
+            results.append(res)
+            # One line per finished case, so an interrupted run still leaves usable results
+            out.write(json.dumps(res) + "\n")
+            out.flush()
+            done = len(results) + failed
+            logger.info(
+                f"[{done}/{len(test_cases)}] {tc['id']} done in {time.monotonic() - start:.1f}s total "
+                f"(Recall@K {res['recall_at_k']:.2f}, Correctness {res['answer_correctness']:.2f})"
             )
-            return response.parsed
-        except Exception as e:
-            logger.error(f"LLM Judge failed: {e}")
-            return GenMetrics(answer_correctness=0.0, hallucination_score=0.0, citation_accuracy=0.0, reasoning=f"Error: {e}")
+
+    logger.info(f"Evaluated {len(results)} test cases ({failed} failed) in {time.monotonic() - start:.1f}s with concurrency {concurrency}.")
+    # Report in test-case order, not completion order
+    order = {tc["id"]: i for i, tc in enumerate(test_cases)}
+    return sorted(results, key=lambda r: order[r["test_id"]])
 
 async def main():
     logger.info("Initializing Evaluation Pipeline...")
@@ -132,13 +197,12 @@ async def main():
         test_cases = json.load(f)
         
     evaluator = Evaluator()
-    results = []
-    
-    for tc in test_cases:
-        res = await evaluator.run_test_case(tc)
-        results.append(res)
+    results = await run_all(evaluator, test_cases, EVAL_CONCURRENCY)
         
     await evaluator.http_client.aclose()
+    if not results:
+        logger.error("No test case completed; nothing to report.")
+        return
     
     # Print Beautiful Summary
     print("\n" + "="*80)
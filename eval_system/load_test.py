@@ -0,0 +1,382 @@
+"""
+Load generator for the streaming /query endpoint.
+
+Measures TTFT, inter-token latency, total stream time, error rate and throughput per load level,
+in closed-loop (fixed concurrency) or open-loop (Poisson arrivals at a fixed rate) mode.
+
+Against a running gateway:
+    python load_test.py run --url http://localhost:8080/query --mode closed --levels 1,8,32,64 --duration 30
+
+Fully offline, against the real gateway app with Gemini, the inference service and Qdrant mocked
+at fixed latencies (isolates the gateway's own overhead):
+    python load_test.py run --spawn-mock --mode open --levels 5,10,20,40 --duration 30
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import logging
+import subprocess
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+import httpx
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)  # One line per request otherwise
+
+GATEWAY_SRC = os.getenv("GATEWAY_SRC", os.path.join(os.path.dirname(os.path.abspath(__file__)), "../rag_system/api_gateway/src"))
+TTFT_SLO_S = 3.0
+
+# ---------------------------------------------------------------- mock gateway
+
+def mock_inference_app(embed_ms: float, rerank_ms: float, dim: int):
+    """Stand-in for the inference service: deterministic vectors per text, random rerank scores."""
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    def embed(text: str) -> dict:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        rng = np.random.default_rng(seed)
+        dense = rng.normal(size=dim).astype(np.float32)
+        return {
+            "dense_vector": (dense / np.linalg.norm(dense)).tolist(),
+            "sparse_indices": rng.integers(0, 250000, size=16).tolist(),
+            "sparse_values": rng.random(16).tolist(),
+        }
+
+    @app.post("/embed")
+    async def embed_one(request: dict):
+        await asyncio.sleep(embed_ms / 1000)
+        return embed(request["text"])
+
+    @app.post("/embed/batch")
+    async def embed_batch(request: dict):
+        await asyncio.sleep(embed_ms / 1000)
+        return {"embeddings": [embed(text) for text in request["texts"]]}
+
+    @app.post("/rerank")
+    async def rerank(request: dict):
+        await asyncio.sleep(rerank_ms / 1000)
+        return {"scores": [random.uniform(-2.0, 6.0) for _ in request["documents"]]}
+
+    @app.post("/rerank/batch")
+    async def rerank_batch(request: dict):
+        await asyncio.sleep(rerank_ms / 1000)
+        return {"results": [{"scores": [random.uniform(-2.0, 6.0) for _ in g["documents"]]} for g in request["groups"]]}
+
+    return app
+
+class MockQdrant:
+    """Stand-in for AsyncQdrantClient: returns a fixed set of chunks after a fixed delay."""
+
+    def __init__(self, search_ms: float, num_chunks: int = 20):
+        from qdrant_client import models
+
+        self.search_ms = search_ms
+        self._points = [
+            models.ScoredPoint(
+                id=f"00000000-0000-0000-0000-{i:012d}",
+                version=0,
+                score=1.0 / (i + 1),
+                payload={
+                    "raw_content": f"Policy text {i}. " * 40,
+                    "source_document": f"Policy {i % 5}.pdf",
+                    "section_header": f"Section {i}",
+                    "page_number": i + 1,
+                    "section_id": 0,
+                    "chunk_index": i + 1,
+                },
+            )
+            for i in range(num_chunks)
+        ]
+
+    async def query_points(self, limit: int = 10, **kwargs):
+        await asyncio.sleep(self.search_ms / 1000)
+        return SimpleNamespace(points=self._points[:limit])
+
+    async def query_batch_points(self, requests, **kwargs):
+        # One round trip for every sub-query, as against the real server
+        await asyncio.sleep(self.search_ms / 1000)
+        return [SimpleNamespace(points=self._points[:request.limit]) for request in requests]
+
+    async def scroll(self, scroll_filter=None, limit: int = 10, **kwargs):
+        """Neighbour expansion: any stored chunk the filter doesn't exclude, up to the limit."""
+        from qdrant_client import models
+
+        await asyncio.sleep(self.search_ms / 1000)
+        excluded = set()
+        for condition in (scroll_filter.must_not or []) if scroll_filter else []:
+            excluded.update(str(point_id) for point_id in getattr(condition, "has_id", None) or [])
+        records = [
+            models.Record(id=point.id, payload=point.payload)
+            for point in self._points if str(point.id) not in excluded
+        ]
+        return records[:limit], None
+
+    async def retrieve(self, ids, **kwargs):
+        from qdrant_client import models
+
+        return [models.Record(id=point_id) for point_id in ids]
+
+    async def close(self):
+        pass
+
+def serve_mock_gateway(args):
+    """Runs the real gateway app in this process with every external dependency mocked."""
+    # The gateway reads its settings at import time
+    os.environ.setdefault("GEMINI_API_KEY", "mock")
+    os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+    os.environ.setdefault("ROUTER_LOCAL_ENABLED", "false")
+    log_dir = os.path.abspath(args.log_dir)
+    os.environ.setdefault("EVENT_LOG_PATH", os.path.join(log_dir, "rag_events.jsonl"))
+    os.environ.setdefault("EVENT_INDEX_PATH", os.path.join(log_dir, "rag_events_index.db"))
+    os.environ.setdefault("ROUTER_MODEL_PATH", os.path.join(log_dir, "router_centroids.json"))
+    sys.path.insert(0, GATEWAY_SRC)
+
+    import uvicorn
+    from dto.response import RoutingDecision
+    from integration.gemini_client import gemini_client
+    from integration.inference_client import inference_client
+    from integration.qdrant_client import qdrant_client
+    from services.query_decomposer import QueryDecomposer
+    from main import app
+
+    async def route_query(query: str) -> RoutingDecision:
+        await asyncio.sleep(args.route_ms / 1000)
+        # Comparison questions take the decomposed retrieval path, as the real router would send them
+        query_type = "comparative" if QueryDecomposer.decompose(query) else "factual"
+        return RoutingDecision(query_type=query_type, reasoning="Mock router.")
+
+    async def stream_generation(prompt: str):
+        await asyncio.sleep(args.first_token_ms / 1000)
+        for i in range(args.tokens):
+            if i:
+                await asyncio.sleep(args.token_interval_ms / 1000)
+            yield f"token{i} "
+
+    gemini_client.route_query = route_query
+    gemini_client.stream_generation = stream_generation
+    inference_client.client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=mock_inference_app(args.embed_ms, args.rerank_ms, args.dim)),
+        base_url="http://mock-inference",
+    )
+    qdrant_client.client = MockQdrant(args.search_ms)
+
+    logger.info(f"Mock gateway listening on :{args.port}")
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+# ---------------------------------------------------------------- load generator
+
+class LevelStats:
+    def __init__(self):
+        self.ttft: List[float] = []
+        self.itl: List[float] = []
+        self.total: List[float] = []
+        self.errors = 0
+        self.completed = 0
+
+def _pct(samples: List[float], q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else float("nan")
+
+async def one_request(client: httpx.AsyncClient, url: str, query: str, stats: LevelStats):
+    start = time.perf_counter()
+    last = None
+    try:
+        async with client.stream("POST", url, json={"query": query}) as response:
+            if response.status_code != 200:
+                stats.errors += 1
+                return
+            async for chunk in response.aiter_text():
+                if not chunk:
+                    continue
+                now = time.perf_counter()
+                if last is None:
+                    stats.ttft.append(now - start)
+                else:
+                    stats.itl.append(now - last)
+                last = now
+    except Exception as e:
+        logger.debug(f"Request failed: {e}")
+        stats.errors += 1
+        return
+    if last is None:
+        stats.errors += 1  # Closed without a single token
+        return
+    stats.total.append(time.perf_counter() - start)
+    stats.completed += 1
+
+class QueryPool:
+    """Cycles through the test-case queries; a counter suffix keeps every request a cache miss by default."""
+
+    def __init__(self, path: str, unique: bool):
+        with open(path, "r", encoding="utf-8") as f:
+            self.queries = [tc["query"] for tc in json.load(f)]
+        self.unique = unique
+        self.count = 0
+
+    def next(self) -> str:
+        query = self.queries[self.count % len(self.queries)]
+        self.count += 1
+        return f"{query} (load test request {self.count})" if self.unique else query
+
+async def run_closed(client, url, pool: QueryPool, concurrency: int, duration: float) -> LevelStats:
+    """`concurrency` users, each sending its next request as soon as the previous stream ends."""
+    stats = LevelStats()
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            await one_request(client, url, pool.next(), stats)
+
+    await asyncio.gather(*[user() for _ in range(concurrency)])
+    return stats
+
+async def run_open(client, url, pool: QueryPool, rate: float, duration: float) -> LevelStats:
+    """Poisson arrivals at `rate` requests/s, independent of how fast responses come back."""
+    stats = LevelStats()
+    tasks = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        tasks.append(asyncio.create_task(one_request(client, url, pool.next(), stats)))
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return stats
+
+def report(mode: str, rows: List[dict]):
+    unit = "users" if mode == "closed" else "req/s"
+    header = (
+        f"{unit:>6} {'done':>6} {'err%':>6} {'thr/s':>7} {'TTFT p50':>9} {'p95':>7} {'p99':>7} "
+        f"{'ITL p50':>8} {'p95':>7} {'total p50':>10} {'p95':>7} {'TTFT<3s':>8}"
+    )
+    print("\n" + header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['level']:>6g} {r['completed']:>6} {r['error_rate'] * 100:>6.1f} {r['throughput']:>7.2f} "
+            f"{r['ttft_p50']:>9.3f} {r['ttft_p95']:>7.3f} {r['ttft_p99']:>7.3f} "
+            f"{r['itl_p50'] * 1000:>7.1f}m {r['itl_p95'] * 1000:>6.1f}m "
+            f"{r['total_p50']:>10.3f} {r['total_p95']:>7.3f} {r['ttft_slo'] * 100:>7.1f}%"
+        )
+
+    # Saturation: the first level where more offered load stops buying meaningfully more throughput
+    saturated = None
+    for prev, cur in zip(rows, rows[1:]):
+        if cur["throughput"] < prev["throughput"] * 1.1:
+            saturated = prev
+            break
+    if saturated:
+        print(f"\nThroughput saturates around {saturated['level']:g} {unit} (~{saturated['throughput']:.2f} completed req/s).")
+    else:
+        print("\nThroughput was still scaling at the highest level tested.")
+
+async def run_load(args):
+    levels = [float(v) for v in args.levels.split(",")]
+    pool = QueryPool(args.queries, unique=not args.repeat_queries)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    rows = []
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        for level in levels:
+            logger.info(f"{args.mode}-loop level {level:g} for {args.duration:.0f}s...")
+            start = time.perf_counter()
+            if args.mode == "closed":
+                stats = await run_closed(client, args.url, pool, int(level), args.duration)
+            else:
+                stats = await run_open(client, args.url, pool, level, args.duration)
+            elapsed = time.perf_counter() - start
+            attempted = stats.completed + stats.errors
+            rows.append({
+                "level": level,
+                "completed": stats.completed,
+                "errors": stats.errors,
+                "error_rate": stats.errors / attempted if attempted else 0.0,
+                "throughput": stats.completed / elapsed,
+                "ttft_p50": _pct(stats.ttft, 50), "ttft_p95": _pct(stats.ttft, 95), "ttft_p99": _pct(stats.ttft, 99),
+                "itl_p50": _pct(stats.itl, 50), "itl_p95": _pct(stats.itl, 95),
+                "total_p50": _pct(stats.total, 50), "total_p95": _pct(stats.total, 95),
+                "ttft_slo": sum(t < TTFT_SLO_S for t in stats.ttft) / attempted if attempted else 0.0,
+            })
+            if args.pause:
+                await asyncio.sleep(args.pause)
+
+    report(args.mode, rows)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        logger.info(f"Wrote {len(rows)} levels to {args.out}.")
+
+def spawn_mock_gateway(args) -> subprocess.Popen:
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "mock-gateway", "--port", str(args.mock_port),
+        "--route-ms", str(args.route_ms), "--embed-ms", str(args.embed_ms), "--search-ms", str(args.search_ms),
+        "--rerank-ms", str(args.rerank_ms), "--first-token-ms", str(args.first_token_ms),
+        "--token-interval-ms", str(args.token_interval_ms), "--tokens", str(args.tokens),
+    ]
+    process = subprocess.Popen(cmd)
+    health = f"http://127.0.0.1:{args.mock_port}/health"
+    for _ in range(100):
+        try:
+            if httpx.get(health, timeout=1.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None:
+            raise RuntimeError("Mock gateway exited during startup")
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Mock gateway did not become healthy")
+
+def _add_mock_args(parser):
+    parser.add_argument("--route-ms", type=float, default=300)
+    parser.add_argument("--embed-ms", type=float, default=30)
+    parser.add_argument("--search-ms", type=float, default=15)
+    parser.add_argument("--rerank-ms", type=float, default=80)
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--token-interval-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=60)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for the /query SSE endpoint.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Generate load and report per-level latency and throughput.")
+    run.add_argument("--url", default="http://localhost:8080/query")
+    run.add_argument("--mode", choices=["closed", "open"], default="closed")
+    run.add_argument("--levels", default="1,4,16,64", help="Concurrent users (closed) or arrival rates in req/s (open).")
+    run.add_argument("--duration", type=float, default=30.0, help="Seconds per level.")
+    run.add_argument("--pause", type=float, default=2.0, help="Seconds between levels.")
+    run.add_argument("--timeout", type=float, default=120.0)
+    run.add_argument("--queries", default="test_cases.json")
+    run.add_argument("--repeat-queries", action="store_true", help="Reuse exact queries so gateway caches can hit.")
+    run.add_argument("--out", default=None, help="Write per-level results as JSON.")
+    run.add_argument("--spawn-mock", action="store_true", help="Start a mock gateway subprocess and target it.")
+    run.add_argument("--mock-port", type=int, default=18080)
+    _add_mock_args(run)
+
+    mock = sub.add_parser("mock-gateway", help="Serve the gateway with Gemini, inference and Qdrant mocked.")
+    mock.add_argument("--port", type=int, default=18080)
+    mock.add_argument("--log-dir", default="load_test_logs")
+    mock.add_argument("--dim", type=int, default=1024)
+    _add_mock_args(mock)
+
+    args = parser.parse_args()
+    if args.command == "mock-gateway":
+        serve_mock_gateway(args)
+    else:
+        process = None
+        if args.spawn_mock:
+            process = spawn_mock_gateway(args)
+            args.url = f"http://127.0.0.1:{args.mock_port}/query"
+        try:
+            asyncio.run(run_load(args))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
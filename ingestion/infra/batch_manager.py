@@ -0,0 +1,119 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from infra.job_store import JobStore
+from infra.ingest_runner import ingest_file
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))  # Each worker process holds its own BGE-M3 copy
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", 3))  # Worker crashes tolerated per document before it is failed
+
+class BatchIngestionManager:
+    """
+    Dispatches queued ingestion jobs from the durable JobStore onto a process pool.
+
+    At most INGEST_WORKERS documents are in flight; the rest stay 'queued' in SQLite, so a
+    crashed or restarted service picks up exactly where it stopped.
+    """
+
+    def __init__(self, collection_name: str, store: JobStore, workers: int = INGEST_WORKERS):
+        self.collection_name = collection_name
+        self.store = store
+        self.workers = max(1, workers)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.Semaphore(self.workers)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            logger.info(f"Resuming {requeued} interrupted ingestion job(s).")
+
+        self._pool = self._new_pool()
+        self._thread = threading.Thread(target=self._dispatch_loop, name="ingest-dispatcher", daemon=True)
+        self._thread.start()
+        self._wakeup.set()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # 'spawn' keeps worker processes clean of the parent's threads and client connections
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _replace_broken_pool(self, broken: ProcessPoolExecutor):
+        """A dead worker breaks the whole executor; the first job to notice swaps in a fresh one."""
+        with self._pool_lock:
+            if self._pool is not broken or self._stopped.is_set():
+                return
+            logger.error("An ingestion worker process died; restarting the worker pool.")
+            self._pool = self._new_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _retry(self, job_id: int, error: BaseException):
+        if self.store.retry_or_fail(job_id, f"Worker process crashed: {error}", INGEST_MAX_ATTEMPTS):
+            logger.warning(f"Ingestion job {job_id} lost its worker; requeued.")
+        else:
+            logger.error(f"Ingestion job {job_id} lost its worker {INGEST_MAX_ATTEMPTS} times; giving up.")
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def enqueue(self, file_paths: list[str]) -> str:
+        batch_id = self.store.create_batch(file_paths)
+        logger.info(f"Queued batch {batch_id} with {len(file_paths)} document(s).")
+        self._wakeup.set()
+        return batch_id
+
+    def _dispatch_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            while not self._stopped.is_set():
+                self._slots.acquire()
+                job = self.store.claim_next()
+                if job is None:
+                    self._slots.release()
+                    break
+
+                logger.info(f"Dispatching job {job['id']}: {os.path.basename(job['file_path'])}")
+                pool = self._pool
+                try:
+                    future = pool.submit(ingest_file, job["file_path"], self.collection_name)
+                except BrokenProcessPool as e:
+                    self._retry(job["id"], e)
+                    self._replace_broken_pool(pool)
+                    self._slots.release()
+                    continue
+                future.add_done_callback(lambda f, job_id=job["id"], pool=pool: self._on_done(job_id, pool, f))
+
+    def _on_done(self, job_id: int, pool: ProcessPoolExecutor, future: Future):
+        try:
+            if future.cancelled():
+                if not self._stopped.is_set():
+                    # Cancelled by a pool restart rather than shutdown
+                    self._retry(job_id, BrokenProcessPool("pool restarted"))
+                return  # On shutdown: left 'running'; requeued on next start
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                # Every job in flight on the pool fails with this, not only the one whose worker died
+                self._retry(job_id, error)
+                self._replace_broken_pool(pool)
+            elif error is not None:
+                logger.error(f"Ingestion job {job_id} failed: {error}")
+                self.store.fail(job_id, str(error))
+            else:
+                result = future.result()
+                self.store.complete(job_id, result.get("chunks_upserted", 0), result.get("llm_calls", 0))
+        finally:
+            self._slots.release()
+            self._wakeup.set()
@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.getenv("INGEST_CACHE_PATH", "/app/state/ingest_cache.db")
+CACHE_MAX_MB = int(os.getenv("INGEST_CACHE_MAX_MB", 2048))
+# Offline mode: cache misses for remote steps (Unstructured, Gemini) raise instead of calling the API
+OFFLINE = os.getenv("INGEST_OFFLINE", "false").lower() == "true"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries(last_access);
+-- Running SUM(size), kept in step by triggers in the same transaction as every write
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta (name, value) SELECT 'total_size', COALESCE(SUM(size), 0) FROM entries;
+CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries BEGIN
+    UPDATE meta SET value = value + NEW.size WHERE name = 'total_size';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE meta SET value = value + NEW.size - OLD.size WHERE name = 'total_size';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries BEGIN
+    UPDATE meta SET value = value - OLD.size WHERE name = 'total_size';
+END;
+"""
+
+class CacheMiss(Exception):
+    pass
+
+def make_key(*parts: Any) -> str:
+    """Stable SHA-256 key over arbitrary JSON-serializable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class DiskCache:
+    """
+    Size-bounded persistent cache (SQLite) shared by all ingestion workers.
+
+    Values are JSON-encoded and zlib-compressed. When the total stored size exceeds
+    `max_bytes`, least-recently-used entries are evicted. Namespaces allow targeted
+    invalidation (e.g. drop all summaries after a prompt change).
+    """
+
+    def __init__(self, db_path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_MB * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # One transaction, so the initial total and the triggers can't miss a concurrent write
+            conn.executescript(f"BEGIN IMMEDIATE;{_SCHEMA}COMMIT;")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value FROM entries WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?", (time.time(), namespace, key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, namespace: str, key: str, value: Any):
+        blob = zlib.compress(json.dumps(value).encode("utf-8"))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete doesn't fire the size trigger
+            conn.execute(
+                "INSERT INTO entries (namespace, key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "created_at = excluded.created_at, last_access = excluded.last_access",
+                (namespace, key, blob, len(blob), now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for namespace, key, size in conn.execute("SELECT namespace, key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            total -= size
+            evicted += 1
+        logger.info(f"Ingestion cache evicted {evicted} entries (now {total / 1e6:.1f} MB).")
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """Drops one namespace, or everything when no namespace is given."""
+        with self._lock, self._connect() as conn:
+            if namespace is None:
+                removed = conn.execute("DELETE FROM entries").rowcount
+            else:
+                removed = conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,)).rowcount
+        with self._connect() as conn:
+            conn.execute("VACUUM")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY namespace").fetchall()
+        return {
+            "max_bytes": self.max_bytes,
+            "offline": OFFLINE,
+            "namespaces": {ns: {"entries": count, "bytes": size} for ns, count, size in rows},
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> DiskCache:
+    """Lazily opens the process-wide cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache()
+    return _cache
@@ -0,0 +1,25 @@
+import hashlib
+import uuid
+
+# Fixed namespace so point IDs are stable across runs and machines
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2b7e-3d4a-5e8f-9a0b-1c2d3e4f5a6b")
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_content_hash(content_type: str, raw_content: str) -> str:
+    """Hash of everything that determines a chunk's vectors (embed text is derived from these)."""
+    return hashlib.sha256(f"{content_type}\x00{raw_content}".encode("utf-8")).hexdigest()
+
+def chunk_point_id(source_document: str, content_hash: str, occurrence: int) -> str:
+    """
+    Deterministic Qdrant point ID for a chunk.
+
+    Keyed on the document identity rather than the file bytes, so chunks that survive a policy
+    revision keep their ID. `occurrence` disambiguates identical chunks repeated within one document.
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{source_document}\x00{content_hash}\x00{occurrence}"))
@@ -0,0 +1,133 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# This module is duplicated in ingestion/infra/ and inference_service/src/services/ (separate build
+# contexts) and both open the same file. Keep the copies identical and bump SCHEMA_VERSION on any
+# change to the schema, keying or stored values: a store written by another version is not reused.
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    dense BLOB NOT NULL,
+    sparse_idx BLOB NOT NULL,
+    sparse_val BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_created ON embeddings(created_at);
+"""
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys only (NFKC, trimmed, single-spaced); the original text is encoded."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def embedding_key(model_id: str, text: str) -> str:
+    return hashlib.sha256(f"{model_id}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
+    """Persistent (SQLite) embedding tier keyed on model ID + normalized text."""
+
+    def __init__(self, db_path: str, model_id: str, max_entries: int):
+        self.db_path = db_path
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inserts_since_prune = 0
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._check_version(conn)
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _check_version(self, conn: sqlite3.Connection):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"store has schema v{version} but this embedding_store.py is v{SCHEMA_VERSION}; "
+                "the ingestion and inference copies have drifted apart"
+            )
+        has_table = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'embeddings'").fetchone()
+        if version < SCHEMA_VERSION and has_table:
+            logger.warning(f"Embedding store {self.db_path} has schema v{version} (expected v{SCHEMA_VERSION}); discarding its entries.")
+            conn.execute("DROP TABLE embeddings")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_many(self, texts: Sequence[str]) -> Dict[int, Tuple[np.ndarray, List[int], List[float]]]:
+        """Returns {position: (dense, sparse_indices, sparse_values)} for every text found."""
+        keys = [embedding_key(self.model_id, text) for text in texts]
+        found = {}
+        with self._lock, self._connect() as conn:
+            # Chunked to stay under SQLite's host-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, dense, s_idx, s_val in conn.execute(
+                    f"SELECT key, dense, sparse_idx, sparse_val FROM embeddings WHERE key IN ({placeholders})", chunk
+                ):
+                    found[key] = (
+                        np.frombuffer(dense, dtype="<f4"),
+                        np.frombuffer(s_idx, dtype="<u4").tolist(),
+                        np.frombuffer(s_val, dtype="<f4").tolist(),
+                    )
+        return {i: found[key] for i, key in enumerate(keys) if key in found}
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence[Tuple[np.ndarray, Sequence[int], Sequence[float]]]):
+        now = time.time()
+        rows = [
+            (
+                embedding_key(self.model_id, text),
+                self.model_id,
+                np.asarray(dense, dtype="<f4").tobytes(),
+                np.asarray(s_idx, dtype="<u4").tobytes(),
+                np.asarray(s_val, dtype="<f4").tobytes(),
+                now,
+            )
+            for text, (dense, s_idx, s_val) in zip(texts, embeddings)
+        ]
+        if not rows:
+            return
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._inserts_since_prune += len(rows)
+            if self._inserts_since_prune >= 1000:
+                self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection):
+        self._inserts_since_prune = 0
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY created_at LIMIT ?)", (excess,)
+            )
+            logger.info(f"Embedding store pruned {excess} oldest entries.")
+
+def open_store(db_path: Optional[str], model_id: str, max_entries: int) -> Optional[EmbeddingStore]:
+    """Opens the persistent tier, or returns None when it's disabled or unavailable."""
+    if not db_path:
+        return None
+    try:
+        return EmbeddingStore(db_path, model_id, max_entries)
+    except Exception as e:
+        logger.error(f"Embedding store unavailable at {db_path}: {e}")
+        return None
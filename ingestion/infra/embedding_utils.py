@@ -1,10 +1,29 @@
 from FlagEmbedding import BGEM3FlagModel
+import os
 import logging
 
+from infra.embedding_store import normalize_text, open_store
+
 logger = logging.getLogger(__name__)
 
+MODEL_ID = 'BAAI/bge-m3'
+
+# Persistent embedding tier shared with the inference service (same file format and keys)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "/app/embedding_cache/bge_m3.db")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500000))
+
 # Global variable to hold the model singleton
 _model = None
+_store = None
+_store_opened = False
+
+def get_store():
+    """Lazily opens the persistent embedding store (None if disabled or unavailable)."""
+    global _store, _store_opened
+    if not _store_opened:
+        _store = open_store(EMBEDDING_CACHE_PATH, MODEL_ID, EMBEDDING_CACHE_MAX_ENTRIES)
+        _store_opened = True
+    return _store
 
 def get_model():
     """Lazy loads the model only when first requested."""
@@ -12,21 +31,50 @@ def get_model():
     if _model is None:
         logger.info("Downloading/Loading BGE-M3 model weights... (This may take a few minutes on the first run)")
         # use_fp16=False ensures compatibility for CPU execution
-        _model = BGEM3FlagModel('BAAI/bge-m3', use_fp16=False)
+        _model = BGEM3FlagModel(MODEL_ID, use_fp16=False)
         logger.info("BGE-M3 loaded successfully.")
     return _model
 
 def get_bge_m3_embeddings(text: str):
     """Generates Dense (1024d) and Sparse (Lexical) embeddings in a single pass."""
-    model = get_model()
-    
-    output = model.encode([text], return_dense=True, return_sparse=True, return_colbert_vecs=False)
-    
-    dense_vec = output['dense_vecs'][0].tolist()
-    lexical_weights = output['lexical_weights'][0]
-    
-    # Qdrant requires sparse indices to be integers and values to be floats
-    sparse_indices = [int(k) for k in lexical_weights.keys()]
-    sparse_values = [float(v) for v in lexical_weights.values()]
-    
-    return dense_vec, sparse_indices, sparse_values
+    return get_bge_m3_embeddings_batch([text])[0]
+
+def get_bge_m3_embeddings_batch(texts: list[str]):
+    """
+    Embeds many texts, reusing stored embeddings for repeated text (e.g. boilerplate shared
+    across policies) and encoding the rest in one padded forward pass.
+    Returns a (dense, sparse_indices, sparse_values) tuple per text.
+    """
+    if not texts:
+        return []
+
+    # Normalized text is only the lookup key; the model always sees the original text
+    keys = [normalize_text(text) for text in texts]
+    store = get_store()
+    results = {i: (dense.tolist(), s_idx, s_val) for i, (dense, s_idx, s_val) in (store.get_many(keys) if store else {}).items()}
+
+    pending: dict[str, list[int]] = {}
+    for i, key in enumerate(keys):
+        if i not in results:
+            pending.setdefault(key, []).append(i)
+
+    if pending:
+        unique_keys = list(pending)
+        unique_texts = [texts[pending[key][0]] for key in unique_keys]
+        model = get_model()
+        output = model.encode(unique_texts, batch_size=len(unique_texts), return_dense=True, return_sparse=True, return_colbert_vecs=False)
+
+        encoded = []
+        for dense_vec, lexical_weights in zip(output['dense_vecs'], output['lexical_weights']):
+            sparse_indices = [int(k) for k in lexical_weights.keys()]
+            sparse_values = [float(v) for v in lexical_weights.values()]
+            encoded.append((dense_vec.tolist(), sparse_indices, sparse_values))
+
+        if store:
+            store.put_many(unique_keys, encoded)
+        for key, embedding in zip(unique_keys, encoded):
+            for i in pending[key]:
+                results[i] = embedding
+
+    logger.info(f"Embedded {len(texts)} chunks ({len(texts) - sum(len(v) for v in pending.values())} from the embedding store).")
+    return [results[i] for i in range(len(texts))]
@@ -0,0 +1,81 @@
+import os
+import logging
+from typing import Iterator
+
+from infra.partition_utils import partition_document
+from infra.pipeline import IngestionPipeline
+from infra.content_hash import file_sha256
+from infra.qdrant_utils import get_document_points, delete_points, mark_document_complete
+
+logger = logging.getLogger(__name__)
+
+def run_ingestion(file_path: str, collection_name: str, force: bool = False) -> Iterator[dict]:
+    """
+    Parses, chunks, embeds and stores one document, yielding NDJSON-ready progress events.
+
+    Re-ingestion is incremental: an unchanged file whose last ingestion completed is skipped outright,
+    and for a changed (or partially ingested) file only chunks whose content hash is new are
+    summarized/embedded; stale points are deleted.
+    `force` re-embeds every chunk regardless.
+    """
+    file_name = os.path.basename(file_path)
+    logger.info(f"Starting API ingestion for {file_name}")
+    yield {"status": "init", "message": f"Starting {file_name}..."}
+
+    doc_hash = file_sha256(file_path)
+    existing = get_document_points(collection_name, file_name)
+
+    if existing and not force and all(h == doc_hash for h in existing.values()):
+        logger.info(f"{file_name} is unchanged ({len(existing)} chunks stored); skipping.")
+        yield {
+            "status": "success",
+            "file": file_name,
+            "chunks_upserted": 0,
+            "chunks_unchanged": len(existing),
+            "chunks_deleted": 0,
+            "llm_calls": 0,
+            "skipped": True
+        }
+        return
+
+    yield {"status": "parsing", "message": "Calling Unstructured API..."}
+    elements = partition_document(file_path, file_hash=doc_hash)
+
+    # Strip structural noise
+    filtered_elements = [e for e in elements if e.get("type") not in ["Header", "Footer"]]
+
+    yield {"status": "start_chunks", "total": len(filtered_elements)}
+
+    # Summaries, embeddings and upserts run as overlapping stages; progress still arrives per chunk, in order
+    existing_ids = set() if force else set(existing)
+    pipeline = IngestionPipeline(collection_name, file_name, filtered_elements, doc_hash, existing_ids)
+    yield from pipeline.run()
+
+    # Only after the new version is fully stored, drop chunks the document no longer contains
+    stale_ids = sorted(set(existing) - pipeline.seen_ids)
+    delete_points(collection_name, stale_ids)
+    # The skip check above trusts this stamp, so it is written only once the document is complete
+    mark_document_complete(collection_name, file_name, doc_hash)
+
+    logger.info(
+        f"Successfully processed {file_name}: {pipeline.chunks_upserted} upserted, "
+        f"{pipeline.chunks_unchanged} unchanged, {len(stale_ids)} deleted."
+    )
+    yield {
+        "status": "success",
+        "file": file_name,
+        "chunks_upserted": pipeline.chunks_upserted,
+        "chunks_unchanged": pipeline.chunks_unchanged,
+        "chunks_deleted": len(stale_ids),
+        "llm_calls": pipeline.llm_calls,
+        "summary_cache_hits": pipeline.summary_cache_hits,
+        "skipped": False
+    }
+
+def ingest_file(file_path: str, collection_name: str, force: bool = False) -> dict:
+    """Runs a full ingestion without streaming and returns the final 'success' event (worker-pool entry point)."""
+    result = {}
+    for event in run_ingestion(file_path, collection_name, force):
+        if event["status"] == "success":
+            result = event
+    return result
@@ -0,0 +1,143 @@
+import os
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+JOB_DB_PATH = os.getenv("INGEST_JOB_DB", "/app/state/ingest_jobs.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL REFERENCES batches(id),
+    file_path TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    chunks_upserted INTEGER NOT NULL DEFAULT 0,
+    llm_calls INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch_id);
+"""
+
+class JobStore:
+    """Durable SQLite-backed queue of per-document ingestion jobs."""
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def create_batch(self, file_paths: list[str]) -> str:
+        batch_id = uuid.uuid4().hex
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT INTO batches (id, created_at) VALUES (?, ?)", (batch_id, time.time()))
+            conn.executemany(
+                "INSERT INTO jobs (batch_id, file_path) VALUES (?, ?)",
+                [(batch_id, path) for path in file_paths],
+            )
+        return batch_id
+
+    def claim_next(self) -> Optional[dict]:
+        """Atomically moves the oldest queued job to 'running' and returns it."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT id, batch_id, file_path FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, error = NULL WHERE id = ?",
+                (time.time(), row["id"]),
+            )
+            return dict(row)
+
+    def complete(self, job_id: int, chunks_upserted: int, llm_calls: int):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'succeeded', chunks_upserted = ?, llm_calls = ?, finished_at = ? WHERE id = ?",
+                (chunks_upserted, llm_calls, time.time(), job_id),
+            )
+
+    def fail(self, job_id: int, error: str):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+    def retry_or_fail(self, job_id: int, error: str, max_attempts: int) -> bool:
+        """Puts a job whose worker crashed back in the queue, or fails it once its attempts are used up."""
+        with self._lock, self._connect() as conn:
+            attempts = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()["attempts"]
+            if attempts < max_attempts:
+                conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL, error = ? WHERE id = ?", (error, job_id))
+                return True
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+            return False
+
+    def requeue_interrupted(self) -> int:
+        """Jobs left 'running' by a crashed or restarted service go back to the queue."""
+        with self._lock, self._connect() as conn:
+            return conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'").rowcount
+
+    def batch_status(self, batch_id: str) -> Optional[dict]:
+        with self._lock, self._connect() as conn:
+            batch = conn.execute("SELECT id, created_at FROM batches WHERE id = ?", (batch_id,)).fetchone()
+            if batch is None:
+                return None
+            jobs = [dict(r) for r in conn.execute(
+                "SELECT id, file_path, status, attempts, chunks_upserted, llm_calls, error, started_at, finished_at "
+                "FROM jobs WHERE batch_id = ? ORDER BY id", (batch_id,)
+            )]
+
+        counts = {status: 0 for status in ("queued", "running", "succeeded", "failed")}
+        for job in jobs:
+            counts[job["status"]] += 1
+
+        succeeded = [j for j in jobs if j["status"] == "succeeded"]
+        started = [j["started_at"] for j in jobs if j["started_at"]]
+        finished = [j["finished_at"] for j in jobs if j["finished_at"]]
+        done = counts["queued"] == 0 and counts["running"] == 0
+        end = max(finished) if done and finished else time.time()
+        elapsed = end - min(started) if started else 0.0
+
+        total_chunks = sum(j["chunks_upserted"] for j in succeeded)
+        total_llm_calls = sum(j["llm_calls"] for j in succeeded)
+
+        return {
+            "batch_id": batch_id,
+            "done": done,
+            "counts": counts,
+            "throughput": {
+                "elapsed_seconds": round(elapsed, 2),
+                "documents_per_minute": round(len(succeeded) / (elapsed / 60), 2) if elapsed else 0.0,
+                "chunks_per_second": round(total_chunks / elapsed, 2) if elapsed else 0.0,
+                "chunks_upserted": total_chunks,
+                "llm_calls": total_llm_calls,
+            },
+            "jobs": jobs,
+        }
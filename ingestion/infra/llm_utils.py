@@ -1,15 +1,45 @@
 from google import genai
+import hashlib
 import os
 
+from infra.cache_utils import get_cache, make_key, CacheMiss, OFFLINE
+
 client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
+SUMMARY_NAMESPACE = "table_summary"
+SUMMARY_MODEL = 'gemini-2.5-flash'
+SUMMARY_TEMPERATURE = 0.1
+SUMMARY_PROMPT = "Provide a detailed semantic summary of the following HR policy table's purpose, rules, and relationships so it can be vector searched accurately:\n\n{raw_html}"
+
 def summarize_table(raw_html: str):
     """Generates a dense semantic summary of a table's rules and structure."""
-    prompt = f"Provide a detailed semantic summary of the following HR policy table's purpose, rules, and relationships so it can be vector searched accurately:\n\n{raw_html}"
+    prompt = SUMMARY_PROMPT.format(raw_html=raw_html)
     
     response = client.models.generate_content(
-        model='gemini-2.5-flash',
+        model=SUMMARY_MODEL,
         contents=prompt,
-        config={'temperature': 0.1}
+        config={'temperature': SUMMARY_TEMPERATURE}
     )
     return response.text, response.usage_metadata
+
+def summarize_table_cached(raw_html: str):
+    """
+    summarize_table with a persistent cache keyed by table HTML, prompt and model.
+    Returns (summary, usage, from_cache); usage is None on a cache hit.
+    """
+    cache = get_cache()
+    key = make_key(
+        hashlib.sha256(raw_html.encode("utf-8")).hexdigest(),
+        hashlib.sha256(SUMMARY_PROMPT.encode("utf-8")).hexdigest(),
+        SUMMARY_MODEL,
+        SUMMARY_TEMPERATURE,
+    )
+    summary = cache.get(SUMMARY_NAMESPACE, key)
+    if summary is not None:
+        return summary, None, True
+    if OFFLINE:
+        raise CacheMiss("No cached table summary and INGEST_OFFLINE is set")
+
+    summary, usage = summarize_table(raw_html)
+    cache.set(SUMMARY_NAMESPACE, key, summary)
+    return summary, usage, False
@@ -0,0 +1,53 @@
+import os
+import hashlib
+import logging
+from importlib.metadata import version, PackageNotFoundError
+from typing import Optional
+from unstructured_client import UnstructuredClient
+from unstructured_client.models import operations, shared
+
+from infra.cache_utils import get_cache, make_key, CacheMiss, OFFLINE
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAMESPACE = "partition"
+PARTITION_STRATEGY = shared.Strategy.HI_RES
+
+try:
+    _CLIENT_VERSION = version("unstructured-client")
+except PackageNotFoundError:
+    _CLIENT_VERSION = "unknown"
+
+# Initialize the Unstructured Serverless Client
+unstructured_client = UnstructuredClient(
+    api_key_auth=os.getenv("UNSTRUCTURED_API_KEY"),
+    server_url=os.getenv("UNSTRUCTURED_ENDPOINT"),
+)
+
+def partition_document(file_path: str, file_hash: Optional[str] = None) -> list[dict]:
+    """
+    Parses a document into structural elements via the Unstructured API (HI_RES strategy).
+    Results are cached on disk keyed by file hash plus partition parameters.
+    """
+    file_name = os.path.basename(file_path)
+    with open(file_path, "rb") as f:
+        content = f.read()
+
+    cache = get_cache()
+    key = make_key(file_hash or hashlib.sha256(content).hexdigest(), str(PARTITION_STRATEGY), _CLIENT_VERSION)
+    elements = cache.get(PARTITION_NAMESPACE, key)
+    if elements is not None:
+        logger.info(f"Partition cache hit for {file_name}.")
+        return elements
+    if OFFLINE:
+        raise CacheMiss(f"No cached partition for {file_name} and INGEST_OFFLINE is set")
+
+    req = operations.PartitionRequest(
+        partition_parameters=shared.PartitionParameters(
+            files=shared.Files(content=content, file_name=file_name),
+            strategy=PARTITION_STRATEGY,
+        )
+    )
+    res = unstructured_client.general.partition(request=req)
+    cache.set(PARTITION_NAMESPACE, key, res.elements)
+    return res.elements
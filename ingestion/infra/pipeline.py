@@ -0,0 +1,257 @@
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, Optional
+
+from infra.llm_utils import summarize_table_cached
+from infra.embedding_utils import get_bge_m3_embeddings_batch
+from infra.qdrant_utils import upsert_chunks, update_payloads
+from infra.content_hash import chunk_content_hash, chunk_point_id
+
+logger = logging.getLogger(__name__)
+
+# Pipeline tuning
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", 4))  # Parallel Gemini table summaries
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 16))  # Chunks per BGE-M3 forward pass
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", 64))  # Points per Qdrant upsert
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", 32))  # Max items buffered between stages (backpressure)
+
+_END = object()
+
+class _StageFailure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+class PipelineCancelled(Exception):
+    pass
+
+class ChunkRecord:
+    """One filtered element travelling through the pipeline in document order."""
+    __slots__ = ("idx", "is_title", "embed_text", "payload", "point_id", "unchanged", "summary", "vectors")
+
+    def __init__(self, idx: int, is_title: bool, embed_text: str = "", payload: Optional[dict] = None):
+        self.idx = idx
+        self.is_title = is_title
+        self.embed_text = embed_text
+        self.payload = payload
+        self.point_id: Optional[str] = None
+        self.unchanged = False  # Already stored with identical content; only the payload is refreshed
+        self.summary: Optional[Future] = None
+        self.vectors = None
+
+class IngestionPipeline:
+    """
+    Staged ingestion of one partitioned document.
+
+    prepare  : walks elements in order (section_header carry-over) and submits table summaries
+               to a bounded Gemini worker pool
+    embed    : resolves summaries in order and embeds chunks in batches
+    upsert   : (the consuming generator) buffers points, flushes them in bulk, then reports
+               per-chunk progress in document order
+
+    Stages are connected by bounded queues, so a slow stage throttles the ones before it.
+
+    Point IDs are content-addressed: chunks whose ID is already in `existing_ids` skip
+    summarization and embedding entirely. `seen_ids` collects every ID the document
+    still produces so the caller can delete the stale remainder.
+    """
+
+    def __init__(self, collection_name: str, file_name: str, elements: list[dict], doc_hash: str, existing_ids: Optional[set] = None):
+        self.collection_name = collection_name
+        self.file_name = file_name
+        self.elements = elements
+        self.doc_hash = doc_hash
+        self.existing_ids = existing_ids or set()
+        self.seen_ids: set = set()
+
+        self.llm_calls = 0
+        self.summary_cache_hits = 0
+        self.prompt_tokens = 0
+        self.candidate_tokens = 0
+        self.chunks_upserted = 0
+        self.chunks_unchanged = 0
+
+        self._prepared: queue.Queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+        self._embedded: queue.Queue = queue.Queue(maxsize=max(1, STAGE_QUEUE_SIZE // EMBED_BATCH_SIZE))
+        self._cancelled = threading.Event()
+        self._summary_pool = ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY, thread_name_prefix="table-summary")
+
+    def _put(self, q: queue.Queue, item):
+        # Blocking put that still notices cancellation (e.g. the client dropped the NDJSON stream)
+        while not self._cancelled.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise PipelineCancelled()
+
+    def _update_telemetry(self, usage):
+        self.llm_calls += 1
+        if usage:
+            self.prompt_tokens += getattr(usage, 'prompt_token_count', 0) or 0
+            self.candidate_tokens += getattr(usage, 'candidates_token_count', 0) or 0
+
+    def _prepare_stage(self):
+        try:
+            current_section_header = "General Policy"
+            # A section is identified by the chunk_index of its Title element (-1 before the first title);
+            # with chunk_index this forms the adjacency index used for neighbour expansion at query time
+            current_section_id = -1
+            occurrences: dict[str, int] = {}
+            for idx, element in enumerate(self.elements):
+                chunk_text = str(element.get("text", "")).strip()
+                if not chunk_text:
+                    continue
+
+                if element.get("type") == "Title":
+                    current_section_header = chunk_text
+                    current_section_id = idx
+                    self._put(self._prepared, ChunkRecord(idx, is_title=True))
+                    continue
+
+                content_type = "text"
+                raw_content = chunk_text
+                metadata = element.get("metadata", {})
+
+                if element.get("type") == "Table":
+                    content_type = "table"
+                    raw_content = metadata.get("text_as_html", chunk_text)
+
+                content_hash = chunk_content_hash(content_type, raw_content)
+                occurrence = occurrences.get(content_hash, 0)
+                occurrences[content_hash] = occurrence + 1
+
+                payload = {
+                    "source_document": self.file_name,
+                    "page_number": metadata.get("page_number", "Unknown"),
+                    "section_header": current_section_header,
+                    "section_id": current_section_id,
+                    "content_type": content_type,
+                    "raw_content": raw_content,
+                    "chunk_index": idx,
+                    "doc_hash": self.doc_hash,
+                    "content_hash": content_hash
+                }
+                record = ChunkRecord(idx, is_title=False, embed_text=chunk_text, payload=payload)
+                record.point_id = chunk_point_id(self.file_name, content_hash, occurrence)
+                record.unchanged = record.point_id in self.existing_ids
+                self.seen_ids.add(record.point_id)
+
+                # Only call Gemini for new table elements; runs concurrently while later elements are prepared
+                if content_type == "table" and not record.unchanged:
+                    record.summary = self._summary_pool.submit(summarize_table_cached, raw_content)
+
+                self._put(self._prepared, record)
+            self._put(self._prepared, _END)
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            self._put_failure(self._prepared, e)
+
+    def _embed_stage(self):
+        batch: list[ChunkRecord] = []
+        pending_chunks = 0
+
+        def flush():
+            nonlocal batch, pending_chunks
+            chunks = [r for r in batch if not r.is_title and not r.unchanged]
+            vectors = get_bge_m3_embeddings_batch([r.embed_text for r in chunks])
+            for record, vec in zip(chunks, vectors):
+                record.vectors = vec
+            self._put(self._embedded, batch)
+            batch, pending_chunks = [], 0
+
+        try:
+            while True:
+                record = self._prepared.get()
+                if record is _END:
+                    break
+                if isinstance(record, _StageFailure):
+                    self._put(self._embedded, record)
+                    return
+
+                if record.summary is not None:
+                    # Resolving in document order keeps chunk ordering stable
+                    record.embed_text, usage, from_cache = record.summary.result()
+                    if from_cache:
+                        self.summary_cache_hits += 1
+                    else:
+                        self._update_telemetry(usage)
+
+                batch.append(record)
+                if not record.is_title and not record.unchanged:
+                    pending_chunks += 1
+                # Batches of retained chunks are bounded too, so their progress isn't held back until the end
+                if pending_chunks >= EMBED_BATCH_SIZE or len(batch) >= STAGE_QUEUE_SIZE:
+                    flush()
+
+            if batch:
+                flush()
+            self._put(self._embedded, _END)
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            self._put_failure(self._embedded, e)
+
+    def _put_failure(self, q: queue.Queue, error: Exception):
+        try:
+            self._put(q, _StageFailure(error))
+        except PipelineCancelled:
+            pass
+
+    def run(self) -> Iterator[dict]:
+        """Drives the pipeline and yields one progress event per element, in document order."""
+        workers = [
+            threading.Thread(target=self._prepare_stage, name="ingest-prepare", daemon=True),
+            threading.Thread(target=self._embed_stage, name="ingest-embed", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        buffered_points: list[dict] = []
+        buffered_payloads: list[tuple[str, dict]] = []
+        buffered_progress: list[int] = []
+
+        def flush():
+            upsert_chunks(self.collection_name, buffered_points)
+            update_payloads(self.collection_name, buffered_payloads)
+            self.chunks_upserted += len(buffered_points)
+            self.chunks_unchanged += len(buffered_payloads)
+            events = [{"status": "chunk_progress", "current": idx + 1} for idx in buffered_progress]
+            buffered_points.clear()
+            buffered_payloads.clear()
+            buffered_progress.clear()
+            return events
+
+        try:
+            while True:
+                batch = self._embedded.get()
+                if batch is _END:
+                    break
+                if isinstance(batch, _StageFailure):
+                    raise batch.error
+
+                for record in batch:
+                    if record.unchanged:
+                        buffered_payloads.append((record.point_id, record.payload))
+                    elif not record.is_title:
+                        dense, s_idx, s_val = record.vectors
+                        buffered_points.append({
+                            "id": record.point_id,
+                            "dense": dense,
+                            "sparse_idx": s_idx,
+                            "sparse_val": s_val,
+                            "payload": record.payload,
+                        })
+                    buffered_progress.append(record.idx)
+
+                if len(buffered_points) + len(buffered_payloads) >= UPSERT_BATCH_SIZE:
+                    yield from flush()
+
+            yield from flush()
+        finally:
+            self._cancelled.set()
+            self._summary_pool.shutdown(wait=False, cancel_futures=True)
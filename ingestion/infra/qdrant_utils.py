@@ -17,9 +17,23 @@ def init_collection(collection_name: str):
             }
         )
         
-        # Hardware-accelerated payload filtering
-        client.create_payload_index(collection_name, "source_document", field_schema="keyword")
-        client.create_payload_index(collection_name, "sub_section", field_schema="keyword")
+    ensure_payload_indexes(collection_name)
+
+# Hardware-accelerated payload filtering; the integer indexes back the gateway's neighbour expansion
+PAYLOAD_INDEXES = {
+    "source_document": models.PayloadSchemaType.KEYWORD,
+    "sub_section": models.PayloadSchemaType.KEYWORD,
+    "doc_hash": models.PayloadSchemaType.KEYWORD,
+    "section_id": models.PayloadSchemaType.INTEGER,
+    "chunk_index": models.PayloadSchemaType.INTEGER,
+}
+
+def ensure_payload_indexes(collection_name: str):
+    """Creates any missing payload index, so existing collections pick up newly added ones."""
+    existing = client.get_collection(collection_name).payload_schema or {}
+    for field, schema in PAYLOAD_INDEXES.items():
+        if field not in existing:
+            client.create_payload_index(collection_name, field, field_schema=schema)
 
 def upsert_chunk(collection_name: str, point_id: str, dense: list, sparse_idx: list, sparse_val: list, payload: dict):
     """Upserts a hybrid point into Qdrant."""
@@ -36,3 +50,83 @@ def upsert_chunk(collection_name: str, point_id: str, dense: list, sparse_idx: l
             )
         ]
     )
+
+def upsert_chunks(collection_name: str, chunks: list[dict]):
+    """Upserts many hybrid points in a single request. Each chunk holds id, dense, sparse_idx, sparse_val and payload."""
+    if not chunks:
+        return
+    client.upsert(
+        collection_name=collection_name,
+        points=[
+            models.PointStruct(
+                id=chunk["id"],
+                vector={
+                    "dense": chunk["dense"],
+                    "sparse": models.SparseVector(indices=chunk["sparse_idx"], values=chunk["sparse_val"])
+                },
+                payload=chunk["payload"]
+            )
+            for chunk in chunks
+        ]
+    )
+
+def _document_filter(source_document: str) -> models.Filter:
+    return models.Filter(must=[
+        models.FieldCondition(key="source_document", match=models.MatchValue(value=source_document))
+    ])
+
+def get_document_points(collection_name: str, source_document: str) -> dict[str, str]:
+    """
+    Returns {point_id: ingested_hash} for every point currently stored for a document, where
+    ingested_hash is the doc_hash of the last ingestion that ran to completion over it (None if none did).
+    """
+    points = {}
+    offset = None
+    doc_filter = _document_filter(source_document)
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=doc_filter,
+            with_payload=["ingested_hash", "section_id"],
+            with_vectors=False,
+            limit=256,
+            offset=offset,
+        )
+        for record in records:
+            payload = record.payload or {}
+            # Points stored before section_id existed count as changed, so re-ingestion refreshes their payloads
+            points[str(record.id)] = payload.get("ingested_hash") if "section_id" in payload else None
+        if offset is None:
+            return points
+
+def update_payloads(collection_name: str, updates: list[tuple[str, dict]]):
+    """Refreshes payloads (e.g. chunk_index, section_header) of retained points without touching their vectors."""
+    if not updates:
+        return
+    client.batch_update_points(
+        collection_name=collection_name,
+        update_operations=[
+            models.SetPayloadOperation(set_payload=models.SetPayload(payload=payload, points=[point_id]))
+            for point_id, payload in updates
+        ]
+    )
+
+def mark_document_complete(collection_name: str, source_document: str, doc_hash: str):
+    """
+    Stamps every point of a fully ingested document with its doc_hash. Points written by a run that
+    died partway never get the stamp, so the next run doesn't mistake the document for unchanged.
+    """
+    client.set_payload(
+        collection_name=collection_name,
+        payload={"ingested_hash": doc_hash},
+        points=_document_filter(source_document),
+        wait=True,
+    )
+
+def delete_points(collection_name: str, point_ids: list[str]):
+    if not point_ids:
+        return
+    client.delete(
+        collection_name=collection_name,
+        points_selector=models.PointIdsList(points=point_ids)
+    )
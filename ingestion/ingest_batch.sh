@@ -16,6 +16,54 @@ if [ "$TOTAL_FILES" -eq 0 ]; then
     exit 0
 fi
 
+# Bulk mode: queue the whole directory on the server-side worker pool and poll its progress.
+# Job state is persisted server-side: if the service crashes, its restart requeues the interrupted jobs.
+# The batch ID is kept in $BATCH_STATE_FILE, so re-running this script re-attaches to an unfinished
+# batch instead of queueing every file again.
+BATCH_STATE_FILE=".ingest_batch_id"
+if [ "$1" == "--bulk" ]; then
+    BATCH_ID=""
+    if [ -f "$BATCH_STATE_FILE" ]; then
+        BATCH_ID=$(cat "$BATCH_STATE_FILE")
+        STATUS=$(curl -s "$API_URL/batch/$BATCH_ID")
+        if [[ "$STATUS" != *'"batch_id"'* || "$STATUS" == *'"done":true'* ]]; then
+            BATCH_ID=""
+        else
+            echo "Resuming unfinished batch $BATCH_ID"
+        fi
+    fi
+
+    if [ -z "$BATCH_ID" ]; then
+        RESPONSE=$(curl -s -X POST "$API_URL/batch" -H "Content-Type: application/json" -d '{"directory": "/app/sources"}')
+        BATCH_ID=$(echo "$RESPONSE" | grep -o '"batch_id":"[^"]*"' | cut -d'"' -f4)
+        if [ -z "$BATCH_ID" ]; then
+            echo "Error: could not queue batch: $RESPONSE"
+            exit 1
+        fi
+        echo "$BATCH_ID" > "$BATCH_STATE_FILE"
+        echo "Queued $TOTAL_FILES documents as batch $BATCH_ID"
+    fi
+
+    while true; do
+        STATUS=$(curl -s "$API_URL/batch/$BATCH_ID")
+        SUCCEEDED=$(echo "$STATUS" | grep -o '"succeeded":[0-9]*' | cut -d: -f2)
+        FAILED=$(echo "$STATUS" | grep -o '"failed":[0-9]*' | cut -d: -f2)
+        DOCS_PER_MIN=$(echo "$STATUS" | grep -o '"documents_per_minute":[0-9.]*' | cut -d: -f2)
+        CHUNKS_PER_SEC=$(echo "$STATUS" | grep -o '"chunks_per_second":[0-9.]*' | cut -d: -f2)
+        printf "  \033[34m%s\033[0m\r" "-> Done: $SUCCEEDED/$TOTAL_FILES | Failed: $FAILED | $DOCS_PER_MIN docs/min | $CHUNKS_PER_SEC chunks/s"
+        if [[ "$STATUS" == *'"done":true'* ]]; then
+            break
+        fi
+        sleep 5
+    done
+
+    LLM=$(echo "$STATUS" | grep -o '"llm_calls":[0-9]*' | head -1 | cut -d: -f2)
+    CHUNKS=$(echo "$STATUS" | grep -o '"chunks_upserted":[0-9]*' | head -1 | cut -d: -f2)
+    echo -e "\n\n Total Chunks Upserted : $CHUNKS | Total LLM Calls : $LLM"
+    rm -f "$BATCH_STATE_FILE"
+    exit 0
+fi
+
 echo -e "\n============================================================"
 echo -e " \033[1mStarting Batch Ingestion for $TOTAL_FILES documents\033[0m"
 echo -e "============================================================"
@@ -52,7 +100,11 @@ for FILE_PATH in "$SOURCES_DIR"/*.pdf; do
             GLOBAL_CHUNKS=$((GLOBAL_CHUNKS + CHUNKS))
             GLOBAL_LLM_CALLS=$((GLOBAL_LLM_CALLS + LLM))
             
-            printf "\n  \033[32m%s\033[0m\n" "-> [SUCCESS] Upserted: $CHUNKS chunks | LLM Calls: $LLM"
+            if [[ "$line" == *"\"skipped\": true"* ]]; then
+                printf "  \033[32m%s\033[0m\n" "-> [UNCHANGED] Document already indexed, skipped."
+            else
+                printf "\n  \033[32m%s\033[0m\n" "-> [SUCCESS] Upserted: $CHUNKS chunks | LLM Calls: $LLM"
+            fi
             
         elif [[ "$line" == *"\"status\": \"error\""* ]]; then
             DETAIL=$(echo "$line" | grep -o '"detail": "[^"]*"' | cut -d'"' -f4)
@@ -1,53 +1,215 @@
-from fastapi import APIRouter
+import asyncio
+import logging
+import time
+import uuid
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Header, HTTPException
 from fastapi.responses import StreamingResponse
-from dto.request import UserQuery
+from dto.request import BatchQuery, UserQuery
+from dto.response import BatchQueryResponse, BatchQueryResult, RetrievedChunk
 from services.query_router import QueryRouter
 from services.hybrid_retriever import HybridRetriever
 from services.context_evaluator import ContextEvaluator
 from services.generation_engine import GenerationEngine
+from services.context_packer import ContextPacker
+from services.query_decomposer import QueryDecomposer
+from services.semantic_cache import semantic_cache, CachedAnswer
+from integration.gemini_client import GENERATION_ERROR_MESSAGE
+from integration.vector_codec import Embedding
+from core.config import settings
 from utils.event_logger import EventLogger
+from utils.tracing import RequestTrace, observe, start_trace, timed
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+class SpeculativeRetrieval:
+    """Result of the retrieval branch that runs while the router is still deciding."""
+    def __init__(self, embedding: Embedding):
+        self.embedding = embedding
+        self.cached: Optional[CachedAnswer] = None
+        self.valid_chunks: List[RetrievedChunk] = []
+        self.is_confident = False
+
+async def _search_and_rerank(query: str, result: SpeculativeRetrieval):
+    chunks = await HybridRetriever.search(result.embedding)
+    # Rerank starts the moment retrieval lands
+    result.valid_chunks, result.is_confident = await ContextEvaluator.evaluate_and_rerank(query, chunks)
+    if result.is_confident:
+        # Pull in the surrounding rule text of the best hits (one batched Qdrant call)
+        result.valid_chunks = await HybridRetriever.expand_neighbors(result.valid_chunks)
+
+async def _speculative_retrieval(query: str, embed_task: asyncio.Task) -> SpeculativeRetrieval:
+    result = SpeculativeRetrieval(await embed_task)
+
+    # A near-identical question whose source chunks are unchanged can skip search, rerank and Gemini
+    if settings.SEMANTIC_CACHE_ENABLED:
+        result.cached = await semantic_cache.lookup(result.embedding[0])
+
+    if result.cached is None:
+        await _search_and_rerank(query, result)
+    return result
+
+async def _decomposed_retrieval(sub_queries: List[str]) -> List[Tuple[List[RetrievedChunk], bool]]:
+    # One batched embed, Qdrant and rerank call covers every sub-query
+    embeddings = await HybridRetriever.embed_batch(sub_queries)
+    chunk_lists = await HybridRetriever.search_batch(embeddings, limit=settings.SUBQUERY_K)
+    reranked = await ContextEvaluator.evaluate_and_rerank_batch(sub_queries, chunk_lists)
+    # The full query's hits are expanded by _search_and_rerank; only the sub-query hits are expanded here
+    expanded = await asyncio.gather(*[_expand_if_confident(chunks, is_confident) for chunks, is_confident in reranked])
+    return [(chunks, is_confident) for chunks, (_, is_confident) in zip(expanded, reranked)]
+
+def _discard(task: Optional[asyncio.Task]):
+    if task is None:
+        return
+    task.cancel()
+    # Retrieve (and drop) any failure so it isn't reported as an unhandled task exception
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+def _stream(body, request_id: str) -> StreamingResponse:
+    # The request ID lets clients (e.g. the evaluator) fetch this request's telemetry from /events/{request_id}
+    return StreamingResponse(body, media_type="text/event-stream", headers={"X-Request-ID": request_id})
+
+async def _log_event(log_payload: dict, trace: RequestTrace):
+    observe("request_total", trace.elapsed(), trace)
+    log_payload["timings"] = trace.snapshot()
+    await EventLogger.log_event(log_payload)
+
 @router.post("/query")
-async def query_endpoint(request: UserQuery):
-    # 1. Zero-Shot Routing
-    routing_decision = await QueryRouter.route(request)
-    
+async def query_endpoint(request: UserQuery, x_request_id: Optional[str] = Header(None)):
+    trace = start_trace()
+    request_id = x_request_id or uuid.uuid4().hex
+
+    # 1. Zero-Shot Routing, with embedding, hybrid search and rerank started speculatively alongside it.
+    #    Most traffic is in-scope, so the critical path becomes max(route, retrieve + rerank).
+    #    The query embedding is shared: the local router classifies from the same dense vector.
+    #    Comparisons the local patterns can split also retrieve per compared item in the same window.
+    embed_task = asyncio.create_task(HybridRetriever.embed(request.query))
+    retrieval_task = asyncio.create_task(timed("retrieval_total", _speculative_retrieval(request.query, embed_task)))
+    sub_queries = QueryDecomposer.decompose(request.query) if settings.DECOMPOSE_ENABLED else []
+    decomposed_task = None
+    if sub_queries:
+        decomposed_task = asyncio.create_task(timed("decomposed_retrieval", _decomposed_retrieval(sub_queries)))
+    try:
+        routing_decision = await QueryRouter.route(request, embed_task)
+    except BaseException:
+        _discard(retrieval_task)
+        _discard(decomposed_task)
+        raise
+
+    # Sub-retrieval results are only used when the router also calls the query comparative
+    if routing_decision.query_type != "comparative":
+        _discard(decomposed_task)
+        decomposed_task = None
+
     # Initialize our evaluation payload
     log_payload = {
+        "request_id": request_id,
         "query": request.query,
         "user_id": request.user_id,
         "query_type": routing_decision.query_type,
+        "routing_source": routing_decision.source,
+        "routing_reasoning": routing_decision.reasoning,
+        "routing_confidence": routing_decision.confidence,
         "retrieved_chunks": [],
-        "final_answer": ""
+        "final_answer": "",
+        "timings": {}
     }
 
-    # Handle Out-of-Scope Gracefully
+    # Handle Out-of-Scope Gracefully (the speculative retrieval is discarded)
     if routing_decision.query_type == "out-of-scope":
+        _discard(retrieval_task)
         msg = "This question appears to be outside the scope of HR policies and workplace guidelines. I can only assist with HR-related inquiries."
         log_payload["final_answer"] = msg
-        await EventLogger.log_event(log_payload)
-        
+        await _log_event(log_payload, trace)
+
         async def mock_stream():
             yield msg
-        return StreamingResponse(mock_stream(), media_type="text/event-stream")
-
-    # 2. Hybrid Retrieval
-    chunks = await HybridRetriever.retrieve(request.query)
-    
-    # 3. Cross-Encoder Re-ranking & Confidence Check
-    valid_chunks, is_confident = await ContextEvaluator.evaluate_and_rerank(request.query, chunks)
-    
+        return _stream(mock_stream(), request_id)
+
+    # 2. Hybrid Retrieval & 3. Cross-Encoder Re-ranking (already in flight)
+    try:
+        retrieval = await retrieval_task
+    except BaseException:
+        _discard(decomposed_task)
+        raise
+
+    # A cached answer only counts if the router agrees on the query type; otherwise retrieve normally
+    if retrieval.cached is not None and retrieval.cached.query_type != routing_decision.query_type:
+        retrieval.cached = None
+        await _search_and_rerank(request.query, retrieval)
+
+    # Comparative queries: each compared item gets an equal share of the context, ahead of the full query's hits
+    sub_results = None
+    if decomposed_task is not None:
+        if retrieval.cached is not None:
+            _discard(decomposed_task)
+        else:
+            try:
+                sub_results = await decomposed_task
+            except Exception as e:
+                # The sub-retrieval only adds recall; the full query's retrieval already succeeded
+                logger.error(f"Sub-query retrieval failed, answering from the full query alone: {type(e).__name__}: {e}")
+                sub_results = None
+        if sub_results:
+            retrieval.valid_chunks = QueryDecomposer.fuse(sub_results, retrieval.valid_chunks)
+            retrieval.is_confident = retrieval.is_confident or any(confident for _, confident in sub_results)
+            log_payload["sub_queries"] = [
+                {"query": sub_query, "chunk_ids": [c.id for c in chunks]}
+                for sub_query, (chunks, _) in zip(sub_queries, sub_results)
+            ]
+
+    observe("pre_generation", trace.elapsed())
+    timings = trace.snapshot()
+    sequential_ms = timings.get("route_ms", 0) + timings.get("retrieval_total_ms", 0)
+    logger.info(
+        f"Pre-generation critical path {timings['pre_generation_ms']:.0f}ms "
+        f"(sequential would be ~{sequential_ms:.0f}ms): {timings}"
+    )
+
+    # The Streaming Interceptor: relays tokens to the client, then logs the complete state
+    async def response_generator(token_stream, on_complete=None):
+        full_response = ""
+        stream_start = time.perf_counter()
+        first_token_at = None
+        # Consume the generator from our Engine
+        async for token in token_stream:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                # Time to first token as the client sees it: from request arrival
+                observe("ttft", trace.elapsed(), trace)
+            full_response += token
+            yield token
+
+        stream_end = time.perf_counter()
+        observe("generation", stream_end - stream_start, trace)
+        if first_token_at is not None:
+            observe("stream", stream_end - first_token_at, trace)
+
+        # Once the stream is finished, log the complete state
+        log_payload["final_answer"] = full_response
+        await _log_event(log_payload, trace)
+        if on_complete is not None:
+            on_complete(full_response)
+
+    if retrieval.cached is not None:
+        log_payload["retrieved_chunks"] = retrieval.cached.logged_chunks
+        log_payload["semantic_cache_hit"] = True
+        return _stream(response_generator(GenerationEngine.replay_response(retrieval.cached.answer)), request_id)
+
+    valid_chunks, is_confident = retrieval.valid_chunks, retrieval.is_confident
+
     # Populate the log with context IDs for Recall@K calculations later
     log_payload["retrieved_chunks"] = [
         {
-            "id": c.id, 
-            "score": c.score, 
-            "source": c.source_document, 
+            "id": c.id,
+            "score": c.score,
+            "source": c.source_document,
             "section": c.section_header,
-            "content": c.content  # <--- ADD THIS LINE
-        } 
+            "content": c.content,  # <--- ADD THIS LINE
+            "expanded_from": c.expanded_from
+        }
         for c in valid_chunks
     ]
 
@@ -55,23 +217,85 @@ async def query_endpoint(request: UserQuery):
     if not is_confident:
         msg = "I do not have enough information in the provided policies to answer that question accurately."
         log_payload["final_answer"] = msg
-        await EventLogger.log_event(log_payload)
-        
+        await _log_event(log_payload, trace)
+
         async def mock_stream():
             yield msg
-        return StreamingResponse(mock_stream(), media_type="text/event-stream")
+        return _stream(mock_stream(), request_id)
 
-    # 4. The Streaming Interceptor
-    async def response_generator():
-        full_response = ""
-        # Consume the generator from our Engine
-        async for token in GenerationEngine.generate_response(request.query, valid_chunks):
-            full_response += token
-            yield token
-        
-        # Once the stream is finished, log the complete state
-        log_payload["final_answer"] = full_response
-        await EventLogger.log_event(log_payload)
+    # 4. Fit the context to the token budget; the prompt and the citations both use exactly this set
+    context = ContextPacker.pack(valid_chunks)
+    log_payload["context"] = {**context.stats, "sent_chunk_ids": context.chunk_ids}
+
+    # 5. Stream the generation, caching the finished answer for semantically equivalent follow-ups
+    def cache_answer(full_response: str):
+        if not settings.SEMANTIC_CACHE_ENABLED or GENERATION_ERROR_MESSAGE in full_response:
+            return
+        semantic_cache.store(retrieval.embedding[0], CachedAnswer(
+            query=request.query,
+            query_type=routing_decision.query_type,
+            answer=full_response,
+            citations=GenerationEngine.collect_citations(context.chunks),
+            chunk_ids=context.chunk_ids,
+            logged_chunks=log_payload["retrieved_chunks"]
+        ))
 
     # Return the open connection to the client
-    return StreamingResponse(response_generator(), media_type="text/event-stream")
+    return _stream(
+        response_generator(GenerationEngine.generate_response(request.query, context.chunks), cache_answer),
+        request_id
+    )
+
+async def _expand_if_confident(chunks: List[RetrievedChunk], is_confident: bool) -> List[RetrievedChunk]:
+    return await HybridRetriever.expand_neighbors(chunks) if is_confident else chunks
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch_endpoint(request: BatchQuery):
+    """
+    Non-streaming retrieval for many queries at once (offline evaluation, FAQ pre-generation).
+    Embedding, Qdrant search and rerank each run as one batched call for the whole list.
+    Routing is skipped: callers submit in-scope questions, and low-confidence retrieval still
+    yields no answer. With `generate`, answers are produced with bounded Gemini concurrency.
+    """
+    if len(request.queries) > settings.QUERY_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {settings.QUERY_BATCH_MAX} queries per batch")
+    if not request.queries:
+        return BatchQueryResponse(results=[])
+
+    trace = start_trace()
+    queries = [q.query for q in request.queries]
+    embeddings = await HybridRetriever.embed_batch(queries)
+    chunk_lists = await HybridRetriever.search_batch(embeddings)
+    reranked = await ContextEvaluator.evaluate_and_rerank_batch(queries, chunk_lists)
+    contexts = await asyncio.gather(*[_expand_if_confident(chunks, is_confident) for chunks, is_confident in reranked])
+
+    results = [
+        BatchQueryResult(query=query, is_confident=is_confident, chunks=chunks)
+        for query, chunks, (_, is_confident) in zip(queries, contexts, reranked)
+    ]
+
+    if request.generate:
+        slots = asyncio.Semaphore(settings.QUERY_BATCH_GENERATION_CONCURRENCY)
+
+        async def answer(result: BatchQueryResult):
+            if not result.is_confident:
+                result.answer = "I do not have enough information in the provided policies to answer that question accurately."
+                return
+            context = ContextPacker.pack(result.chunks)
+            async with slots:
+                result.answer = await GenerationEngine.generate_answer(result.query, context.chunks)
+            result.citations = GenerationEngine.collect_citations(context.chunks)
+
+        await asyncio.gather(*[answer(result) for result in results])
+
+    observe("batch_total", trace.elapsed(), trace)
+    logger.info(f"Batch of {len(queries)} queries served in {trace.elapsed() * 1000:.0f}ms: {trace.snapshot()}")
+    return BatchQueryResponse(results=results)
+
+@router.get("/events/{request_id}")
+async def get_event(request_id: str):
+    """The logged telemetry for one /query request, looked up by its X-Request-ID."""
+    event = await EventLogger.get_event(request_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail=f"No event logged for request {request_id}")
+    return event
@@ -10,13 +10,70 @@ class Settings:
     INFERENCE_API_URL = os.getenv("INFERENCE_API_URL", "http://inference_api:8001")
     QDRANT_HOST = os.getenv("QDRANT_HOST", "qdrant")
     QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+    QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+    QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"  # Protobuf instead of JSON for vectors
     
     # External APIs
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     
     # Pipeline Parameters
     COLLECTION_NAME = "hr_policies"
-    RETRIEVAL_K = 10  # Number of documents to fetch before re-ranking
-    RERANK_THRESHOLD = -3.0  # Minimum score to consider a chunk relevant
+    RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", 10))  # Number of documents to fetch before re-ranking
+    PREFETCH_MULTIPLIER = int(os.getenv("PREFETCH_MULTIPLIER", 2))  # Candidates per dense/sparse leg = RETRIEVAL_K * this
+    RERANK_THRESHOLD = float(os.getenv("RERANK_THRESHOLD", -3.0))  # Minimum score to consider a chunk relevant
+    RERANK_DOC_TOKENS = int(os.getenv("RERANK_DOC_TOKENS", 256))  # Estimated tokens of each chunk the cross-encoder sees (0 = full text)
+    RERANK_ADAPTIVE = os.getenv("RERANK_ADAPTIVE", "false").lower() == "true"  # Score the RRF head first and skip the tail once settled (off until benchmarked)
+    RERANK_MINI_BATCH = int(os.getenv("RERANK_MINI_BATCH", 6))  # Head candidates scored in the first adaptive rerank call
+    RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", 3))  # Leading positions whose order must be settled before exiting early
+    RERANK_EARLY_EXIT_MARGIN = float(os.getenv("RERANK_EARLY_EXIT_MARGIN", 2.0))  # Logits the top N must lead the rest of the head by
+    NEIGHBOR_EXPANSION_TOP_N = int(os.getenv("NEIGHBOR_EXPANSION_TOP_N", 3))  # Reranked hits whose section neighbours are added (0 disables)
+    NEIGHBOR_WINDOW = int(os.getenv("NEIGHBOR_WINDOW", 1))  # chunk_index distance, within the same section
+
+    # Comparative Query Decomposition (one sub-retrieval per compared item, fused with equal quotas)
+    DECOMPOSE_ENABLED = os.getenv("DECOMPOSE_ENABLED", "true").lower() == "true"
+    DECOMPOSE_MAX_SUBQUERIES = int(os.getenv("DECOMPOSE_MAX_SUBQUERIES", 4))
+    SUBQUERY_K = int(os.getenv("SUBQUERY_K", 5))  # Candidates retrieved and reranked per sub-query
+
+    # Context Packing (prompt assembly)
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 6000))  # Estimated context tokens per prompt; 0 sends every chunk
+    CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", 0.7))  # MinHash Jaccard above which the lower-scored chunk is dropped
+    CONTEXT_MERGE_ADJACENT = os.getenv("CONTEXT_MERGE_ADJACENT", "true").lower() == "true"  # Join consecutive chunks of a section
+
+    # Batch Query Endpoint (/query/batch)
+    QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", 256))  # Queries per request
+    QUERY_BATCH_GENERATION_CONCURRENCY = int(os.getenv("QUERY_BATCH_GENERATION_CONCURRENCY", 4))  # Parallel Gemini calls
+
+    # Inference Batching
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))  # Texts per /embed/batch call
+    RERANK_BATCH_PAIRS = int(os.getenv("RERANK_BATCH_PAIRS", 256))  # (query, doc) pairs per /rerank/batch call; keep within the service's MAX_BATCH_REQUEST_ITEMS
+    INFERENCE_MAX_IN_FLIGHT = int(os.getenv("INFERENCE_MAX_IN_FLIGHT", 4))  # Concurrent batch calls per client
+    INFERENCE_BINARY_TRANSPORT = os.getenv("INFERENCE_BINARY_TRANSPORT", "true").lower() == "true"  # float32 wire format
+
+    # Embedding Cache
+    EMBEDDING_MODEL_ID = "BAAI/bge-m3"  # Part of every cache key
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))  # In-process LRU entries (0 disables)
+
+    # Semantic Answer Cache
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))  # Min cosine similarity for a hit
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 5000))
+    SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", 24 * 3600))
+
+    # Local Query Router (nearest-centroid over the BGE-M3 dense vector, Gemini as fallback)
+    ROUTER_LOCAL_ENABLED = os.getenv("ROUTER_LOCAL_ENABLED", "true").lower() == "true"
+    ROUTER_MODEL_PATH = os.getenv("ROUTER_MODEL_PATH", "/app/logs/router_centroids.json")
+    ROUTER_LOCAL_CONFIDENCE = float(os.getenv("ROUTER_LOCAL_CONFIDENCE", 0.8))  # Below this, ask Gemini
+    ROUTER_SHADOW_RATE = float(os.getenv("ROUTER_SHADOW_RATE", 0.05))  # Share of local decisions re-checked by Gemini
+    ROUTER_EMBED_DEADLINE_MS = float(os.getenv("ROUTER_EMBED_DEADLINE_MS", 50))  # Start Gemini if the embedding is slower than this
+
+    # Event Log (JSONL telemetry consumed by the evaluator and router trainer)
+    EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", "/app/logs/rag_events.jsonl")
+    EVENT_LOG_QUEUE_SIZE = int(os.getenv("EVENT_LOG_QUEUE_SIZE", 10000))  # Events beyond this are dropped, not awaited
+    EVENT_LOG_FLUSH_EVENTS = int(os.getenv("EVENT_LOG_FLUSH_EVENTS", 256))
+    EVENT_LOG_FLUSH_INTERVAL_S = float(os.getenv("EVENT_LOG_FLUSH_INTERVAL_S", 1.0))
+    EVENT_LOG_MAX_MB = int(os.getenv("EVENT_LOG_MAX_MB", 256))  # Rotate past this size; 0 disables rotation
+    EVENT_LOG_COMPRESS = os.getenv("EVENT_LOG_COMPRESS", "true").lower() == "true"  # Gzip rotated files
+    EVENT_INDEX_PATH = os.getenv("EVENT_INDEX_PATH", "/app/logs/rag_events_index.db")  # Empty disables GET /events/{id}
+    EVENT_INDEX_MAX_ENTRIES = int(os.getenv("EVENT_INDEX_MAX_ENTRIES", 200000))
 
 settings = Settings()
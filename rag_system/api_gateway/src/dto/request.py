@@ -1,5 +1,10 @@
+from typing import List
 from pydantic import BaseModel
 
 class UserQuery(BaseModel):
     query: str
     user_id: str = "default_user"
+
+class BatchQuery(BaseModel):
+    queries: List[UserQuery]
+    generate: bool = False  # Also produce an answer per query (skips routing; see /query/batch)
@@ -10,6 +10,10 @@ class RoutingDecision(BaseModel):
     query_type: Literal['factual', 'procedural', 'comparative', 'out-of-scope']
     reasoning: str
 
+class RoutedQuery(RoutingDecision):
+    source: Literal['local', 'llm', 'failsafe'] = 'llm'  # Which router tier produced the decision
+    confidence: Optional[float] = None  # Local classifier confidence, when it was consulted
+
 class RetrievedChunk(BaseModel):
     id: str
     content: str
@@ -17,3 +21,16 @@ class RetrievedChunk(BaseModel):
     section_header: str
     page_number: str
     score: Optional[float] = None
+    chunk_index: Optional[int] = None  # Position within the source document, for merging neighbours
+    section_id: Optional[int] = None  # chunk_index of the section's title element (-1 before the first title)
+    expanded_from: Optional[str] = None  # Set on neighbours added around a reranked hit (that hit's ID)
+
+class BatchQueryResult(BaseModel):
+    query: str
+    is_confident: bool
+    chunks: List[RetrievedChunk]  # Reranked (and neighbour-expanded) context, best first
+    answer: Optional[str] = None
+    citations: List[CitationDTO] = []
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryResult]
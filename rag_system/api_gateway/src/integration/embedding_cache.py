@@ -0,0 +1,53 @@
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+from integration.vector_codec import Embedding
+from utils.metrics import metrics
+
+def normalize_text(text: str) -> str:
+    """Same canonical form the inference service uses for its persistent store: NFKC, trimmed, single-spaced."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+class EmbeddingLRUCache:
+    """In-process LRU tier for query embeddings; a hit skips the inference hop entirely."""
+
+    def __init__(self, model_id: str, max_entries: int):
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Embedding]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = metrics.counter("gateway_embedding_cache_hits_total", "Query embeddings served from the in-process LRU.")
+        self.misses = metrics.counter("gateway_embedding_cache_misses_total", "Query embeddings fetched from the inference service.")
+        self.size = metrics.gauge("gateway_embedding_cache_entries", "Entries held in the in-process embedding LRU.")
+
+    def _key(self, text: str) -> tuple:
+        return (self.model_id, normalize_text(text))
+
+    def get(self, text: str) -> Optional[Embedding]:
+        if self.max_entries <= 0:
+            return None
+        key = self._key(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses.inc()
+                return None
+            self._entries.move_to_end(key)
+        self.hits.inc()
+        return embedding
+
+    def put(self, text: str, embedding: Embedding):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[self._key(text)] = embedding
+            self._entries.move_to_end(self._key(text))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.size.set(len(self._entries))
+
+    def hit_rate(self) -> float:
+        total = self.hits.value + self.misses.value
+        return self.hits.value / total if total else 0.0
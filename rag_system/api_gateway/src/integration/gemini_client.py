@@ -1,11 +1,16 @@
 import logging
+import time
 from google import genai
 from google.genai import types
 from core.config import settings
 from dto.response import RoutingDecision
+from utils.tracing import observe, timed
 
 logger = logging.getLogger(__name__)
 
+GENERATION_ERROR_MESSAGE = "I encountered an error while generating the response. Please try again."
+ROUTING_FAILSAFE_REASONING = "Failsafe fallback due to API error."
+
 class GeminiIntegration:
     def __init__(self):
         # Explicitly pass the API key from our validated settings
@@ -25,7 +30,7 @@ class GeminiIntegration:
         """
         
         try:
-            response = await self.client.aio.models.generate_content(
+            response = await timed("gemini_route", self.client.aio.models.generate_content(
                 model='gemini-2.5-flash',
                 contents=prompt,
                 config=types.GenerateContentConfig(
@@ -33,16 +38,18 @@ class GeminiIntegration:
                     response_schema=RoutingDecision,
                     temperature=0.1,
                 ),
-            )
+            ))
             # The SDK automatically validates and parses the output into the Pydantic model
             return response.parsed
         except Exception as e:
             logger.error(f"Routing failed: {e}")
             # Failsafe default to ensure the pipeline continues
-            return RoutingDecision(query_type="factual", reasoning="Failsafe fallback due to API error.")
+            return RoutingDecision(query_type="factual", reasoning=ROUTING_FAILSAFE_REASONING)
 
     async def stream_generation(self, prompt: str):
         """Uses Gemini 2.5 Flash to stream the augmented response."""
+        start = time.perf_counter()
+        first_token = True
         try:
             # Removed 'await' - the method yields the stream directly
             response_stream = self.client.aio.models.generate_content_stream(
@@ -52,9 +59,13 @@ class GeminiIntegration:
             )
             async for chunk in response_stream:
                 if chunk.text:
+                    if first_token:
+                        observe("gemini_first_token", time.perf_counter() - start)
+                        first_token = False
                     yield chunk.text
+            observe("gemini_stream", time.perf_counter() - start)
         except Exception as e:
             logger.error(f"Generation stream failed: {e}")
-            yield "I encountered an error while generating the response. Please try again."
+            yield GENERATION_ERROR_MESSAGE
 
 gemini_client = GeminiIntegration()
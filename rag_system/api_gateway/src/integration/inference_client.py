@@ -1,7 +1,11 @@
+import asyncio
 import httpx
 import logging
 from typing import List, Tuple
 from core.config import settings
+from integration.vector_codec import MEDIA_TYPE as VECTOR_MEDIA_TYPE, Embedding, decode_embeddings, from_json
+from integration.embedding_cache import EmbeddingLRUCache
+from utils.tracing import timed
 
 logger = logging.getLogger(__name__)
 
@@ -13,26 +17,110 @@ class InferenceClient:
             timeout=httpx.Timeout(30.0), # Accommodate heavy tensor operations
             limits=httpx.Limits(max_keepalive_connections=100, max_connections=500)
         )
+        # Bounds how many batch calls this client keeps in flight at once
+        self._batch_slots = asyncio.Semaphore(settings.INFERENCE_MAX_IN_FLIGHT)
+        # Ask for the compact binary vector format; the service falls back to JSON if it doesn't support it
+        self._embed_headers = (
+            {"Accept": f"{VECTOR_MEDIA_TYPE}, application/json;q=0.5"}
+            if settings.INFERENCE_BINARY_TRANSPORT else {}
+        )
+        self.embedding_cache = EmbeddingLRUCache(settings.EMBEDDING_MODEL_ID, settings.EMBEDDING_CACHE_SIZE)
 
-    async def get_embedding(self, text: str) -> Tuple[List[float], List[int], List[float]]:
-        """Calls the /embed endpoint."""
-        response = await self.client.post("/embed", json={"text": text})
-        response.raise_for_status()
+    @staticmethod
+    def _parse_embeddings(response: httpx.Response, batched: bool) -> List[Embedding]:
+        if response.headers.get("content-type", "").startswith(VECTOR_MEDIA_TYPE):
+            return decode_embeddings(response.content)
         data = response.json()
-        return data["dense_vector"], data["sparse_indices"], data["sparse_values"]
+        return [from_json(e) for e in data["embeddings"]] if batched else [from_json(data)]
+
+    async def get_embedding(self, text: str) -> Embedding:
+        """Calls the /embed endpoint. Returns (dense, sparse_indices, sparse_values) as NumPy arrays."""
+        cached = self.embedding_cache.get(text)
+        if cached is not None:
+            return cached
+
+        response = await timed("inference_embed", self.client.post("/embed", json={"text": text}, headers=self._embed_headers))
+        response.raise_for_status()
+        embedding = self._parse_embeddings(response, batched=False)[0]
+        self.embedding_cache.put(text, embedding)
+        return embedding
 
     async def get_rerank_scores(self, query: str, documents: List[str]) -> List[float]:
         """Calls the /rerank endpoint."""
         if not documents:
             return []
             
-        response = await self.client.post(
+        response = await timed("inference_rerank", self.client.post(
             "/rerank", 
             json={"query": query, "documents": documents}
-        )
+        ))
         response.raise_for_status()
         return response.json()["scores"]
 
+    async def get_embeddings(self, texts: List[str]) -> List[Embedding]:
+        """Embeds many texts via /embed/batch, split into bounded concurrent calls. Order is preserved."""
+        if not texts:
+            return []
+
+        # Serve what we can from the LRU; only misses travel to the inference service
+        embeddings = [self.embedding_cache.get(text) for text in texts]
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if not missing:
+            return embeddings
+
+        size = settings.EMBED_BATCH_SIZE
+        slices = [[texts[i] for i in missing[j:j + size]] for j in range(0, len(missing), size)]
+
+        async def post_slice(batch: List[str]):
+            async with self._batch_slots:
+                response = await timed("inference_embed_batch", self.client.post("/embed/batch", json={"texts": batch}, headers=self._embed_headers))
+            response.raise_for_status()
+            return self._parse_embeddings(response, batched=True)
+
+        results = await asyncio.gather(*[post_slice(batch) for batch in slices])
+        fetched = [embedding for batch in results for embedding in batch]
+        for i, embedding in zip(missing, fetched):
+            embeddings[i] = embedding
+            self.embedding_cache.put(texts[i], embedding)
+        return embeddings
+
+    async def get_rerank_scores_batch(self, groups: List[Tuple[str, List[str]]]) -> List[List[float]]:
+        """Scores many (query, documents) groups via /rerank/batch, split by pair count. Order is preserved."""
+        if not groups:
+            return []
+
+        # Groups over RERANK_BATCH_PAIRS are split into pieces, so no call exceeds the service's item limit;
+        # pieces are then packed into calls of at most RERANK_BATCH_PAIRS pairs
+        limit = max(1, settings.RERANK_BATCH_PAIRS)
+        pieces = [
+            (group, query, documents[start:start + limit])
+            for group, (query, documents) in enumerate(groups)
+            for start in range(0, max(1, len(documents)), limit)
+        ]
+        slices, current, current_pairs = [], [], 0
+        for piece in pieces:
+            if current and current_pairs + len(piece[2]) > limit:
+                slices.append(current)
+                current, current_pairs = [], 0
+            current.append(piece)
+            current_pairs += len(piece[2])
+        slices.append(current)
+
+        async def post_slice(batch: List[tuple]):
+            payload = [{"query": query, "documents": documents} for _, query, documents in batch]
+            async with self._batch_slots:
+                response = await timed("inference_rerank_batch", self.client.post("/rerank/batch", json={"groups": payload}))
+            response.raise_for_status()
+            return [r["scores"] for r in response.json()["results"]]
+
+        results = await asyncio.gather(*[post_slice(batch) for batch in slices])
+        # Pieces come back in order, so each group's scores are its pieces' scores concatenated
+        scores: List[List[float]] = [[] for _ in groups]
+        for batch, batch_scores in zip(slices, results):
+            for (group, _, _), piece_scores in zip(batch, batch_scores):
+                scores[group].extend(piece_scores)
+        return scores
+
     async def close(self):
         await self.client.aclose()
 
@@ -2,52 +2,129 @@ import logging
 from qdrant_client import AsyncQdrantClient, models
 from core.config import settings
 from dto.response import RetrievedChunk
+from utils.tracing import timed
 
 logger = logging.getLogger(__name__)
 
 class QdrantIntegration:
     def __init__(self):
-        self.client = AsyncQdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT)
+        self.client = AsyncQdrantClient(
+            host=settings.QDRANT_HOST,
+            port=settings.QDRANT_PORT,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+        )
 
-    async def hybrid_search(self, dense_vec: list, sparse_idx: list, sparse_val: list, limit: int = settings.RETRIEVAL_K) -> list[RetrievedChunk]:
-        """Executes a hybrid (Dense + Sparse) search using RRF in Qdrant."""
-        
+    @staticmethod
+    def _as_list(vector) -> list:
+        # Vectors arrive as NumPy arrays from the inference client; the Qdrant models expect plain lists
+        return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+    def _prefetch(self, dense_vec, sparse_idx, sparse_val, limit: int) -> list[models.Prefetch]:
         # We use prefetching to combine sparse and dense results
-        prefetch = [
+        prefetch_limit = limit * settings.PREFETCH_MULTIPLIER
+        return [
             models.Prefetch(
-                query=dense_vec,
+                query=self._as_list(dense_vec),
                 using="dense",
-                limit=limit * 2,
+                limit=prefetch_limit,
             ),
             models.Prefetch(
-                query=models.SparseVector(indices=sparse_idx, values=sparse_val),
+                query=models.SparseVector(indices=self._as_list(sparse_idx), values=self._as_list(sparse_val)),
                 using="sparse",
-                limit=limit * 2,
+                limit=prefetch_limit,
             ),
         ]
 
+    async def hybrid_search(self, dense_vec, sparse_idx, sparse_val, limit: int = settings.RETRIEVAL_K) -> list[RetrievedChunk]:
+        """Executes a hybrid (Dense + Sparse) search using RRF in Qdrant."""
         # Fusion query combines the prefetched results
-        results = await self.client.query_points(
+        results = await timed("qdrant_query", self.client.query_points(
             collection_name=settings.COLLECTION_NAME,
-            prefetch=prefetch,
+            prefetch=self._prefetch(dense_vec, sparse_idx, sparse_val, limit),
             query=models.FusionQuery(fusion=models.Fusion.RRF),
             with_payload=True,
             limit=limit,
+        ))
+        return [self._to_chunk(point, point.score) for point in results.points]
+
+    async def hybrid_search_batch(self, embeddings: list, limit: int = settings.RETRIEVAL_K) -> list[list[RetrievedChunk]]:
+        """Runs one RRF hybrid search per (dense, sparse_idx, sparse_val) embedding in a single round trip."""
+        if not embeddings:
+            return []
+        requests = [
+            models.QueryRequest(
+                prefetch=self._prefetch(dense, s_idx, s_val, limit),
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                with_payload=True,
+                limit=limit,
+                offset=0,  # Explicit: Qdrant's in-memory mode (used by the benchmarks) doesn't default it
+            )
+            for dense, s_idx, s_val in embeddings
+        ]
+        responses = await timed("qdrant_query_batch", self.client.query_batch_points(
+            collection_name=settings.COLLECTION_NAME,
+            requests=requests,
+        ))
+        return [[self._to_chunk(point, point.score) for point in response.points] for response in responses]
+
+    @staticmethod
+    def _to_chunk(point, score=None) -> RetrievedChunk:
+        payload = point.payload or {}
+        return RetrievedChunk(
+            id=str(point.id),
+            content=payload.get("raw_content", ""),
+            source_document=payload.get("source_document", "Unknown"),
+            section_header=payload.get("section_header", "Unknown"),
+            page_number=str(payload.get("page_number", "Unknown")),
+            score=score,
+            chunk_index=payload.get("chunk_index"),
+            section_id=payload.get("section_id")
         )
 
-        parsed_chunks = []
-        for point in results.points:
-            payload = point.payload or {}
-            parsed_chunks.append(RetrievedChunk(
-                id=str(point.id),
-                content=payload.get("raw_content", ""),
-                source_document=payload.get("source_document", "Unknown"),
-                section_header=payload.get("section_header", "Unknown"),
-                page_number=str(payload.get("page_number", "Unknown")),
-                score=point.score
-            ))
-            
-        return parsed_chunks
+    async def fetch_neighbors(self, hits: list[RetrievedChunk], window: int, exclude_ids: list[str]) -> list[RetrievedChunk]:
+        """
+        Chunks within `window` positions of each hit in the same section, fetched in one scroll
+        over the chunk_index / section_id payload indexes.
+        """
+        conditions = []
+        for hit in hits:
+            if hit.chunk_index is None:
+                continue
+            section = (
+                models.FieldCondition(key="section_id", match=models.MatchValue(value=hit.section_id))
+                if hit.section_id is not None
+                # Points ingested before section_id existed: fall back to the header text
+                else models.FieldCondition(key="section_header", match=models.MatchValue(value=hit.section_header))
+            )
+            conditions.append(models.Filter(must=[
+                models.FieldCondition(key="source_document", match=models.MatchValue(value=hit.source_document)),
+                models.FieldCondition(key="chunk_index", range=models.Range(gte=hit.chunk_index - window, lte=hit.chunk_index + window)),
+                section,
+            ]))
+        if not conditions:
+            return []
+
+        records, _ = await timed("qdrant_neighbors", self.client.scroll(
+            collection_name=settings.COLLECTION_NAME,
+            scroll_filter=models.Filter(should=conditions, must_not=[models.HasIdCondition(has_id=exclude_ids)]),
+            limit=len(conditions) * 2 * window,
+            with_payload=True,
+            with_vectors=False,
+        ))
+        return [self._to_chunk(record) for record in records]
+
+    async def existing_ids(self, point_ids: list[str]) -> set[str]:
+        """Returns the subset of point IDs still present in the collection."""
+        if not point_ids:
+            return set()
+        records = await timed("qdrant_retrieve", self.client.retrieve(
+            collection_name=settings.COLLECTION_NAME,
+            ids=list(set(point_ids)),
+            with_payload=False,
+            with_vectors=False,
+        ))
+        return {str(record.id) for record in records}
 
     async def close(self):
         await self.client.close()
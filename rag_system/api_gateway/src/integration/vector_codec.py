@@ -0,0 +1,49 @@
+import struct
+from typing import List, Tuple
+import numpy as np
+
+# Mirror of the inference service's binary embedding format (see inference_service/src/utils/vector_codec.py).
+#   header   : magic b"BGEV", u8 version, 3 pad bytes, u32 count, u32 dim   (16 bytes)
+#   dense    : f32[count * dim]
+#   nnz      : u32[count]
+#   indices  : u32[sum(nnz)]
+#   values   : f32[sum(nnz)]
+MEDIA_TYPE = "application/x-bge-vectors"
+MAGIC = b"BGEV"
+VERSION = 1
+HEADER = struct.Struct("<4sB3xII")
+
+Embedding = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def decode_embeddings(payload: bytes) -> List[Embedding]:
+    """
+    Decodes a binary embedding payload into (dense, sparse_indices, sparse_values) arrays.
+    Every array is a read-only view over `payload`; no per-element Python objects are created.
+    """
+    magic, version, count, dim = HEADER.unpack_from(payload, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported vector payload (magic={magic!r}, version={version})")
+
+    offset = HEADER.size
+    dense = np.frombuffer(payload, dtype="<f4", count=count * dim, offset=offset).reshape(count, dim)
+    offset += dense.nbytes
+    nnz = np.frombuffer(payload, dtype="<u4", count=count, offset=offset)
+    offset += nnz.nbytes
+    total = int(nnz.sum())
+    indices = np.frombuffer(payload, dtype="<u4", count=total, offset=offset)
+    offset += indices.nbytes
+    values = np.frombuffer(payload, dtype="<f4", count=total, offset=offset)
+
+    embeddings, start = [], 0
+    for row, n in enumerate(nnz.tolist()):
+        embeddings.append((dense[row], indices[start:start + n], values[start:start + n]))
+        start += n
+    return embeddings
+
+def from_json(item: dict) -> Embedding:
+    """Converts a JSON EmbedResponse into the same array representation as the binary path."""
+    return (
+        np.asarray(item["dense_vector"], dtype=np.float32),
+        np.asarray(item["sparse_indices"], dtype=np.uint32),
+        np.asarray(item["sparse_values"], dtype=np.float32),
+    )
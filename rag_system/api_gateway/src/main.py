@@ -1,6 +1,10 @@
 import logging
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from api.routes import router
+from services.query_router import QueryRouter
+from utils.metrics import metrics
+from utils.event_logger import EventLogger
 
 logging.basicConfig(
     level=logging.INFO, 
@@ -11,6 +15,21 @@ app = FastAPI(title="HR RAG API Gateway")
 
 app.include_router(router)
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Drain buffered telemetry so the last requests' events reach the JSONL log
+    await EventLogger.shutdown()
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": "api_gateway"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition of gateway metrics."""
+    return metrics.render()
+
+@app.get("/router/stats")
+def router_stats():
+    """Local vs Gemini routing split, agreement rate and estimated latency saved."""
+    return QueryRouter.stats()
@@ -3,11 +3,69 @@ from typing import List, Tuple
 from dto.response import RetrievedChunk
 from integration.inference_client import inference_client
 from core.config import settings
+from services.context_packer import CHARS_PER_TOKEN, compact_html
+from utils.metrics import metrics
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+rerank_pairs_total = metrics.counter("gateway_rerank_pairs_total", "(query, chunk) pairs scored by the cross-encoder.")
+rerank_pairs_saved_total = metrics.counter(
+    "gateway_rerank_pairs_saved_total", "Retrieved chunks dropped unscored by adaptive early exit."
+)
+rerank_early_exits_total = metrics.counter("gateway_rerank_early_exits_total", "Queries whose adaptive rerank stopped early.")
+
+def rerank_text(chunk: RetrievedChunk) -> str:
+    """What the cross-encoder sees: compacted HTML, cut to RERANK_DOC_TOKENS. Generation still gets the full chunk."""
+    text = compact_html(chunk.content)
+    if settings.RERANK_DOC_TOKENS > 0:
+        text = text[:settings.RERANK_DOC_TOKENS * CHARS_PER_TOKEN]
+    return text
+
 class ContextEvaluator:
     @staticmethod
+    def _settled(head: List[RetrievedChunk]) -> bool:
+        """
+        Whether the unscored tail can be skipped after scoring the head. The confidence decision is
+        final once a chunk passes the threshold, since one passing chunk is enough. The rest is a
+        heuristic, not a guarantee: head scores bound nothing about the tail's, so a tail chunk that
+        would have reached the top N (or passed the threshold) is lost. The top N must all pass and
+        lead the rest of the head by the margin; benchmark recall before enabling it.
+        """
+        top_n = settings.RERANK_TOP_N
+        ranked = sorted(head, key=lambda c: c.score, reverse=True)
+        if top_n <= 0 or len(ranked) <= top_n:
+            return False
+        top, rest = ranked[:top_n], ranked[top_n:]
+        return (
+            top[-1].score >= settings.RERANK_THRESHOLD
+            and top[-1].score - rest[0].score >= settings.RERANK_EARLY_EXIT_MARGIN
+        )
+
+    @staticmethod
+    async def _score(query: str, chunks: List[RetrievedChunk]):
+        scores = await inference_client.get_rerank_scores(query, [rerank_text(c) for c in chunks])
+        for chunk, score in zip(chunks, scores):
+            chunk.score = score
+
+    @staticmethod
+    async def _score_adaptive(query: str, chunks: List[RetrievedChunk]) -> Tuple[List[RetrievedChunk], List[RetrievedChunk]]:
+        """
+        Scores the RERANK_MINI_BATCH highest RRF-ranked candidates first. If the ranking is settled,
+        the rest are skipped; otherwise they are all scored in one more call, so a query
+        costs at most two round trips. Returns (scored, skipped).
+        """
+        head, tail = chunks[:max(1, settings.RERANK_MINI_BATCH)], chunks[max(1, settings.RERANK_MINI_BATCH):]
+        await ContextEvaluator._score(query, head)
+        if tail and ContextEvaluator._settled(head):
+            rerank_early_exits_total.inc()
+            return head, tail
+        if tail:
+            await ContextEvaluator._score(query, tail)
+        return chunks, []
+
+    @staticmethod
+    @traced("rerank")
     async def evaluate_and_rerank(query: str, chunks: List[RetrievedChunk]) -> Tuple[List[RetrievedChunk], bool]:
         """
         Re-ranks chunks and determines if we have enough confidence to answer.
@@ -16,23 +74,51 @@ class ContextEvaluator:
         if not chunks:
             return [], False
 
-        documents = [chunk.content for chunk in chunks]
-        
         logger.info("Calling inference service for cross-encoder re-ranking...")
-        scores = await inference_client.get_rerank_scores(query, documents)
+        if settings.RERANK_ADAPTIVE:
+            scored, skipped = await ContextEvaluator._score_adaptive(query, chunks)
+        else:
+            await ContextEvaluator._score(query, chunks)
+            scored, skipped = chunks, []
+        rerank_pairs_total.inc(len(scored))
+        rerank_pairs_saved_total.inc(len(skipped))
 
-        # Attach scores and filter
-        valid_chunks = []
-        for chunk, score in zip(chunks, scores):
-            chunk.score = score
-            if score >= settings.RERANK_THRESHOLD:
-                valid_chunks.append(chunk)
+        # Filter by threshold
+        valid_chunks = [chunk for chunk in scored if chunk.score >= settings.RERANK_THRESHOLD]
 
         # Sort descending by score
         valid_chunks.sort(key=lambda x: x.score, reverse=True)
         
         # We define confidence simply: do we have at least one chunk passing the threshold?
         is_confident = len(valid_chunks) > 0
-        
-        logger.info(f"Reranking complete. {len(valid_chunks)} chunks passed threshold.")
+
+        # Candidates skipped by early exit are dropped: without a score they can't be held to the threshold
+        logger.info(
+            f"Reranking complete. {len(valid_chunks)} chunks passed threshold "
+            f"({len(scored)}/{len(chunks)} scored, {len(skipped)} skipped by early exit)."
+        )
         return valid_chunks, is_confident
+
+    @staticmethod
+    @traced("rerank_batch")
+    async def evaluate_and_rerank_batch(
+        queries: List[str], chunk_lists: List[List[RetrievedChunk]]
+    ) -> List[Tuple[List[RetrievedChunk], bool]]:
+        """
+        Batch form of evaluate_and_rerank: every (query, chunk) pair goes through /rerank/batch at once.
+        Early exit doesn't apply; throughput comes from the shared forward passes instead.
+        """
+        groups = [(query, [rerank_text(c) for c in chunks]) for query, chunks in zip(queries, chunk_lists) if chunks]
+        scored = iter(await inference_client.get_rerank_scores_batch(groups))
+
+        results = []
+        for chunks in chunk_lists:
+            if not chunks:
+                results.append(([], False))
+                continue
+            for chunk, score in zip(chunks, next(scored)):
+                chunk.score = score
+            valid_chunks = sorted((c for c in chunks if c.score >= settings.RERANK_THRESHOLD), key=lambda c: c.score, reverse=True)
+            results.append((valid_chunks, len(valid_chunks) > 0))
+        rerank_pairs_total.inc(sum(len(chunks) for chunks in chunk_lists))
+        return results
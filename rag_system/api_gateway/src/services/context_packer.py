@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import math
+import re
+from typing import Dict, List, Tuple
+import numpy as np
+from dto.response import RetrievedChunk
+from core.config import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_WORDS = 3
+NUM_PERMUTATIONS = 64
+CHARS_PER_TOKEN = 4  # Gemini's tokenizer isn't available locally; ~4 chars/token for English prose and HTML
+
+# Fixed seed: signatures only need to be comparable within one process
+_PERMUTATION_MASKS = np.random.default_rng(0x5EED).integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+tokens_sent_total = metrics.counter("gateway_context_tokens_sent_total", "Estimated context tokens sent to Gemini.")
+tokens_saved_total = metrics.counter("gateway_context_tokens_saved_total", "Estimated context tokens removed by the packer.")
+duplicates_dropped_total = metrics.counter("gateway_context_duplicates_dropped_total", "Near-duplicate chunks left out of the prompt.")
+budget_dropped_total = metrics.counter("gateway_context_budget_dropped_total", "Chunks left out because the token budget was spent.")
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def document_header(index: int, chunk: RetrievedChunk) -> str:
+    return f"[Document {index} | Source: {chunk.source_document} | Section: {chunk.section_header}]"
+
+def _chunk_tokens(chunk: RetrievedChunk) -> int:
+    # The document index is unknown until packing finishes; two digits covers it
+    return estimate_tokens(document_header(99, chunk)) + estimate_tokens(chunk.content) + 1
+
+def compact_html(content: str) -> str:
+    """Strips attributes and inter-tag whitespace from table HTML; the cell text is unchanged."""
+    if "<" not in content:
+        return content
+    content = re.sub(r"<(\w+)\s[^>]*>", r"<\1>", content)
+    content = re.sub(r">\s+<", "><", content)
+    return re.sub(r"\s{2,}", " ", content).strip()
+
+def minhash_signature(text: str) -> np.ndarray:
+    words = re.findall(r"\w+", re.sub(r"<[^>]+>", " ", text).lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    return np.min(hashes[:, None] ^ _PERMUTATION_MASKS[None, :], axis=0)
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+class PackedContext:
+    """The chunks actually sent to Gemini, after dedup, budgeting and merging."""
+
+    def __init__(self, chunks: List[RetrievedChunk], chunk_ids: List[str], stats: Dict[str, int]):
+        self.chunks = chunks
+        self.chunk_ids = chunk_ids  # Every source chunk represented, including merged ones
+        self.stats = stats
+
+class ContextPacker:
+    @staticmethod
+    def _drop_duplicates(chunks: List[RetrievedChunk]) -> Tuple[List[RetrievedChunk], int]:
+        """Keeps the higher-scored copy of each near-duplicate pair (chunks arrive sorted by rerank score)."""
+        kept, signatures, normalized = [], [], []
+        for chunk in chunks:
+            text = " ".join(chunk.content.split()).lower()
+            signature = minhash_signature(chunk.content)
+            duplicate = any(
+                (text and text in other) or estimated_jaccard(signature, other_signature) >= settings.CONTEXT_DEDUP_THRESHOLD
+                for other, other_signature in zip(normalized, signatures)
+            )
+            if duplicate:
+                continue
+            kept.append(chunk)
+            signatures.append(signature)
+            normalized.append(text)
+        return kept, len(chunks) - len(kept)
+
+    @staticmethod
+    def _fill_budget(chunks: List[RetrievedChunk], budget: int) -> Tuple[List[RetrievedChunk], int]:
+        """Greedy by rerank score; a chunk that doesn't fit is skipped so smaller ones can still use the room."""
+        selected, used = [], 0
+        for chunk in chunks:
+            cost = _chunk_tokens(chunk)
+            if used + cost <= budget:
+                selected.append(chunk)
+                used += cost
+            elif not selected:
+                # Never send an empty context: the best chunk is truncated to the budget instead
+                room = max(0, budget - _chunk_tokens(chunk.model_copy(update={"content": ""})))
+                selected.append(chunk.model_copy(update={"content": chunk.content[:room * CHARS_PER_TOKEN]}))
+                used = budget
+        return selected, len(chunks) - len(selected)
+
+    @staticmethod
+    def _merge_adjacent(chunks: List[RetrievedChunk]) -> Tuple[List[RetrievedChunk], List[List[str]]]:
+        """Joins consecutive chunks (by chunk_index) of the same section into one document block."""
+        groups: Dict[Tuple[str, str], List[RetrievedChunk]] = {}
+        for chunk in chunks:
+            groups.setdefault((chunk.source_document, chunk.section_header), []).append(chunk)
+
+        merged, merged_ids = [], []
+        for section_chunks in groups.values():
+            section_chunks.sort(key=lambda c: (c.chunk_index is None, c.chunk_index or 0))
+            run = [section_chunks[0]]
+            for chunk in section_chunks[1:]:
+                previous = run[-1]
+                if chunk.chunk_index is not None and previous.chunk_index is not None and chunk.chunk_index - previous.chunk_index == 1:
+                    run.append(chunk)
+                    continue
+                merged.append(ContextPacker._join(run))
+                merged_ids.append([c.id for c in run])
+                run = [chunk]
+            merged.append(ContextPacker._join(run))
+            merged_ids.append([c.id for c in run])
+
+        # Highest-scoring block first, as before packing
+        order = sorted(range(len(merged)), key=lambda i: merged[i].score or 0.0, reverse=True)
+        return [merged[i] for i in order], [merged_ids[i] for i in order]
+
+    @staticmethod
+    def _join(run: List[RetrievedChunk]) -> RetrievedChunk:
+        if len(run) == 1:
+            return run[0]
+        return run[0].model_copy(update={
+            "content": "\n".join(c.content for c in run),
+            "score": max(c.score or 0.0 for c in run),
+        })
+
+    @staticmethod
+    def pack(chunks: List[RetrievedChunk], budget: int = None) -> PackedContext:
+        """
+        Builds the prompt context within a token budget: drops near-duplicates (MinHash), compacts
+        table HTML, fills the budget greedily by rerank score, then merges adjacent chunks of a section.
+        """
+        budget = settings.CONTEXT_TOKEN_BUDGET if budget is None else budget
+        tokens_before = sum(_chunk_tokens(c) for c in chunks)
+        if budget <= 0 or not chunks:
+            return PackedContext(chunks, [c.id for c in chunks], {"tokens_before": tokens_before, "tokens_after": tokens_before})
+
+        unique, duplicates = ContextPacker._drop_duplicates(chunks)
+        compacted = [c.model_copy(update={"content": compact_html(c.content)}) for c in unique]
+        selected, over_budget = ContextPacker._fill_budget(compacted, budget)
+        if settings.CONTEXT_MERGE_ADJACENT:
+            packed, packed_ids = ContextPacker._merge_adjacent(selected)
+        else:
+            packed, packed_ids = selected, [[c.id] for c in selected]
+
+        tokens_after = sum(_chunk_tokens(c) for c in packed)
+        stats = {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "duplicates_dropped": duplicates,
+            "budget_dropped": over_budget,
+            "merged": len(selected) - len(packed),
+        }
+        tokens_sent_total.inc(tokens_after)
+        tokens_saved_total.inc(max(0, tokens_before - tokens_after))
+        duplicates_dropped_total.inc(duplicates)
+        budget_dropped_total.inc(over_budget)
+        logger.info(
+            f"Context packed: ~{tokens_before} -> ~{tokens_after} tokens (saved {tokens_before - tokens_after}); "
+            f"{len(chunks)} chunks -> {len(packed)} blocks ({duplicates} duplicates, {over_budget} over budget, "
+            f"{stats['merged']} merged)"
+        )
+        return PackedContext(packed, [chunk_id for ids in packed_ids for chunk_id in ids], stats)
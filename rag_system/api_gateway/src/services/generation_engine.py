@@ -1,7 +1,9 @@
 import logging
+import re
 from typing import List
-from dto.response import RetrievedChunk
+from dto.response import CitationDTO, RetrievedChunk
 from integration.gemini_client import gemini_client
+from services.context_packer import document_header
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +14,7 @@ class GenerationEngine:
         context_parts = []
         for i, chunk in enumerate(chunks):
             context_parts.append(
-                f"[Document {i+1} | Source: {chunk.source_document} | Section: {chunk.section_header}]\n{chunk.content}\n"
+                f"{document_header(i + 1, chunk)}\n{chunk.content}\n"
             )
         context_str = "\n".join(context_parts)
 
@@ -46,8 +48,29 @@ class GenerationEngine:
         citation_text = "\n\n---\n**Sources:**\n" + "\n".join(unique_citations.values())
         return citation_text
 
+    @staticmethod
+    def collect_citations(chunks: List[RetrievedChunk]) -> List[CitationDTO]:
+        """Structured form of the citations appended to the stream (one per document section)."""
+        unique_citations = {}
+        for chunk in chunks:
+            key = f"{chunk.source_document} - {chunk.section_header}"
+            if key not in unique_citations:
+                unique_citations[key] = CitationDTO(
+                    source_document=chunk.source_document,
+                    section_header=chunk.section_header,
+                    page_number=chunk.page_number
+                )
+        return list(unique_citations.values())
+
+    @staticmethod
+    async def replay_response(answer: str):
+        """Streams a previously generated answer in word-sized pieces, like a live Gemini stream."""
+        for piece in re.findall(r"\S+\s*|\s+", answer):
+            yield piece
+
     @staticmethod
     async def generate_response(query: str, chunks: List[RetrievedChunk]):
+        """Streams the answer for already-packed chunks; the appended citations cover exactly those chunks."""
         if not chunks:
             yield "I could not find any relevant policy documents to answer your question."
             return
@@ -60,3 +83,8 @@ class GenerationEngine:
 
         # Append citations cleanly at the end of the stream
         yield GenerationEngine._format_citations(chunks)
+
+    @staticmethod
+    async def generate_answer(query: str, chunks: List[RetrievedChunk]) -> str:
+        """Non-streaming form of generate_response (batch endpoint)."""
+        return "".join([token async for token in GenerationEngine.generate_response(query, chunks)])
@@ -2,17 +2,29 @@ import logging
 from typing import List
 from dto.response import RetrievedChunk
 from integration.inference_client import inference_client
+from integration.vector_codec import Embedding
 from integration.qdrant_client import qdrant_client
 from core.config import settings
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 class HybridRetriever:
     @staticmethod
     async def retrieve(query: str) -> List[RetrievedChunk]:
+        embedding = await HybridRetriever.embed(query)
+        return await HybridRetriever.search(embedding)
+
+    @staticmethod
+    @traced("embed")
+    async def embed(query: str) -> Embedding:
         logger.info("Fetching embeddings for hybrid search...")
-        dense, s_idx, s_val = await inference_client.get_embedding(query)
-        
+        return await inference_client.get_embedding(query)
+
+    @staticmethod
+    @traced("search")
+    async def search(embedding: Embedding) -> List[RetrievedChunk]:
+        dense, s_idx, s_val = embedding
         logger.info("Executing Qdrant RRF hybrid search...")
         chunks = await qdrant_client.hybrid_search(
             dense_vec=dense, 
@@ -21,3 +33,50 @@ class HybridRetriever:
             limit=settings.RETRIEVAL_K
         )
         return chunks
+
+    @staticmethod
+    @traced("embed_batch")
+    async def embed_batch(queries: List[str]) -> List[Embedding]:
+        return await inference_client.get_embeddings(queries)
+
+    @staticmethod
+    @traced("search_batch")
+    async def search_batch(embeddings: List[Embedding], limit: int = None) -> List[List[RetrievedChunk]]:
+        logger.info(f"Executing {len(embeddings)} Qdrant RRF hybrid searches in one batch...")
+        return await qdrant_client.hybrid_search_batch(embeddings, limit=limit or settings.RETRIEVAL_K)
+
+    @staticmethod
+    @traced("expand")
+    async def expand_neighbors(chunks: List[RetrievedChunk]) -> List[RetrievedChunk]:
+        """
+        Adds the section neighbours of the top reranked hits, so element-sized chunks arrive with
+        their surrounding rule text. Neighbours take their hit's score and follow it in the list.
+        """
+        top = chunks[:settings.NEIGHBOR_EXPANSION_TOP_N]
+        if not top or settings.NEIGHBOR_WINDOW <= 0:
+            return chunks
+
+        neighbors = await qdrant_client.fetch_neighbors(top, settings.NEIGHBOR_WINDOW, [c.id for c in chunks])
+        attached: dict[str, List[RetrievedChunk]] = {}
+        for neighbor in neighbors:
+            # Attach to the highest-scoring hit it borders
+            anchor = next(
+                (hit for hit in top
+                 if hit.chunk_index is not None
+                 and hit.source_document == neighbor.source_document
+                 and (hit.section_id, hit.section_header) == (neighbor.section_id, neighbor.section_header)
+                 and abs(hit.chunk_index - (neighbor.chunk_index or 0)) <= settings.NEIGHBOR_WINDOW),
+                None
+            )
+            if anchor is None:
+                continue
+            neighbor.score = anchor.score
+            neighbor.expanded_from = anchor.id
+            attached.setdefault(anchor.id, []).append(neighbor)
+
+        expanded = []
+        for chunk in chunks:
+            expanded.append(chunk)
+            expanded.extend(sorted(attached.get(chunk.id, []), key=lambda c: c.chunk_index or 0))
+        logger.info(f"Neighbour expansion added {len(expanded) - len(chunks)} chunks around the top {len(top)} hits.")
+        return expanded
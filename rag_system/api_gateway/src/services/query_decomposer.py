@@ -0,0 +1,156 @@
+import logging
+import re
+from typing import List, Tuple
+from dto.response import RetrievedChunk
+from core.config import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+decomposed_total = metrics.counter("gateway_decomposed_queries_total", "Comparative queries answered from per-side sub-retrievals.")
+
+# "difference(s) [in TOPIC] between A and B", "compare A and B", "choose between A or B"
+_BETWEEN = re.compile(
+    r"\b(?:(?:differences?|distinctions?)(?:\s+in\s+(?P<topic>[^,:;?]+?))?\s+between"
+    r"|compar(?:e|ing|ison)(?:\s+(?:of|between))?(?!\s+(?:to|with)\b)"
+    r"|choose\s+between)\s+(?P<items>.+)$",
+    re.IGNORECASE,
+)
+# "A vs B", "A compared to B", "A differs from B"
+_VERSUS = re.compile(
+    r"^(?P<left>.+?)\s+(?:vs\.?|versus|compare[sd]?\s+(?:to|with)|in\s+contrast\s+to|differs?\s+from|differently\s+(?:from|than))"
+    r"\s+(?P<right>.+)$",
+    re.IGNORECASE,
+)
+# A bare "or" only separates compared items after an explicit cue: "Which is better, A or B?"
+_WHICH_CUE = re.compile(
+    r"\bwhich\b[^,:;?]*?\b(?:better|best|worse|more|less|prefer|preferable|choose|pick|higher|lower)\b[\s,:;-]*(?P<items>.+)$",
+    re.IGNORECASE,
+)
+_LIST_SEPARATOR = re.compile(r"\s*(?:,\s*(?:and\s+|or\s+)?|\s+and\s+|\s+with\s+|\s+or\s+)\s*", re.IGNORECASE)
+_OR_SEPARATOR = re.compile(r"\s*(?:,\s*(?:or\s+)?|\s+or\s+)\s*", re.IGNORECASE)
+_CLAUSE_BREAK = re.compile(r"[,:;?.!]")
+_LIST_END = re.compile(r"[:;?.!]")  # Commas separate list items, so they don't end a list
+_LEADING_FILLER = re.compile(
+    r"^(?:(?:what|which|how|why|when|is|are|does|do|did|can|could|should|would|will|tell|me|explain|"
+    r"the|a|an|there|any|between|better|more|less|about|s)\b[\s']*)+",
+    re.IGNORECASE,
+)
+# A head noun shared by the items ("maternity and paternity leave") never starts or contains these
+_NOT_HEAD = {"for", "of", "on", "in", "to", "at", "with", "from", "by", "if", "than", "the", "a", "an"}
+
+def _clean(text: str) -> str:
+    text = _LEADING_FILLER.sub("", text.strip())
+    return text.strip(" ?.!:;,'\"")
+
+def _split_clause(text: str, breaks: re.Pattern = _CLAUSE_BREAK) -> Tuple[str, str]:
+    """Splits off everything after the first clause break: ('A and B', 'which pays more')."""
+    parts = breaks.split(text, maxsplit=1)
+    return parts[0], parts[1] if len(parts) > 1 else ""
+
+def _share_head(items: List[str]) -> List[str]:
+    """
+    'maternity' / 'paternity leave policies' -> both '... leave policies': when the earlier items are
+    shorter than the last one, the last item's trailing words are the head noun they all share.
+    """
+    words = [item.split() for item in items]
+    modifier_len = max(len(w) for w in words[:-1])
+    head = words[-1][modifier_len:]
+    if not head or any(w.lower() in _NOT_HEAD for w in head):
+        return items
+    return [" ".join(w + head) for w in words[:-1]] + [items[-1]]
+
+def _resolve_one(items: List[str]) -> List[str]:
+    """'the old travel policy' vs 'the new one' -> 'new policy'."""
+    noun = items[0].split()[-1]
+    return [re.sub(r"\bones?$", noun, item, flags=re.IGNORECASE) for item in items]
+
+def _with_neighbors(chunks: List[RetrievedChunk]) -> List[List[RetrievedChunk]]:
+    """Groups each reranked hit with the expanded neighbours that follow it."""
+    groups: List[List[RetrievedChunk]] = []
+    for chunk in chunks:
+        if chunk.expanded_from is not None and groups:
+            groups[-1].append(chunk)
+        else:
+            groups.append([chunk])
+    return groups
+
+class QueryDecomposer:
+    @staticmethod
+    def decompose(query: str) -> List[str]:
+        """
+        Splits a comparative question into one sub-query per compared item, using local patterns
+        only (no extra LLM round trip). A split needs an explicit comparison cue; each side keeps
+        the shared head noun and the question's topic. Returns [] when no comparison is recognised.
+        """
+        text = query.strip()
+        items: List[str] = []
+        context: List[str] = []
+
+        match = _BETWEEN.search(text)
+        if match:
+            listed, trailing = _split_clause(match.group("items"), _LIST_END)
+            items = [_clean(item) for item in _LIST_SEPARATOR.split(listed)]
+            context = [match.group("topic") or "", trailing]
+        if len(items) < 2:
+            match = _VERSUS.match(text)
+            if match:
+                # Left item: the phrase after the last clause break; right item: up to the next one
+                leading, _, left = match.group("left").rpartition(",")
+                right, trailing = _split_clause(match.group("right"))
+                items = [_clean(left), _clean(right)]
+                context = [leading, trailing]
+        if len(items) < 2:
+            match = _WHICH_CUE.search(text)
+            if match:
+                listed, trailing = _split_clause(match.group("items"), _LIST_END)
+                items = [_clean(item) for item in _OR_SEPARATOR.split(listed)] if " or " in listed.lower() else []
+                context = [trailing]
+
+        items = [item for item in items if len(item) >= 2]
+        if len(items) < 2:
+            return []
+        items = _resolve_one(_share_head(items))
+        suffix = " ".join(c for c in (_clean(c) for c in context) if c)
+
+        sub_queries, seen = [], set()
+        for item in items:
+            sub_query = f"{item} {suffix}".strip()
+            if sub_query.lower() not in seen:
+                seen.add(sub_query.lower())
+                sub_queries.append(sub_query)
+        if len(sub_queries) < 2:
+            return []
+        return sub_queries[:settings.DECOMPOSE_MAX_SUBQUERIES]
+
+    @staticmethod
+    def fuse(
+        sub_results: List[Tuple[List[RetrievedChunk], bool]], main_chunks: List[RetrievedChunk]
+    ) -> List[RetrievedChunk]:
+        """
+        Interleaves each sub-query's reranked hits round-robin up to an equal share of RETRIEVAL_K,
+        so every side of the comparison is represented, then appends the full query's results.
+        Section neighbours ride along with their hit and don't count against the share.
+        The order is the packing priority: the context packer fills its budget in this order.
+        """
+        quota = max(1, settings.RETRIEVAL_K // max(1, len(sub_results)))
+        ranked = [_with_neighbors(chunks)[:quota] for chunks, _ in sub_results]
+
+        fused, seen = [], set()
+        for rank in range(quota):
+            for groups in ranked:
+                for chunk in groups[rank] if rank < len(groups) else []:
+                    if chunk.id not in seen:
+                        seen.add(chunk.id)
+                        fused.append(chunk)
+        for chunk in main_chunks:
+            if chunk.id not in seen:
+                seen.add(chunk.id)
+                fused.append(chunk)
+
+        decomposed_total.inc()
+        logger.info(
+            f"Fused {len(sub_results)} sub-retrievals (quota {quota}, per side "
+            f"{[len(groups) for groups in ranked]}) with the full query into {len(fused)} chunks."
+        )
+        return fused
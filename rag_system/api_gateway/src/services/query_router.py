@@ -1,14 +1,221 @@
+import asyncio
+import json
 import logging
+import os
+import random
+import time
+from typing import Awaitable, List, Optional, Sequence, Set, Tuple
+import numpy as np
 from dto.request import UserQuery
-from dto.response import RoutingDecision
-from integration.gemini_client import gemini_client
+from dto.response import RoutedQuery
+from integration.gemini_client import gemini_client, ROUTING_FAILSAFE_REASONING
+from core.config import settings
+from utils.metrics import metrics
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+local_decisions = metrics.counter("gateway_router_local_decisions_total", "Queries routed by the local classifier alone.")
+llm_decisions = metrics.counter("gateway_router_llm_decisions_total", "Queries routed by Gemini.")
+shadow_checks = metrics.counter("gateway_router_shadow_checks_total", "Sampled Gemini calls re-checking a local decision.")
+shadow_comparisons = metrics.counter("gateway_router_comparisons_total", "Queries classified by both tiers.")
+shadow_agreements = metrics.counter("gateway_router_agreements_total", "Queries where the local and Gemini labels matched.")
+latency_saved = metrics.counter("gateway_router_latency_saved_seconds_total", "Estimated Gemini routing time avoided by local decisions.")
+
+class LocalQueryClassifier:
+    """
+    Nearest-centroid classifier over L2-normalized BGE-M3 dense vectors.
+
+    Confidence is the softmax of the cosine similarities to each class centroid at a
+    temperature calibrated during training. Pure NumPy: no network access required.
+    """
+
+    def __init__(self, labels: List[str], centroids: np.ndarray, temperature: float, trained_on: int = 0):
+        self.labels = labels
+        self.centroids = centroids.astype(np.float32)
+        self.temperature = temperature
+        self.trained_on = trained_on
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def probabilities(self, vectors: np.ndarray) -> np.ndarray:
+        """(N, dim) vectors -> (N, num_labels) class probabilities."""
+        logits = (self._normalize(np.atleast_2d(vectors).astype(np.float32)) @ self.centroids.T) / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, vector) -> Tuple[str, float]:
+        probs = self.probabilities(np.asarray(vector))[0]
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, labels: Sequence[str],
+            temperatures: Sequence[float] = (0.01, 0.02, 0.03, 0.05, 0.1, 0.2)) -> "LocalQueryClassifier":
+        """Computes per-class centroids, then picks the temperature with the lowest log-loss on the training data."""
+        vectors = cls._normalize(np.asarray(vectors, dtype=np.float32))
+        classes = sorted(set(labels))
+        label_arr = np.asarray(labels)
+        centroids = cls._normalize(np.stack([vectors[label_arr == c].mean(axis=0) for c in classes]))
+
+        targets = np.array([classes.index(label) for label in labels])
+        best, best_loss = None, float("inf")
+        for temperature in temperatures:
+            candidate = cls(classes, centroids, temperature, trained_on=len(labels))
+            probs = candidate.probabilities(vectors)
+            loss = -np.mean(np.log(probs[np.arange(len(targets)), targets] + 1e-12))
+            if loss < best_loss:
+                best, best_loss = candidate, loss
+        return best
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "labels": self.labels,
+                "centroids": self.centroids.tolist(),
+                "temperature": self.temperature,
+                "trained_on": self.trained_on
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LocalQueryClassifier"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["labels"], np.asarray(data["centroids"], dtype=np.float32), data["temperature"], data.get("trained_on", 0))
+
+def _load_local_classifier() -> Optional[LocalQueryClassifier]:
+    if not settings.ROUTER_LOCAL_ENABLED:
+        return None
+    try:
+        classifier = LocalQueryClassifier.load(settings.ROUTER_MODEL_PATH)
+    except Exception as e:
+        logger.error(f"Could not load local router model from {settings.ROUTER_MODEL_PATH}: {e}")
+        return None
+    if classifier is None:
+        logger.info("No local router model found; every query will be routed by Gemini.")
+    else:
+        logger.info(f"Local router loaded ({classifier.trained_on} training queries, labels={classifier.labels}).")
+    return classifier
+
+# Strong references to in-flight shadow checks, so they aren't garbage-collected mid-call
+_shadow_tasks: Set[asyncio.Task] = set()
+
 class QueryRouter:
+    local_classifier: Optional[LocalQueryClassifier] = _load_local_classifier()
+    _llm_latency_ewma: Optional[float] = None  # Seconds, used to estimate time saved by local decisions
+
+    @staticmethod
+    async def _route_with_llm(query: str) -> RoutedQuery:
+        start = time.perf_counter()
+        decision = await gemini_client.route_query(query)
+        elapsed = time.perf_counter() - start
+        previous = QueryRouter._llm_latency_ewma
+        QueryRouter._llm_latency_ewma = elapsed if previous is None else 0.9 * previous + 0.1 * elapsed
+        source = "failsafe" if decision.reasoning == ROUTING_FAILSAFE_REASONING else "llm"
+        return RoutedQuery(**decision.model_dump(), source=source)
+
+    @staticmethod
+    def _record_comparison(local_label: str, decision: RoutedQuery):
+        # A failsafe default says nothing about the true label
+        if decision.source == "failsafe":
+            return
+        shadow_comparisons.inc()
+        if local_label == decision.query_type:
+            shadow_agreements.inc()
+
+    @staticmethod
+    async def _shadow_check(llm_decision: Awaitable[RoutedQuery], local_label: str):
+        try:
+            QueryRouter._record_comparison(local_label, await llm_decision)
+        except Exception as e:
+            logger.error(f"Shadow routing check failed: {e}")
+
     @staticmethod
-    async def route(request: UserQuery) -> RoutingDecision:
+    @traced("route")
+    async def route(request: UserQuery, embedding: Optional[Awaitable] = None) -> RoutedQuery:
+        """
+        Routes locally from the query's dense vector when the classifier is confident, otherwise via Gemini.
+        `embedding` is an awaitable of the (dense, sparse_idx, sparse_val) tuple the retriever computes anyway.
+        Gemini is only called for low-confidence queries, sampled shadow checks, or when the embedding
+        misses ROUTER_EMBED_DEADLINE_MS; in that last case both race and a confident local label still wins.
+        """
         logger.info(f"Routing query: {request.query}")
-        decision = await gemini_client.route_query(request.query)
+        classifier = QueryRouter.local_classifier
+        llm_task: Optional[asyncio.Task] = None
+
+        local_label, confidence = None, None
+        if classifier is not None and embedding is not None:
+            embed_future = asyncio.ensure_future(embedding)  # Shared with retrieval: waited on, never cancelled here
+            try:
+                done, _ = await asyncio.wait({embed_future}, timeout=settings.ROUTER_EMBED_DEADLINE_MS / 1000)
+                if not done:
+                    # A slow embedding shouldn't put embed + Gemini in series for a low-confidence query
+                    llm_task = asyncio.create_task(QueryRouter._route_with_llm(request.query))
+                    await asyncio.wait({embed_future, llm_task}, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                if llm_task is not None:
+                    llm_task.cancel()
+                raise
+
+            if embed_future.done():
+                try:
+                    local_label, confidence = classifier.predict(embed_future.result()[0])
+                except Exception as e:
+                    # The retrieval branch reports embedding failures; routing can still go through Gemini
+                    logger.error(f"Local routing unavailable, falling back to Gemini: {e}")
+
+            if confidence is not None and confidence >= settings.ROUTER_LOCAL_CONFIDENCE:
+                local_decisions.inc()
+                if QueryRouter._llm_latency_ewma is not None:
+                    latency_saved.inc(QueryRouter._llm_latency_ewma)
+                # Sampled shadow calls keep the agreement rate measurable without paying for every query
+                if random.random() < settings.ROUTER_SHADOW_RATE:
+                    shadow_checks.inc()
+                    task = asyncio.create_task(QueryRouter._shadow_check(
+                        llm_task or QueryRouter._route_with_llm(request.query), local_label
+                    ))
+                    _shadow_tasks.add(task)
+                    task.add_done_callback(_shadow_tasks.discard)
+                elif llm_task is not None:
+                    llm_task.cancel()
+
+                decision = RoutedQuery(
+                    query_type=local_label,
+                    reasoning=f"Local nearest-centroid classifier (confidence {confidence:.2f}).",
+                    source="local",
+                    confidence=confidence
+                )
+                logger.info(f"Routing decision (local): {decision.query_type} - {decision.reasoning}")
+                return decision
+
+        llm_task = llm_task or asyncio.create_task(QueryRouter._route_with_llm(request.query))
+        try:
+            decision = await llm_task
+        finally:
+            llm_task.cancel()  # No-op once done; stops the call if this request is cancelled
+        llm_decisions.inc()
+        if local_label is not None:
+            decision.confidence = confidence
+            QueryRouter._record_comparison(local_label, decision)
         logger.info(f"Routing decision: {decision.query_type} - {decision.reasoning}")
         return decision
+
+    @staticmethod
+    def stats() -> dict:
+        comparisons = shadow_comparisons.value
+        return {
+            "local_enabled": QueryRouter.local_classifier is not None,
+            "local_decisions": local_decisions.value,
+            "llm_decisions": llm_decisions.value,
+            "shadow_checks": shadow_checks.value,
+            "agreement_rate": shadow_agreements.value / comparisons if comparisons else None,
+            "comparisons": comparisons,
+            "estimated_latency_saved_seconds": latency_saved.value,
+        }
@@ -0,0 +1,97 @@
+"""
+Trains the local query router from Gemini's logged routing decisions.
+
+Usage (inside the gateway container, from src/):
+    python -m services.router_trainer [--log /app/logs/rag_events.jsonl] [--holdout 0.2]
+
+Only the local inference service is needed to embed the logged queries; no external API is called.
+The gateway picks up the new model on its next restart.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import random
+import numpy as np
+from core.config import settings
+from integration.gemini_client import ROUTING_FAILSAFE_REASONING
+from integration.inference_client import inference_client
+from integration.embedding_cache import normalize_text
+from services.query_router import LocalQueryClassifier
+from utils.event_logger import LOG_FILE, log_segments
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+def _read_lines(path: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        yield from f
+
+def load_labelled_queries(log_file: str) -> list:
+    """
+    (query, query_type) pairs labelled by Gemini, deduplicated on normalized text (latest label wins).
+    Reads the rotated (and gzipped) segments of `log_file` oldest first, then the live file.
+    """
+    labelled = {}
+    segments = log_segments(log_file)
+    for segment in segments:
+        for line in _read_lines(segment):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            # Local decisions and failsafe defaults would only teach the classifier about itself. Events
+            # logged before routing_source existed can't be told apart from failsafe defaults, so they're skipped too.
+            if event.get("routing_source") != "llm" or event.get("routing_reasoning") == ROUTING_FAILSAFE_REASONING:
+                continue
+            if not event.get("query") or not event.get("query_type"):
+                continue
+            labelled[normalize_text(event["query"])] = (event["query"], event["query_type"])
+    logger.info(f"Read {len(labelled)} labelled queries from {len(segments)} log file(s).")
+    return list(labelled.values())
+
+async def train(log_file: str, holdout: float, seed: int):
+    examples = load_labelled_queries(log_file)
+    if len({label for _, label in examples}) < 2:
+        logger.error(f"Need labelled queries for at least two query types; found {len(examples)} examples.")
+        return
+
+    embeddings = await inference_client.get_embeddings([query for query, _ in examples])
+    vectors = np.stack([dense for dense, _, _ in embeddings])
+    labels = [label for _, label in examples]
+
+    order = list(range(len(examples)))
+    random.Random(seed).shuffle(order)
+    cut = int(len(order) * holdout)
+    test, fit = order[:cut], order[cut:]
+
+    if test:
+        candidate = LocalQueryClassifier.fit(vectors[fit], [labels[i] for i in fit])
+        probs = candidate.probabilities(vectors[test])
+        predicted = [candidate.labels[j] for j in probs.argmax(axis=1)]
+        confident = probs.max(axis=1) >= settings.ROUTER_LOCAL_CONFIDENCE
+        agree = np.array([predicted[k] == labels[i] for k, i in enumerate(test)])
+        logger.info(f"Holdout agreement with Gemini: {agree.mean():.1%} over {len(test)} queries.")
+        if confident.any():
+            logger.info(
+                f"At confidence >= {settings.ROUTER_LOCAL_CONFIDENCE}: {confident.mean():.1%} of queries routed locally, "
+                f"{agree[confident].mean():.1%} agreement."
+            )
+
+    # The saved model uses every example
+    classifier = LocalQueryClassifier.fit(vectors, labels)
+    classifier.save(settings.ROUTER_MODEL_PATH)
+    logger.info(
+        f"Saved router ({len(labels)} queries, labels={classifier.labels}, "
+        f"temperature={classifier.temperature}) to {settings.ROUTER_MODEL_PATH}."
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local query router from logged Gemini decisions.")
+    parser.add_argument("--log", default=LOG_FILE)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+    asyncio.run(train(args.log, args.holdout, args.seed))
@@ -0,0 +1,117 @@
+import logging
+import time
+from typing import List, Optional
+import numpy as np
+from pydantic import BaseModel, Field
+from dto.response import CitationDTO
+from integration.qdrant_client import qdrant_client
+from core.config import settings
+from utils.metrics import metrics
+from utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+class CachedAnswer(BaseModel):
+    query: str
+    query_type: str
+    answer: str
+    citations: List[CitationDTO]
+    chunk_ids: List[str]
+    logged_chunks: List[dict]  # Same shape as the event log's retrieved_chunks
+    created_at: float = Field(default_factory=time.time)
+
+class SemanticAnswerCache:
+    """
+    Final answers keyed by the query's dense vector.
+
+    A lookup returns the most similar entry whose cosine similarity clears SEMANTIC_CACHE_THRESHOLD,
+    whose query type matches, that is younger than the TTL, and whose grounding chunks all still exist
+    in Qdrant. Expired or stale entries met on the way are evicted.
+    Point IDs are content-addressed, so an edited or deleted chunk invalidates dependent answers.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Ring buffer: slot i holds _entries[i] and row i of _vectors; the oldest slot is overwritten first
+        self._entries: List[Optional[CachedAnswer]] = [None] * max(0, max_entries)
+        self._vectors: Optional[np.ndarray] = None  # (max_entries, dim), L2-normalized rows, allocated on first store
+        self._occupied = np.zeros(max(0, max_entries), dtype=bool)
+        self._next = 0  # Slot the next store writes
+        self._filled = 0  # Slots written at least once; rows past this are never scanned
+
+        self.hits = metrics.counter("gateway_semantic_cache_hits_total", "Queries answered from the semantic cache.")
+        self.misses = metrics.counter("gateway_semantic_cache_misses_total", "Queries with no sufficiently similar cached answer.")
+        self.stale = metrics.counter("gateway_semantic_cache_stale_total", "Similar entries rejected because they expired or their chunks changed.")
+        self.size = metrics.gauge("gateway_semantic_cache_entries", "Answers held in the semantic cache.")
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, index: int):
+        self._entries[index] = None
+        self._occupied[index] = False
+        self.size.set(int(self._occupied.sum()))
+
+    @traced("semantic_cache")
+    async def lookup(self, dense_vec, query_type: Optional[str] = None) -> Optional[CachedAnswer]:
+        """`query_type` may be omitted when routing hasn't finished yet; callers then compare it themselves."""
+        if not self._occupied.any():
+            self.misses.inc()
+            return None
+
+        similarities = self._vectors[:self._filled] @ self._normalize(dense_vec)
+        similarities[~self._occupied[:self._filled]] = -np.inf
+        # Every entry above the threshold is a candidate, best first: a closer one may be expired or stale
+        above = np.flatnonzero(similarities >= self.threshold)
+        candidates = [(int(i), self._entries[i]) for i in above[np.argsort(-similarities[above], kind="stable")]]
+
+        for index, entry in candidates:
+            if query_type is not None and entry.query_type != query_type:
+                continue
+            # Slots may be reused while an earlier candidate awaits Qdrant, so only evict the entry we checked
+            if time.time() - entry.created_at > self.ttl_seconds:
+                self.stale.inc()
+                if self._entries[index] is entry:
+                    self._remove(index)
+                continue
+
+            live_ids = await qdrant_client.existing_ids(entry.chunk_ids)
+            if len(live_ids) != len(set(entry.chunk_ids)):
+                logger.info(f"Semantic cache entry for '{entry.query}' is stale (source chunks changed); evicting.")
+                self.stale.inc()
+                if self._entries[index] is entry:
+                    self._remove(index)
+                continue
+
+            logger.info(f"Semantic cache hit (cosine={similarities[index]:.3f}) for cached query '{entry.query}'.")
+            self.hits.inc()
+            return entry
+
+        self.misses.inc()
+        return None
+
+    def store(self, dense_vec, entry: CachedAnswer):
+        if self.max_entries <= 0:
+            return
+        vector = self._normalize(dense_vec)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+        # Overwrites the oldest entry once the buffer is full; no copy of the matrix
+        slot = self._next
+        self._vectors[slot] = vector
+        self._entries[slot] = entry
+        self._occupied[slot] = True
+        self._next = (slot + 1) % self.max_entries
+        self._filled = max(self._filled, slot + 1)
+        self.size.set(int(self._occupied.sum()))
+
+semantic_cache = SemanticAnswerCache(
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+)
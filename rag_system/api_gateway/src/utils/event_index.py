@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    request_id TEXT PRIMARY KEY,
+    query TEXT,
+    payload TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_indexed ON events(indexed_at);
+"""
+
+class EventIndex:
+    """SQLite copy of logged events keyed by request ID, so a single request's telemetry is one lookup."""
+
+    def __init__(self, db_path: str, max_entries: int):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inserts_since_prune = 0
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def put_many(self, events: Sequence[Tuple[str, Optional[str], str]]):
+        """`events` are (request_id, query, serialized JSON) tuples."""
+        if not events:
+            return
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?)",
+                [(request_id, query, payload, now) for request_id, query, payload in events],
+            )
+            self._inserts_since_prune += len(events)
+            if self._inserts_since_prune >= 1000:
+                self._prune(conn)
+
+    def get(self, request_id: str) -> Optional[dict]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT payload FROM events WHERE request_id = ?", (request_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _prune(self, conn: sqlite3.Connection):
+        self._inserts_since_prune = 0
+        count = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM events WHERE request_id IN (SELECT request_id FROM events ORDER BY indexed_at LIMIT ?)", (excess,)
+            )
+            logger.info(f"Event index pruned {excess} oldest entries.")
+
+def open_index(db_path: Optional[str], max_entries: int) -> Optional[EventIndex]:
+    """Opens the event index, or returns None when it's disabled or unavailable."""
+    if not db_path:
+        return None
+    try:
+        return EventIndex(db_path, max_entries)
+    except Exception as e:
+        logger.error(f"Event index unavailable at {db_path}: {e}")
+        return None
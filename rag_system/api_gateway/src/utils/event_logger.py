@@ -1,24 +1,183 @@
 import json
 import os
+import glob
+import gzip
+import shutil
 import asyncio
 from datetime import datetime
 import logging
+from typing import Dict, List, Optional
+from core.config import settings
+from utils.event_index import EventIndex, open_index
+from utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
-LOG_FILE = "/app/logs/rag_events.jsonl"
+LOG_FILE = settings.EVENT_LOG_PATH
+
+_STOP = object()
+
+class BufferedEventWriter:
+    """
+    Single-writer JSONL sink.
+
+    Requests only serialize their event and put it on a bounded queue; a background task
+    drains it into one long-lived file handle, flushing every `flush_events` events or
+    `flush_interval` seconds, whichever comes first. When the queue is full the event is
+    dropped and counted rather than making the request wait. Files past `max_bytes` are
+    rotated to a timestamped name (gzipped when `compress` is set).
+
+    Each written batch is also copied into `index` by request ID. Events still queued are
+    kept in `_pending`, so `get` finds a request's event as soon as it has been logged.
+    """
+
+    def __init__(self, path: str, queue_size: int, flush_events: int, flush_interval: float,
+                 max_bytes: int, compress: bool, index: Optional[EventIndex] = None):
+        self.path = path
+        self.queue_size = queue_size
+        self.flush_events = max(1, flush_events)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.index = index
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+        self._pending: Dict[str, str] = {}
+
+        self.written = metrics.counter("gateway_event_log_written_total", "Events written to the JSONL log.")
+        self.dropped = metrics.counter("gateway_event_log_dropped_total", "Events dropped because the log queue was full.")
+        self.rotations = metrics.counter("gateway_event_log_rotations_total", "Event log files rotated.")
+        self.queue_depth = metrics.gauge("gateway_event_log_queue_depth", "Events waiting to be written.")
+
+    def _ensure_started(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, request_id: Optional[str], query: Optional[str], line: str):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((request_id, query, line))
+        except asyncio.QueueFull:
+            self.dropped.inc()
+            return
+        if request_id:
+            self._pending[request_id] = line
+        self.queue_depth.set(self._queue.qsize())
+
+    async def get(self, request_id: str) -> Optional[dict]:
+        pending = self._pending.get(request_id)
+        if pending is not None:
+            return json.loads(pending)
+        if self.index is None:
+            return None
+        return await asyncio.to_thread(self.index.get, request_id)
+
+    async def _next_batch(self) -> List[object]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.flush_events and batch[-1] is not _STOP:
+            remaining = deadline - loop.time()
+            try:
+                batch.append(self._queue.get_nowait() if remaining <= 0 else await asyncio.wait_for(self._queue.get(), remaining))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            self.queue_depth.set(self._queue.qsize())
+            stopping = batch[-1] is _STOP
+            events = [event for event in batch if event is not _STOP]
+            try:
+                await asyncio.to_thread(self._write, [line for _, _, line in events], stopping)
+                if self.index is not None:
+                    await asyncio.to_thread(self.index.put_many, [event for event in events if event[0]])
+            except Exception as e:
+                logger.error(f"Failed to write {len(events)} events to the event log: {e}")
+            finally:
+                for request_id, _, _ in events:
+                    self._pending.pop(request_id, None)
+            if stopping:
+                return
+
+    def _write(self, lines: List[str], close: bool = False):
+        if lines:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("".join(lines))
+            self._file.flush()
+            self.written.inc(len(lines))
+            if self.max_bytes and self._file.tell() >= self.max_bytes:
+                self._rotate()
+        if close and self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        base, ext = os.path.splitext(self.path)
+        rotated = f"{base}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}{ext}"
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+            rotated = f"{rotated}.gz"
+        self.rotations.inc()
+        logger.info(f"Rotated event log to {rotated}.")
+
+    async def close(self):
+        """Writes everything still queued and closes the file. Called at gateway shutdown."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+def log_segments(path: str) -> List[str]:
+    """
+    Every file of an event log, oldest first: the segments rotated by BufferedEventWriter (timestamped,
+    so names sort chronologically), then the live file. A segment caught mid-compression is read
+    from its complete uncompressed copy.
+    """
+    base, ext = os.path.splitext(path)
+    rotated = set(glob.glob(f"{glob.escape(base)}-*{ext}")) | set(glob.glob(f"{glob.escape(base)}-*{ext}.gz"))
+    segments = sorted(f for f in rotated if not (f.endswith(".gz") and f[:-3] in rotated))
+    return segments + ([path] if os.path.exists(path) else [])
+
+_writer = BufferedEventWriter(
+    path=LOG_FILE,
+    queue_size=settings.EVENT_LOG_QUEUE_SIZE,
+    flush_events=settings.EVENT_LOG_FLUSH_EVENTS,
+    flush_interval=settings.EVENT_LOG_FLUSH_INTERVAL_S,
+    max_bytes=settings.EVENT_LOG_MAX_MB * 1024 * 1024,
+    compress=settings.EVENT_LOG_COMPRESS,
+    index=open_index(settings.EVENT_INDEX_PATH, settings.EVENT_INDEX_MAX_ENTRIES),
+)
 
 class EventLogger:
     @staticmethod
     async def log_event(event_data: dict):
-        """Writes evaluation telemetry to a JSONL file asynchronously."""
-        def write_log():
-            os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-            with open(LOG_FILE, "a", encoding="utf-8") as f:
-                event_data["timestamp"] = datetime.utcnow().isoformat()
-                f.write(json.dumps(event_data) + "\n")
-        
+        """Queues evaluation telemetry for the background JSONL writer; never waits on disk I/O."""
         try:
-            await asyncio.to_thread(write_log)
+            event_data["timestamp"] = datetime.utcnow().isoformat()
+            # Serialized now, so later mutation of the payload can't leak into the record
+            _writer.enqueue(event_data.get("request_id"), event_data.get("query"), json.dumps(event_data) + "\n")
         except Exception as e:
-            logger.error(f"Failed to write event log: {e}")
+            logger.error(f"Failed to queue event log: {e}")
+
+    @staticmethod
+    async def get_event(request_id: str) -> Optional[dict]:
+        """A logged event by request ID, whether still queued or already written."""
+        return await _writer.get(request_id)
+
+    @staticmethod
+    async def shutdown():
+        await _writer.close()
@@ -0,0 +1,73 @@
+import functools
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from utils.metrics import metrics
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class RequestTrace:
+    """
+    Per-request stage timings, in milliseconds, keyed `<stage>_ms`.
+
+    A stage recorded more than once in the same request (e.g. several concurrent
+    inference calls) accumulates, so the value is the total time spent in it.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    def record(self, stage: str, seconds: float):
+        key = f"{stage}_ms"
+        self.timings[key] = round(self.timings.get(key, 0.0) + seconds * 1000, 2)
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.started_at
+
+    def snapshot(self) -> Dict[str, float]:
+        # Background work (e.g. a cancelled speculative branch) may still record after the event is logged
+        return dict(self.timings)
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+def start_trace() -> RequestTrace:
+    """Opens a trace for the current request; tasks created afterwards inherit it."""
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+@functools.lru_cache(maxsize=None)
+def stage_histogram(stage: str):
+    return metrics.histogram(f"gateway_{stage}_seconds", f"Latency of the '{stage}' stage.", LATENCY_BUCKETS)
+
+def observe(stage: str, seconds: float, trace: Optional[RequestTrace] = None):
+    """
+    Records a duration in the stage's histogram and in the request trace: `trace` if given,
+    else the current context's (streaming bodies may run outside the context that opened it).
+    """
+    stage_histogram(stage).observe(seconds)
+    trace = trace or current_trace()
+    if trace is not None:
+        trace.record(stage, seconds)
+
+async def timed(stage: str, awaitable):
+    """Awaits `awaitable`, recording its wall-clock duration under `stage`."""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+def traced(stage: str):
+    """Decorator form of `timed` for coroutine functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await timed(stage, fn(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The gateway imports its modules relative to src/ (PYTHONPATH=/app/src in the image)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,51 @@
+import pytest
+from dto.response import RetrievedChunk
+from services.query_decomposer import QueryDecomposer
+
+@pytest.mark.parametrize("query", [
+    "Who do I contact if I am sick or injured at work?",
+    "Can I work from home one or two days a week?",
+    "What should I do if I lose my badge or ID card?",
+    "How many vacation days do I get?",
+])
+def test_plain_questions_are_not_split(query):
+    assert QueryDecomposer.decompose(query) == []
+
+@pytest.mark.parametrize("query, expected", [
+    ("What is the difference between sick leave and special leave?", ["sick leave", "special leave"]),
+    ("Sick leave vs special leave: which pays more?", ["Sick leave pays more", "special leave pays more"]),
+    ("Which is better, sick leave or special leave?", ["sick leave", "special leave"]),
+    ("How does the old travel policy compare to the new one?", ["old travel policy", "new policy"]),
+])
+def test_comparisons_split_per_item(query, expected):
+    assert QueryDecomposer.decompose(query) == expected
+
+@pytest.mark.parametrize("query, expected", [
+    ("What is the difference in pay between casual and permanent staff?", ["casual staff pay", "permanent staff pay"]),
+    ("Compare the maternity and paternity leave policies", ["maternity leave policies", "paternity leave policies"]),
+    ("What are the differences between the 2019 and 2023 telework policies?", ["2019 telework policies", "2023 telework policies"]),
+    ("Compare vacation, bereavement and parental leave.", ["vacation leave", "bereavement leave", "parental leave"]),
+])
+def test_items_keep_shared_head_and_topic(query, expected):
+    assert QueryDecomposer.decompose(query) == expected
+
+def _chunk(chunk_id: str) -> RetrievedChunk:
+    return RetrievedChunk(id=chunk_id, content=chunk_id, source_document="doc", section_header="s", page_number="1", score=1.0)
+
+def test_fuse_interleaves_sides_before_full_query_hits():
+    sick = [_chunk("sick-1"), _chunk("shared"), _chunk("sick-2")]
+    special = [_chunk("special-1"), _chunk("special-2")]
+    main = [_chunk("shared"), _chunk("main-1")]
+
+    fused = QueryDecomposer.fuse([(sick, True), (special, True)], main)
+
+    assert [c.id for c in fused] == ["sick-1", "special-1", "shared", "special-2", "sick-2", "main-1"]
+
+def test_fuse_keeps_neighbours_with_their_hit_outside_the_quota():
+    neighbour = _chunk("sick-1-next").model_copy(update={"expanded_from": "sick-1"})
+    sick = [_chunk("sick-1"), neighbour, _chunk("sick-2")]
+    special = [_chunk("special-1")]
+
+    fused = QueryDecomposer.fuse([(sick, True), (special, True)], [])
+
+    assert [c.id for c in fused] == ["sick-1", "sick-1-next", "special-1", "sick-2"]
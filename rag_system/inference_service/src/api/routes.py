@@ -1,23 +1,76 @@
-from fastapi import APIRouter
-from dto.request import EmbedRequest, RerankRequest
-from dto.response import EmbedResponse, RerankResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from dto.request import EmbedRequest, RerankRequest, EmbedBatchRequest, RerankBatchRequest
+from dto.response import EmbedResponse, RerankResponse, EmbedBatchResponse, RerankBatchResponse
 from services.embedding_engine import EmbeddingEngine
 from services.reranking_engine import RerankingEngine
+from services.batch_scheduler import MicroBatcher
+from core.config import settings
+from utils.vector_codec import MEDIA_TYPE as VECTOR_MEDIA_TYPE, accepts_binary, encode_embeddings
 
 router = APIRouter()
 embed_engine = EmbeddingEngine()
 rerank_engine = RerankingEngine()
 
-@router.post("/embed", response_model=EmbedResponse)
-def generate_embedding(request: EmbedRequest):
-    dense, s_idx, s_val = embed_engine.embed(request.text)
+# Concurrent requests are coalesced into shared forward passes
+embed_batcher = MicroBatcher(
+    name="embed",
+    process_fn=embed_engine.embed_batch,
+    max_batch_size=settings.EMBED_MAX_BATCH_SIZE,
+    max_wait_ms=settings.BATCH_WINDOW_MS,
+    enabled=settings.BATCHING_ENABLED,
+    concurrency=max(1, settings.INFERENCE_WORKERS),
+)
+rerank_batcher = MicroBatcher(
+    name="rerank",
+    process_fn=rerank_engine.rerank_batch,
+    max_batch_size=settings.RERANK_MAX_BATCH_SIZE,
+    max_wait_ms=settings.BATCH_WINDOW_MS,
+    cost_fn=lambda group: max(1, len(group[1])),  # Batch budget is counted in (query, doc) pairs
+    enabled=settings.BATCHING_ENABLED,
+    concurrency=max(1, settings.INFERENCE_WORKERS),
+)
+
+def _to_embed_response(dense, s_idx, s_val) -> EmbedResponse:
     return EmbedResponse(
-        dense_vector=dense,
+        dense_vector=dense.tolist(),
         sparse_indices=s_idx,
         sparse_values=s_val
     )
 
+@router.post("/embed", response_model=EmbedResponse)
+async def generate_embedding(request: EmbedRequest, http_request: Request):
+    result = await embed_batcher.run(request.text)
+    if accepts_binary(http_request.headers.get("accept")):
+        return Response(content=encode_embeddings([result]), media_type=VECTOR_MEDIA_TYPE)
+    return _to_embed_response(*result)
+
 @router.post("/rerank", response_model=RerankResponse)
-def generate_rerank_scores(request: RerankRequest):
-    scores = rerank_engine.rerank(request.query, request.documents)
+async def generate_rerank_scores(request: RerankRequest):
+    if not request.documents:
+        return RerankResponse(scores=[])
+    scores = await rerank_batcher.run((request.query, request.documents))
     return RerankResponse(scores=scores)
+
+@router.post("/embed/batch", response_model=EmbedBatchResponse)
+async def generate_embeddings_batch(request: EmbedBatchRequest, http_request: Request):
+    if len(request.texts) > settings.MAX_BATCH_REQUEST_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.MAX_BATCH_REQUEST_ITEMS} texts per batch")
+
+    # Items go through the shared batcher so they coalesce with concurrent single-text traffic
+    results = await embed_batcher.run_many(request.texts)
+    if accepts_binary(http_request.headers.get("accept")):
+        return Response(content=encode_embeddings(results), media_type=VECTOR_MEDIA_TYPE)
+    return EmbedBatchResponse(embeddings=[_to_embed_response(*result) for result in results])
+
+@router.post("/rerank/batch", response_model=RerankBatchResponse)
+async def generate_rerank_scores_batch(request: RerankBatchRequest):
+    total_pairs = sum(len(group.documents) for group in request.groups)
+    if total_pairs > settings.MAX_BATCH_REQUEST_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.MAX_BATCH_REQUEST_ITEMS} (query, document) pairs per batch")
+
+    non_empty = [group for group in request.groups if group.documents]
+    scored = iter(await rerank_batcher.run_many([(group.query, group.documents) for group in non_empty]))
+    return RerankBatchResponse(results=[
+        RerankResponse(scores=next(scored) if group.documents else [])
+        for group in request.groups
+    ])
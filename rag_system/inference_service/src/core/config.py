@@ -0,0 +1,47 @@
+import os
+
+class Settings:
+    PROJECT_NAME = "RAG Inference Microservice"
+
+    # Dynamic micro-batching: concurrent requests arriving within the window are
+    # coalesced into a single padded forward pass.
+    BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "true").lower() == "true"
+    EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", 32))  # texts per forward pass
+    RERANK_MAX_BATCH_SIZE = int(os.getenv("RERANK_MAX_BATCH_SIZE", 64))  # (query, doc) pairs per forward pass
+    BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", 10))  # Max time to wait for a batch to fill
+
+    # Upper bound on inputs accepted by a single /embed/batch or /rerank/batch call
+    MAX_BATCH_REQUEST_ITEMS = int(os.getenv("MAX_BATCH_REQUEST_ITEMS", 512))
+
+    # Model runtime: "torch" (FlagEmbedding FP32, the reference) or "onnx" (exported graph on ONNX Runtime)
+    INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+    ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "/app/onnx_models")  # Exported on first start if missing
+    ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() == "true"  # Dynamic INT8 weights
+    ONNX_THREADS = int(os.getenv("ONNX_THREADS", 0))  # intra-op threads; 0 lets ONNX Runtime decide
+    EMBED_MAX_LENGTH = int(os.getenv("EMBED_MAX_LENGTH", 8192))  # Tokens per text (FlagEmbedding default)
+    RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", 512))  # Tokens per (query, doc) pair
+
+    # Worker-pool mode: N forked model processes behind a least-loaded dispatcher (0 keeps models in-process)
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 0))
+    INFERENCE_WORKER_THREADS = int(os.getenv("INFERENCE_WORKER_THREADS", 0))  # intra-op threads per worker; 0 = cores / workers
+    INFERENCE_PIN_CORES = os.getenv("INFERENCE_PIN_CORES", "true").lower() == "true"  # Give each worker its own cores
+
+    # Startup: load both models and run dummy forward passes before /ready passes
+    MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+    # Token lengths of the warm-up passes (short query, typical chunk, reranker cap)
+    WARMUP_SEQ_LENGTHS = [int(n) for n in os.getenv("WARMUP_SEQ_LENGTHS", "16,256,512").split(",") if n.strip()]
+    # Pre-baked weights (<dir>/bge-m3, <dir>/bge-reranker-base) are used instead of the HuggingFace hub when present
+    LOCAL_MODEL_DIR = os.getenv("LOCAL_MODEL_DIR", "/app/models")
+
+    # Embedding model identity (part of every embedding cache key)
+    EMBEDDING_MODEL_ID = "BAAI/bge-m3"
+    # Quantized vectors drift slightly from the reference, so they get their own cache namespace
+    EMBEDDING_CACHE_MODEL_ID = EMBEDDING_MODEL_ID + (
+        "" if INFERENCE_BACKEND == "torch" else f"+onnx{'-int8' if ONNX_QUANTIZE else ''}"
+    )
+
+    # Persistent embedding tier, shareable with ingestion via a common volume (empty path disables it)
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "/app/embedding_cache/bge_m3.db")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500000))
+
+settings = Settings()
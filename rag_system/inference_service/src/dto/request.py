@@ -7,3 +7,9 @@ class EmbedRequest(BaseModel):
 class RerankRequest(BaseModel):
     query: str
     documents: List[str]
+
+class EmbedBatchRequest(BaseModel):
+    texts: List[str]
+
+class RerankBatchRequest(BaseModel):
+    groups: List[RerankRequest]
@@ -8,3 +8,9 @@ class EmbedResponse(BaseModel):
 
 class RerankResponse(BaseModel):
     scores: List[float]
+
+class EmbedBatchResponse(BaseModel):
+    embeddings: List[EmbedResponse]
+
+class RerankBatchResponse(BaseModel):
+    results: List[RerankResponse]
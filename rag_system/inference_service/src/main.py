@@ -1,6 +1,12 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+import time
 import logging
-from api.routes import router
+from core.config import settings
+from services.model_warmup import readiness
+from api.routes import router, embed_engine, rerank_engine
+from services.worker_pool import worker_pool
+from utils.metrics import metrics
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -8,6 +14,35 @@ app = FastAPI(title="RAG Inference Microservice")
 
 app.include_router(router)
 
+@app.on_event("startup")
+def load_models():
+    # Worker mode forks here, on the main thread before any request, batcher or warm-up thread exists;
+    # start() returns once every worker has loaded and warmed up its models
+    if settings.INFERENCE_WORKERS > 0:
+        start = time.monotonic()
+        worker_pool.start()
+        readiness.timings["pool_start_s"] = time.monotonic() - start
+    # Single-process mode loads and warms up in the background; /ready gates traffic
+    readiness.start(embed_engine, rerank_engine)
+
+@app.on_event("shutdown")
+def stop_worker_pool():
+    worker_pool.shutdown()
+
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "service": "inference_engine"}
+    """Liveness: the process is up, whether or not the models are loaded yet."""
+    status = {"status": "healthy", "service": "inference_engine", "models": readiness.state}
+    if worker_pool.started:
+        status["workers"] = worker_pool.stats()
+    return status
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness: passes only once both models are loaded and warmed up."""
+    return JSONResponse(status_code=200 if readiness.ready else 503, content=readiness.snapshot())
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition of batching and model metrics."""
+    return metrics.render()
@@ -0,0 +1,176 @@
+"""
+Compares an inference backend against the PyTorch reference: output parity, throughput and memory.
+
+Usage (inside the inference container):
+    python -m services.backend_parity [--candidate onnx] [--texts corpus.txt] [--iterations 5]
+
+Each backend is loaded in its own subprocess so resident memory is measured in isolation.
+Reports dense cosine drift, sparse (lexical) cosine, rerank Spearman correlation and top-1
+agreement, tokens/s for both models, and peak RSS. Exits non-zero if parity falls below
+--min-cosine / --min-spearman.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+SAMPLE_TEXTS = [
+    "Employees are entitled to annual vacation leave based on their years of continuous service.",
+    "A bilingual designated position requires an advanced level of French oral proficiency.",
+    "Requests for leave without pay must be submitted to your supervisor at least four weeks in advance.",
+    "Long Term Disability coverage continues for up to 24 months during a paid leave of absence.",
+    "Do not post or share concerning client information on social media; speak with your manager.",
+    "Overtime must be pre-approved and is compensated at one and one-half times the regular rate.",
+    "The employer will reimburse reasonable travel expenses incurred while on government business.",
+    "Sick leave credits accumulate at a rate of one and one-half days per month of service.",
+    "Harassment complaints may be filed with the respectful workplace office within one year.",
+    "Employees relocating at the request of the employer are eligible for relocation assistance.",
+    "Bereavement leave of up to five days is granted on the death of an immediate family member.",
+    "Flexible work arrangements are subject to operational requirements and manager approval.",
+]
+SAMPLE_QUERIES = [
+    "How many vacation days do I get?",
+    "What French level is needed for a bilingual job?",
+    "What happens to my disability insurance during unpaid leave?",
+    "Can I post about clients online?",
+]
+
+def _rss_mb() -> dict:
+    """Current and peak resident set size from /proc (Linux)."""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, amount = line.split(":")
+                values[key] = int(amount.split()[0]) / 1024
+    return {"rss_mb": values.get("VmRSS", 0.0), "peak_rss_mb": values.get("VmHWM", 0.0)}
+
+def _token_count(tokenizer, texts) -> int:
+    return sum(len(ids) for ids in tokenizer(texts, truncation=True)["input_ids"])
+
+def run_worker(backend: str, texts: list, queries: list, iterations: int, out_path: str):
+    from services.model_backends import load_embedding_backend, load_rerank_backend
+
+    baseline_rss = _rss_mb()["rss_mb"]
+    start = time.perf_counter()
+    embedder = load_embedding_backend(backend)
+    reranker = load_rerank_backend(backend)
+    load_s = time.perf_counter() - start
+
+    embeddings = embedder.encode(texts)  # Warm-up pass doubles as the parity sample
+    start = time.perf_counter()
+    for _ in range(iterations):
+        embedder.encode(texts)
+    embed_s = (time.perf_counter() - start) / iterations
+
+    pairs = [[query, text] for query in queries for text in texts]
+    scores = reranker.score(pairs)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        reranker.score(pairs)
+    rerank_s = (time.perf_counter() - start) / iterations
+
+    rerank_tokens = sum(
+        len(ids) for ids in reranker.tokenizer([q for q, _ in pairs], [d for _, d in pairs], truncation=True)["input_ids"]
+    )
+    result = {
+        "backend": backend,
+        "load_s": load_s,
+        "embed_tokens_per_s": _token_count(embedder.tokenizer, texts) / embed_s,
+        "rerank_tokens_per_s": rerank_tokens / rerank_s,
+        "embed_batch_ms": embed_s * 1000,
+        "rerank_batch_ms": rerank_s * 1000,
+        "model_rss_mb": _rss_mb()["rss_mb"] - baseline_rss,
+        **_rss_mb(),
+        "dense": [dense.tolist() for dense, _, _ in embeddings],
+        "sparse": [dict(zip(map(str, idx), vals)) for _, idx, vals in embeddings],
+        "scores": [float(s) for s in scores],
+    }
+    with open(out_path, "w") as f:
+        json.dump(result, f)
+
+def _spearman(a, b) -> float:
+    rank_a = np.argsort(np.argsort(a))
+    rank_b = np.argsort(np.argsort(b))
+    if np.std(rank_a) == 0 or np.std(rank_b) == 0:
+        return 1.0
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+def _sparse_cosine(a: dict, b: dict) -> float:
+    dot = sum(v * b.get(k, 0.0) for k, v in a.items())
+    norm = np.sqrt(sum(v * v for v in a.values())) * np.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 1.0
+
+def _run_backend(backend: str, args) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        out_path = tmp.name
+    cmd = [sys.executable, "-m", "services.backend_parity", "--worker", backend, "--out", out_path,
+           "--iterations", str(args.iterations)]
+    if args.texts:
+        cmd += ["--texts", args.texts]
+    subprocess.run(cmd, check=True)
+    with open(out_path) as f:
+        result = json.load(f)
+    os.remove(out_path)
+    return result
+
+def compare(args) -> int:
+    base = _run_backend(args.baseline, args)
+    cand = _run_backend(args.candidate, args)
+
+    cosines = [float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))) for a, b in zip(base["dense"], cand["dense"])]
+    sparse = [_sparse_cosine(a, b) for a, b in zip(base["sparse"], cand["sparse"])]
+
+    texts = _load_texts(args.texts)
+    per_query = len(texts)
+    spearman, top1 = [], []
+    for q in range(len(SAMPLE_QUERIES)):
+        a = base["scores"][q * per_query:(q + 1) * per_query]
+        b = cand["scores"][q * per_query:(q + 1) * per_query]
+        spearman.append(_spearman(a, b))
+        top1.append(int(np.argmax(a) == np.argmax(b)))
+
+    print(f"\nParity: {args.candidate} vs {args.baseline} ({len(cosines)} texts, {len(SAMPLE_QUERIES)} rerank queries)")
+    print(f"  Dense cosine     mean {np.mean(cosines):.5f}  min {np.min(cosines):.5f}  (drift {1 - np.mean(cosines):.2e})")
+    print(f"  Sparse cosine    mean {np.mean(sparse):.5f}  min {np.min(sparse):.5f}")
+    print(f"  Rerank Spearman  mean {np.mean(spearman):.4f}  min {np.min(spearman):.4f}  top-1 agreement {np.mean(top1):.0%}")
+    max_score_diff = float(np.max(np.abs(np.array(base["scores"]) - np.array(cand["scores"]))))
+    print(f"  Rerank |score diff| max {max_score_diff:.4f}")
+
+    print(f"\n{'backend':>10} {'load s':>7} {'embed tok/s':>12} {'rerank tok/s':>13} {'embed ms':>9} {'rerank ms':>10} {'model MB':>9} {'peak MB':>8}")
+    for r in (base, cand):
+        print(
+            f"{r['backend']:>10} {r['load_s']:>7.1f} {r['embed_tokens_per_s']:>12.0f} {r['rerank_tokens_per_s']:>13.0f} "
+            f"{r['embed_batch_ms']:>9.1f} {r['rerank_batch_ms']:>10.1f} {r['model_rss_mb']:>9.0f} {r['peak_rss_mb']:>8.0f}"
+        )
+
+    ok = np.min(cosines) >= args.min_cosine and np.min(spearman) >= args.min_spearman
+    print(f"\nParity {'PASSED' if ok else 'FAILED'} (min cosine >= {args.min_cosine}, min Spearman >= {args.min_spearman})")
+    return 0 if ok else 1
+
+def _load_texts(path: str) -> list:
+    if not path:
+        return SAMPLE_TEXTS
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parity and performance check of an inference backend against PyTorch.")
+    parser.add_argument("--baseline", default="torch")
+    parser.add_argument("--candidate", default="onnx")
+    parser.add_argument("--texts", default=None, help="File with one passage per line (defaults to built-in HR samples).")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--min-spearman", type=float, default=0.95)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--out", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, _load_texts(args.texts), SAMPLE_QUERIES, args.iterations, args.out)
+    else:
+        sys.exit(compare(args))
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+from utils.metrics import LATENCY_BUCKETS, metrics
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class _PendingItem:
+    __slots__ = ("item", "cost", "future", "enqueued_at")
+
+    def __init__(self, item: Any, cost: int):
+        self.item = item
+        self.cost = cost
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into a single model forward pass.
+
+    A dedicated worker thread waits for the first request, then keeps collecting
+    requests until either `max_wait_ms` has elapsed since that first arrival or the
+    accumulated cost reaches `max_batch_size`. `process_fn` receives the list of
+    items and must return one result per item, in order; each caller gets its own slice.
+    With `concurrency` > 1, up to that many batches are processed at once (one per model worker).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        cost_fn: Optional[Callable[[Any], int]] = None,
+        enabled: bool = True,
+        concurrency: int = 1,
+    ):
+        self.name = name
+        self.process_fn = process_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.cost_fn = cost_fn or (lambda item: 1)
+        self.enabled = enabled
+        self.concurrency = max(1, concurrency)
+
+        self._queue: "queue.Queue[_PendingItem]" = queue.Queue()
+        self._carry: Optional[_PendingItem] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # The next batch is only collected once a slot frees up, so it keeps filling meanwhile
+        self._slots = threading.Semaphore(self.concurrency)
+        self._executor = (
+            ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"{name}-batch")
+            if self.concurrency > 1 else None
+        )
+
+        self.queue_depth = metrics.gauge(
+            f"inference_{name}_queue_depth", f"Requests waiting for the next {name} batch."
+        )
+        self.batch_size = metrics.histogram(
+            f"inference_{name}_batch_size", f"Items ({name} inputs) per forward pass.", BATCH_SIZE_BUCKETS
+        )
+        self.batch_requests = metrics.histogram(
+            f"inference_{name}_batch_requests", f"Caller requests coalesced per {name} forward pass.", BATCH_SIZE_BUCKETS
+        )
+        self.queue_wait = metrics.histogram(
+            f"inference_{name}_queue_wait_seconds", f"Time a {name} request waited before its batch started.", LATENCY_BUCKETS
+        )
+        self.batch_duration = metrics.histogram(
+            f"inference_{name}_batch_seconds", f"Time to process one {name} batch (lookups plus forward pass).", LATENCY_BUCKETS
+        )
+        self.request_duration = metrics.histogram(
+            f"inference_{name}_request_seconds", f"End-to-end latency of a {name} call through the batcher.", LATENCY_BUCKETS
+        )
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+                logger.info(
+                    f"Started '{self.name}' micro-batcher (max_batch_size={self.max_batch_size}, "
+                    f"window={self.max_wait * 1000:.1f}ms, concurrency={self.concurrency})"
+                )
+
+    def submit(self, item: Any) -> Future:
+        """Enqueues a single item and returns a future resolving to its result."""
+        self._ensure_started()
+        pending = _PendingItem(item, self.cost_fn(item))
+        self._queue.put(pending)
+        self.queue_depth.inc()
+        return pending.future
+
+    async def run(self, item: Any) -> Any:
+        """Awaitable entry point for request handlers."""
+        start = time.monotonic()
+        try:
+            if not self.enabled:
+                results = await asyncio.to_thread(self._process, [item])
+                return results[0]
+            return await asyncio.wrap_future(self.submit(item))
+        finally:
+            self.request_duration.observe(time.monotonic() - start)
+
+    async def run_many(self, items: List[Any]) -> List[Any]:
+        """Submits several items at once; they may be split across or share batches with other callers."""
+        if not items:
+            return []
+        start = time.monotonic()
+        try:
+            if not self.enabled:
+                return await asyncio.to_thread(self._process, list(items))
+            futures = [asyncio.wrap_future(self.submit(item)) for item in items]
+            return list(await asyncio.gather(*futures))
+        finally:
+            self.request_duration.observe(time.monotonic() - start)
+
+    def _process(self, items: List[Any]) -> List[Any]:
+        start = time.monotonic()
+        try:
+            return self.process_fn(items)
+        finally:
+            self.batch_duration.observe(time.monotonic() - start)
+
+    def _next_item(self, timeout: Optional[float]) -> Optional[_PendingItem]:
+        if self._carry is not None:
+            pending, self._carry = self._carry, None
+            return pending
+        try:
+            pending = self._queue.get(timeout=timeout) if timeout is None or timeout > 0 else self._queue.get_nowait()
+        except queue.Empty:
+            return None
+        self.queue_depth.dec()
+        return pending
+
+    def _collect_batch(self) -> List[_PendingItem]:
+        first = self._next_item(timeout=None)
+        batch = [first]
+        total_cost = first.cost
+        deadline = first.enqueued_at + self.max_wait
+
+        while total_cost < self.max_batch_size:
+            pending = self._next_item(timeout=deadline - time.monotonic())
+            if pending is None:
+                break
+            if total_cost + pending.cost > self.max_batch_size:
+                # Doesn't fit: it opens the next batch instead
+                self._carry = pending
+                break
+            batch.append(pending)
+            total_cost += pending.cost
+
+        return batch
+
+    def _run(self):
+        while True:
+            self._slots.acquire()
+            batch = self._collect_batch()
+            self.batch_size.observe(sum(p.cost for p in batch))
+            self.batch_requests.observe(len(batch))
+            started_at = time.monotonic()
+            for pending in batch:
+                self.queue_wait.observe(started_at - pending.enqueued_at)
+
+            if self._executor is None:
+                self._complete(batch)
+            else:
+                self._executor.submit(self._complete, batch)
+
+    def _complete(self, batch: List[_PendingItem]):
+        try:
+            results = self._process([p.item for p in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"'{self.name}' batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error(f"'{self.name}' batch of {len(batch)} failed: {e}")
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for pending, result in zip(batch, results):
+            pending.future.set_result(result)
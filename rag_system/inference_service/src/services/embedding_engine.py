@@ -1,40 +1,90 @@
 import logging
-from FlagEmbedding import BGEM3FlagModel
+import threading
+import time
+import numpy as np
+from core.config import settings
+from services.embedding_store import normalize_text, open_store
+from services.model_backends import load_embedding_backend
+from services.worker_pool import worker_pool
+from utils.metrics import LATENCY_BUCKETS, metrics
 
 logger = logging.getLogger(__name__)
 
+store_hits = metrics.counter("inference_embedding_store_hits_total", "Texts served from the persistent embedding store.")
+store_misses = metrics.counter("inference_embedding_store_misses_total", "Texts that required a BGE-M3 forward pass.")
+forward_duration = metrics.histogram(
+    "inference_embed_forward_seconds", "Duration of one BGE-M3 encode call.", LATENCY_BUCKETS
+)
+
 class EmbeddingEngine:
     _instance = None
     _model = None
+    _load_lock = threading.Lock()  # Startup warm-up and an early request must not both load
+    _store = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(EmbeddingEngine, cls).__new__(cls)
+            cls._store = open_store(
+                settings.EMBEDDING_CACHE_PATH,
+                settings.EMBEDDING_CACHE_MODEL_ID,
+                settings.EMBEDDING_CACHE_MAX_ENTRIES
+            )
         return cls._instance
 
     def get_model(self):
         if self._model is None:
-            logger.info("Loading BGE-M3 model into memory (CPU)...")
-            # use_fp16=False is mandatory for stable CPU execution
-            self._model = BGEM3FlagModel('BAAI/bge-m3', use_fp16=False)
-            logger.info("BGE-M3 loaded.")
+            with self._load_lock:
+                if self._model is not None:
+                    return self._model
+                if settings.INFERENCE_WORKERS > 0:
+                    # Forward passes are dispatched to the model worker processes
+                    worker_pool.start()
+                    self._model = worker_pool
+                    return self._model
+                logger.info(f"Loading BGE-M3 model into memory (CPU, {settings.INFERENCE_BACKEND} backend)...")
+                self._model = load_embedding_backend()
+                logger.info("BGE-M3 loaded.")
         return self._model
 
-    def embed(self, text: str) -> tuple[list[float], list[int], list[float]]:
-        model = self.get_model()
-        
-        output = model.encode(
-            [text], 
-            return_dense=True, 
-            return_sparse=True, 
-            return_colbert_vecs=False
-        )
+    def embed(self, text: str) -> tuple[np.ndarray, list[int], list[float]]:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: list[str]) -> list[tuple[np.ndarray, list[int], list[float]]]:
+        """
+        Embeds texts, serving repeats from the persistent store and encoding only the misses
+        in a single padded forward pass. Dense vectors stay as float32 arrays.
+        """
+        if not texts:
+            return []
 
-        dense_vec = output['dense_vecs'][0].tolist()
-        lexical_weights = output['lexical_weights'][0]
+        # Normalized text is only the lookup key; the model always sees the original text
+        keys = [normalize_text(text) for text in texts]
+        results = self._store.get_many(keys) if self._store else {}
+        store_hits.inc(len(results))
 
-        # Qdrant schema requirements
-        sparse_indices = [int(k) for k in lexical_weights.keys()]
-        sparse_values = [float(v) for v in lexical_weights.values()]
+        # Texts with the same key within one batch are encoded once
+        pending: dict[str, list[int]] = {}
+        for i, key in enumerate(keys):
+            if i not in results:
+                pending.setdefault(key, []).append(i)
 
-        return dense_vec, sparse_indices, sparse_values
+        if pending:
+            unique_keys = list(pending)
+            store_misses.inc(len(unique_keys))
+            encoded = self._encode([texts[pending[key][0]] for key in unique_keys])
+            if self._store:
+                self._store.put_many(unique_keys, encoded)
+            for key, embedding in zip(unique_keys, encoded):
+                for i in pending[key]:
+                    results[i] = embedding
+
+        return [results[i] for i in range(len(texts))]
+
+    def _encode(self, texts: list[str]) -> list[tuple[np.ndarray, list[int], list[float]]]:
+        model = self.get_model()
+        
+        start = time.monotonic()
+        results = model.encode(texts)
+        forward_duration.observe(time.monotonic() - start)
+        return results
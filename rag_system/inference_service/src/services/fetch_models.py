@@ -0,0 +1,32 @@
+"""
+Downloads the inference models into a local directory so the service can start without network access.
+
+Usage:
+    python -m services.fetch_models [--out /app/models]
+
+Standalone on purpose: the Dockerfile runs it before the rest of the source is copied, so
+baked weights survive code changes in the layer cache. Point LOCAL_MODEL_DIR at the output.
+"""
+import os
+import argparse
+from huggingface_hub import snapshot_download
+
+# Subdirectory names must match BGE_M3_DIR / RERANKER_DIR in services/model_backends.py
+MODELS = {
+    "bge-m3": "BAAI/bge-m3",
+    "bge-reranker-base": "BAAI/bge-reranker-base",
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the inference model weights for offline startup.")
+    parser.add_argument("--out", default=os.getenv("LOCAL_MODEL_DIR", "/app/models"))
+    args = parser.parse_args()
+
+    for model_dir, repo_id in MODELS.items():
+        path = snapshot_download(
+            repo_id,
+            local_dir=os.path.join(args.out, model_dir),
+            # Skip the duplicate ONNX / non-PyTorch weight files the hub repos also carry
+            ignore_patterns=["*.onnx", "onnx/*", "*.onnx_data", "*.h5", "*.msgpack", "*.ot"],
+        )
+        print(f"{repo_id} -> {path}")
@@ -0,0 +1,172 @@
+import os
+import logging
+import numpy as np
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Embedding = tuple[np.ndarray, list[int], list[float]]
+
+BGE_M3_DIR = "bge-m3"
+RERANKER_DIR = "bge-reranker-base"
+RERANKER_MODEL_ID = "BAAI/bge-reranker-base"
+
+def model_source(model_id: str, model_dir: str) -> str:
+    """Pre-baked local weights win over the HuggingFace hub, so startup needs no network."""
+    if settings.LOCAL_MODEL_DIR:
+        path = os.path.join(settings.LOCAL_MODEL_DIR, model_dir)
+        if os.path.isdir(path):
+            return path
+    return model_id
+
+def onnx_model_path(model_dir: str, quantized: bool) -> str:
+    return os.path.join(settings.ONNX_MODEL_DIR, model_dir, "model.int8.onnx" if quantized else "model.onnx")
+
+class TorchEmbeddingBackend:
+    """BGE-M3 through FlagEmbedding's PyTorch FP32 model (the reference implementation)."""
+
+    name = "torch"
+
+    def __init__(self):
+        from FlagEmbedding import BGEM3FlagModel
+        # use_fp16=False is mandatory for stable CPU execution
+        self.model = BGEM3FlagModel(model_source(settings.EMBEDDING_MODEL_ID, BGE_M3_DIR), use_fp16=False)
+        self.tokenizer = self.model.tokenizer
+
+    def encode(self, texts: list[str]) -> list[Embedding]:
+        output = self.model.encode(
+            texts,
+            batch_size=len(texts),
+            max_length=settings.EMBED_MAX_LENGTH,
+            return_dense=True,
+            return_sparse=True,
+            return_colbert_vecs=False
+        )
+        results = []
+        for dense, lexical_weights in zip(output['dense_vecs'], output['lexical_weights']):
+            # Qdrant schema requirements
+            sparse_indices = [int(k) for k in lexical_weights.keys()]
+            sparse_values = [float(v) for v in lexical_weights.values()]
+            results.append((dense.astype(np.float32, copy=False), sparse_indices, sparse_values))
+        return results
+
+class TorchRerankBackend:
+    """bge-reranker-base through FlagEmbedding's PyTorch FP32 cross-encoder."""
+
+    name = "torch"
+
+    def __init__(self):
+        from FlagEmbedding import FlagReranker
+        self.model = FlagReranker(model_source(RERANKER_MODEL_ID, RERANKER_DIR), use_fp16=False)
+        self.tokenizer = self.model.tokenizer
+
+    def score(self, pairs: list[list[str]]) -> list[float]:
+        scores = self.model.compute_score(pairs, batch_size=len(pairs), max_length=settings.RERANK_MAX_LENGTH)
+        # If only one pair is passed, compute_score returns a single float instead of a list.
+        return [scores] if isinstance(scores, float) else list(scores)
+
+def _onnx_session(path: str):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.ONNX_THREADS > 0:
+        options.intra_op_num_threads = settings.ONNX_THREADS
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+def _ensure_exported(model_dir: str, export_fn):
+    path = onnx_model_path(model_dir, settings.ONNX_QUANTIZE)
+    if not os.path.exists(path):
+        logger.info(f"No ONNX graph at {path}; exporting (one-off, needs the PyTorch weights)...")
+        export_fn(os.path.join(settings.ONNX_MODEL_DIR, model_dir), quantize=settings.ONNX_QUANTIZE)
+    return path
+
+class OnnxEmbeddingBackend:
+    """
+    BGE-M3 as an exported ONNX graph (dynamic INT8 by default) on ONNX Runtime.
+
+    The graph returns the normalized CLS vector and the per-token sparse weights; lexical
+    weights are then pooled exactly as FlagEmbedding does (max per token ID, special tokens dropped).
+    """
+
+    name = "onnx"
+
+    def __init__(self):
+        from transformers import AutoTokenizer
+        from services.onnx_export import export_bge_m3
+
+        path = _ensure_exported(BGE_M3_DIR, export_bge_m3)
+        self.session = _onnx_session(path)
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(path))
+        self._unused_tokens = {
+            self.tokenizer.cls_token_id, self.tokenizer.eos_token_id,
+            self.tokenizer.pad_token_id, self.tokenizer.unk_token_id
+        }
+
+    def encode(self, texts: list[str]) -> list[Embedding]:
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=settings.EMBED_MAX_LENGTH, return_tensors="np"
+        )
+        input_ids = tokens["input_ids"].astype(np.int64)
+        attention_mask = tokens["attention_mask"].astype(np.int64)
+        dense, token_weights = self.session.run(None, {"input_ids": input_ids, "attention_mask": attention_mask})
+
+        results = []
+        for row_dense, row_ids, row_weights in zip(dense, input_ids, token_weights):
+            lexical_weights: dict[int, float] = {}
+            for token_id, weight in zip(row_ids.tolist(), row_weights.tolist()):
+                if token_id in self._unused_tokens or weight <= 0:
+                    continue
+                if weight > lexical_weights.get(token_id, 0.0):
+                    lexical_weights[token_id] = weight
+            results.append((
+                row_dense.astype(np.float32, copy=False),
+                list(lexical_weights.keys()),
+                [float(v) for v in lexical_weights.values()]
+            ))
+        return results
+
+class OnnxRerankBackend:
+    """bge-reranker-base as an exported ONNX graph (dynamic INT8 by default) on ONNX Runtime."""
+
+    name = "onnx"
+
+    def __init__(self):
+        from transformers import AutoTokenizer
+        from services.onnx_export import export_reranker
+
+        path = _ensure_exported(RERANKER_DIR, export_reranker)
+        self.session = _onnx_session(path)
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(path))
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def score(self, pairs: list[list[str]]) -> list[float]:
+        tokens = self.tokenizer(
+            [q for q, _ in pairs], [d for _, d in pairs],
+            padding=True, truncation=True, max_length=settings.RERANK_MAX_LENGTH, return_tensors="np"
+        )
+        feed = {name: tokens[name].astype(np.int64) for name in self._inputs}
+        (logits,) = self.session.run(None, feed)
+        return logits.reshape(-1).astype(float).tolist()
+
+_EMBEDDING_BACKENDS = {"torch": TorchEmbeddingBackend, "onnx": OnnxEmbeddingBackend}
+_RERANK_BACKENDS = {"torch": TorchRerankBackend, "onnx": OnnxRerankBackend}
+
+def prepare_backend(name: str = None):
+    """Creates any on-disk artifacts a backend needs, so forked workers never race to export them."""
+    if (name or settings.INFERENCE_BACKEND) == "onnx":
+        from services.onnx_export import export_bge_m3, export_reranker
+        _ensure_exported(BGE_M3_DIR, export_bge_m3)
+        _ensure_exported(RERANKER_DIR, export_reranker)
+
+def load_embedding_backend(name: str = None):
+    name = name or settings.INFERENCE_BACKEND
+    if name not in _EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{name}' (expected one of {sorted(_EMBEDDING_BACKENDS)})")
+    return _EMBEDDING_BACKENDS[name]()
+
+def load_rerank_backend(name: str = None):
+    name = name or settings.INFERENCE_BACKEND
+    if name not in _RERANK_BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{name}' (expected one of {sorted(_RERANK_BACKENDS)})")
+    return _RERANK_BACKENDS[name]()
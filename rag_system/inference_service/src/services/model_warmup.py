@@ -0,0 +1,98 @@
+import time
+import logging
+import threading
+from typing import Any, Dict
+from core.config import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Close enough to interpreter start: main imports this before the routes pull in the engines
+PROCESS_STARTED_AT = time.monotonic()
+
+ready_gauge = metrics.gauge("inference_ready", "1 once both models are loaded and warmed up.")
+cold_start_gauge = metrics.gauge("inference_cold_start_seconds", "Process start until both models were ready.")
+warmup_gauge = metrics.gauge("inference_warmup_seconds", "Duration of the dummy warm-up forward passes.")
+load_gauges = {
+    name: metrics.gauge(f"inference_{name}_load_seconds", f"Time to load the {name} model.")
+    for name in ("embed", "rerank")
+}
+
+def warm_up_backends(embedder, reranker) -> float:
+    """
+    Runs one embed and one rerank pass per WARMUP_SEQ_LENGTHS entry, so the first real
+    requests don't pay for allocator growth, kernel selection or graph optimization.
+    """
+    start = time.monotonic()
+    for length in settings.WARMUP_SEQ_LENGTHS:
+        text = " ".join(["policy"] * length)  # Roughly one token per word
+        embedder.encode([text])
+        reranker.score([["warm-up query", text]])
+    return time.monotonic() - start
+
+class ModelReadiness:
+    """Loads and warms both models in a background thread; backs the /ready endpoint."""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ModelReadiness, cls).__new__(cls)
+            cls._instance.state = "pending"
+            cls._instance.error = None
+            cls._instance.timings = {}
+        return cls._instance
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self, embed_engine, rerank_engine):
+        self.state = "loading"
+        threading.Thread(
+            target=self._run, args=(embed_engine, rerank_engine), name="model-warmup", daemon=True
+        ).start()
+
+    def _run(self, embed_engine, rerank_engine):
+        try:
+            if settings.INFERENCE_WORKERS > 0:
+                # The startup hook already forked and warmed the workers on the main thread; this only
+                # attaches the engines to the running pool (forking from this thread is unsafe)
+                embed_engine.get_model()
+                rerank_engine.get_model()
+            else:
+                start = time.monotonic()
+                embedder = embed_engine.get_model()
+                self.timings["embed_load_s"] = time.monotonic() - start
+                load_gauges["embed"].set(self.timings["embed_load_s"])
+
+                start = time.monotonic()
+                reranker = rerank_engine.get_model()
+                self.timings["rerank_load_s"] = time.monotonic() - start
+                load_gauges["rerank"].set(self.timings["rerank_load_s"])
+
+                if settings.MODEL_WARMUP:
+                    self.state = "warming"
+                    self.timings["warmup_s"] = warm_up_backends(embedder, reranker)
+                    warmup_gauge.set(self.timings["warmup_s"])
+        except Exception as e:
+            self.state = "failed"
+            self.error = f"{type(e).__name__}: {e}"
+            logger.error(f"Model startup failed: {self.error}")
+            return
+
+        self.timings["cold_start_s"] = time.monotonic() - PROCESS_STARTED_AT
+        cold_start_gauge.set(self.timings["cold_start_s"])
+        ready_gauge.set(1)
+        self.state = "ready"
+        logger.info(
+            "Models ready; cold start took "
+            + ", ".join(f"{k}={v:.2f}" for k, v in self.timings.items())
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"state": self.state, "timings": dict(self.timings)}
+        if self.error:
+            status["error"] = self.error
+        return status
+
+readiness = ModelReadiness()
@@ -0,0 +1,116 @@
+"""
+Exports BGE-M3 and bge-reranker-base to ONNX, optionally with dynamic INT8 weight quantization.
+
+Usage (inside the inference container):
+    python -m services.onnx_export [--no-quantize]
+
+The serving backends call the same functions on first start if the graphs are missing.
+"""
+import os
+import argparse
+import logging
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OPSET = 17
+
+def _quantize(fp32_path: str) -> str:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = fp32_path.replace("model.onnx", "model.int8.onnx")
+    # The FP32 BGE-M3 graph (>2 GB) is written with external data; the INT8 result fits in one file
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8, use_external_data_format=False)
+    logger.info(f"Quantized {fp32_path} -> {int8_path} ({os.path.getsize(int8_path) / 1e6:.0f} MB)")
+    return int8_path
+
+def export_bge_m3(out_dir: str, quantize: bool = True) -> str:
+    import torch
+    from FlagEmbedding import BGEM3FlagModel
+    from services.model_backends import BGE_M3_DIR, model_source
+
+    flag_model = BGEM3FlagModel(model_source(settings.EMBEDDING_MODEL_ID, BGE_M3_DIR), use_fp16=False)
+    inner = flag_model.model  # BGEM3ForInference: XLM-R encoder + sparse_linear head
+
+    class BGEM3Graph(torch.nn.Module):
+        """Dense (normalized CLS) and per-token sparse weights, matching FlagEmbedding's inference path."""
+
+        def __init__(self):
+            super().__init__()
+            self.encoder = inner.model
+            self.sparse_linear = inner.sparse_linear
+
+        def forward(self, input_ids, attention_mask):
+            hidden = self.encoder(input_ids=input_ids, attention_mask=attention_mask, return_dict=True).last_hidden_state
+            dense = torch.nn.functional.normalize(hidden[:, 0], dim=-1)
+            token_weights = torch.relu(self.sparse_linear(hidden)).squeeze(-1)
+            return dense, token_weights
+
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    sample = flag_model.tokenizer(["export sample"], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            BGEM3Graph().eval(),
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["dense", "token_weights"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "dense": {0: "batch"},
+                "token_weights": {0: "batch", 1: "sequence"},
+            },
+            opset_version=OPSET,
+        )
+    flag_model.tokenizer.save_pretrained(out_dir)
+    logger.info(f"Exported BGE-M3 to {fp32_path}")
+    return _quantize(fp32_path) if quantize else fp32_path
+
+def export_reranker(out_dir: str, quantize: bool = True) -> str:
+    import torch
+    from FlagEmbedding import FlagReranker
+    from services.model_backends import RERANKER_DIR, RERANKER_MODEL_ID, model_source
+
+    reranker = FlagReranker(model_source(RERANKER_MODEL_ID, RERANKER_DIR), use_fp16=False)
+
+    class RerankerGraph(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = reranker.model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, return_dict=True).logits
+
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    sample = reranker.tokenizer([["export query", "export document"]], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            RerankerGraph().eval(),
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=OPSET,
+        )
+    reranker.tokenizer.save_pretrained(out_dir)
+    logger.info(f"Exported bge-reranker-base to {fp32_path}")
+    return _quantize(fp32_path) if quantize else fp32_path
+
+if __name__ == "__main__":
+    from services.model_backends import BGE_M3_DIR, RERANKER_DIR
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Export the inference models to ONNX.")
+    parser.add_argument("--no-quantize", action="store_true", help="Keep FP32 weights.")
+    parser.add_argument("--out", default=settings.ONNX_MODEL_DIR)
+    args = parser.parse_args()
+    export_bge_m3(os.path.join(args.out, BGE_M3_DIR), quantize=not args.no_quantize)
+    export_reranker(os.path.join(args.out, RERANKER_DIR), quantize=not args.no_quantize)
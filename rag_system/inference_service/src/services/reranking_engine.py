@@ -1,11 +1,21 @@
 import logging
-from FlagEmbedding import FlagReranker
+import threading
+import time
+from core.config import settings
+from services.model_backends import load_rerank_backend
+from services.worker_pool import worker_pool
+from utils.metrics import LATENCY_BUCKETS, metrics
 
 logger = logging.getLogger(__name__)
 
+forward_duration = metrics.histogram(
+    "inference_rerank_forward_seconds", "Duration of one cross-encoder compute_score call.", LATENCY_BUCKETS
+)
+
 class RerankingEngine:
     _instance = None
     _model = None
+    _load_lock = threading.Lock()  # Startup warm-up and an early request must not both load
 
     def __new__(cls):
         if cls._instance is None:
@@ -14,22 +24,37 @@ class RerankingEngine:
 
     def get_model(self):
         if self._model is None:
-            logger.info("Loading BGE-Reranker-Base into memory (CPU)...")
-            self._model = FlagReranker('BAAI/bge-reranker-base', use_fp16=False)
-            logger.info("BGE-Reranker loaded.")
+            with self._load_lock:
+                if self._model is not None:
+                    return self._model
+                if settings.INFERENCE_WORKERS > 0:
+                    worker_pool.start()
+                    self._model = worker_pool
+                    return self._model
+                logger.info(f"Loading BGE-Reranker-Base into memory (CPU, {settings.INFERENCE_BACKEND} backend)...")
+                self._model = load_rerank_backend()
+                logger.info("BGE-Reranker loaded.")
         return self._model
 
     def rerank(self, query: str, documents: list[str]) -> list[float]:
-        if not documents:
-            return []
+        return self.rerank_batch([(query, documents)])[0]
+
+    def rerank_batch(self, groups: list[tuple[str, list[str]]]) -> list[list[float]]:
+        """Scores several (query, documents) groups with one cross-encoder pass over all pairs."""
+        pairs = [[query, doc] for query, documents in groups for doc in documents]
+        if not pairs:
+            return [[] for _ in groups]
             
         model = self.get_model()
-        pairs = [[query, doc] for doc in documents]
         
-        scores = model.compute_score(pairs)
-        
-        # If only one document is passed, compute_score returns a single float instead of a list.
-        if isinstance(scores, float):
-            return [scores]
+        start = time.monotonic()
+        scores = model.score(pairs)
+        forward_duration.observe(time.monotonic() - start)
+
+        # Slice the flat score list back into one list per group
+        results, offset = [], 0
+        for _, documents in groups:
+            results.append(list(scores[offset:offset + len(documents)]))
+            offset += len(documents)
             
-        return scores
+        return results
@@ -0,0 +1,232 @@
+import os
+import time
+import signal
+import logging
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future
+from typing import Any, List, Optional
+from core.config import settings
+from services.model_backends import load_embedding_backend, load_rerank_backend, prepare_backend
+from services.model_warmup import warm_up_backends
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def _configure_threads(threads: int):
+    """Caps intra-op parallelism so N workers together use each core once."""
+    if settings.INFERENCE_BACKEND == "torch":
+        import torch
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # Already fixed if the parent ran inter-op work before forking
+    elif settings.ONNX_THREADS == 0:
+        settings.ONNX_THREADS = threads
+
+def _worker_main(index: int, conn, inherited: list, cores: List[int], threads: int, embedder, reranker):
+    # The parent owns shutdown: workers exit when their pipe closes, so drop forked copies of its ends
+    for parent_end in inherited:
+        parent_end.close()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if cores:
+        os.sched_setaffinity(0, cores)
+    _configure_threads(threads)
+
+    # Fork-unsafe runtimes (ONNX Runtime sessions) are built here rather than inherited
+    start = time.monotonic()
+    embedder = embedder or load_embedding_backend()
+    reranker = reranker or load_rerank_backend()
+    startup = {"load_s": time.monotonic() - start}
+    if settings.MODEL_WARMUP:
+        startup["warmup_s"] = warm_up_backends(embedder, reranker)
+    logger.info(f"Model worker {index} ready (pid={os.getpid()}, cores={cores or 'all'}, threads={threads}, {startup})")
+    conn.send((None, True, startup))  # Readiness report
+
+    while True:
+        try:
+            job_id, kind, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        try:
+            result = embedder.encode(payload) if kind == "embed" else reranker.score(payload)
+            conn.send((job_id, True, result))
+        except Exception as e:
+            conn.send((job_id, False, f"{type(e).__name__}: {e}"))
+
+class _Worker:
+    def __init__(self, index: int, process, conn, cores: List[int]):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.cores = cores
+        self.alive = True
+        self.ready = threading.Event()
+        self.startup: dict[str, float] = {}
+        self.inflight_items = 0
+        self.pending: dict[int, tuple[Future, int]] = {}
+        self.send_lock = threading.Lock()
+        self.load = metrics.gauge(
+            f"inference_worker{index}_inflight_items", f"Texts or pairs queued on model worker {index}."
+        )
+        self.jobs = metrics.counter(f"inference_worker{index}_jobs_total", f"Forward passes run by model worker {index}.")
+
+class ModelWorkerPool:
+    """
+    Runs the embedding and rerank models in N forked worker processes.
+
+    For the torch backend the weights are loaded once in the parent before forking, so every
+    worker shares them copy-on-write. Each worker is pinned to its own slice of cores with a
+    matching intra-op thread count, and each job goes to the worker with the fewest queued items.
+    Exposes the same `encode` / `score` interface as a single backend.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ModelWorkerPool, cls).__new__(cls)
+            cls._instance._workers = []
+            cls._instance._lock = threading.Lock()
+            cls._instance._job_ids = itertools.count()
+        return cls._instance
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, num_workers: Optional[int] = None):
+        num_workers = num_workers or settings.INFERENCE_WORKERS
+        with self._lock:
+            if self._workers:
+                return
+            cores = sorted(os.sched_getaffinity(0))
+            threads = settings.INFERENCE_WORKER_THREADS or max(1, len(cores) // num_workers)
+
+            prepare_backend()
+            embedder = reranker = None
+            if settings.INFERENCE_BACKEND == "torch":
+                logger.info("Loading models once in the parent; workers will share the weights copy-on-write...")
+                embedder, reranker = load_embedding_backend(), load_rerank_backend()
+
+            ctx = multiprocessing.get_context("fork")
+            for index in range(num_workers):
+                worker_cores = []
+                if settings.INFERENCE_PIN_CORES and len(cores) >= num_workers * threads:
+                    worker_cores = cores[index * threads:(index + 1) * threads]
+                parent_conn, child_conn = ctx.Pipe()
+                process = ctx.Process(
+                    target=_worker_main,
+                    args=(index, child_conn, [parent_conn] + [w.conn for w in self._workers], worker_cores, threads, embedder, reranker),
+                    name=f"model-worker-{index}",
+                    daemon=True,
+                )
+                process.start()
+                child_conn.close()
+                self._workers.append(_Worker(index, process, parent_conn, worker_cores))
+
+            # Reader threads only after the last fork, so no child inherits a multithreaded parent
+            for worker in self._workers:
+                threading.Thread(
+                    target=self._read_results, args=(worker,), name=f"model-worker-{worker.index}-reader", daemon=True
+                ).start()
+            for worker in self._workers:
+                worker.ready.wait()
+            if not any(w.alive for w in self._workers):
+                raise RuntimeError("All model workers exited during startup")
+            logger.info(f"Started {num_workers} model workers ({threads} threads each, pinned={any(w.cores for w in self._workers)})")
+
+    def _pick_worker(self, cost: int) -> _Worker:
+        with self._lock:
+            candidates = [w for w in self._workers if w.alive]
+            if not candidates:
+                raise RuntimeError("No live model workers")
+            worker = min(candidates, key=lambda w: w.inflight_items)
+            worker.inflight_items += cost
+            worker.load.inc(cost)
+            return worker
+
+    def submit(self, kind: str, payload: list) -> Future:
+        """Sends one forward pass to the least-loaded worker."""
+        if not self._workers:
+            self.start()
+        cost = max(1, len(payload))
+        worker = self._pick_worker(cost)
+        future: Future = Future()
+        job_id = next(self._job_ids)
+        with self._lock:
+            worker.pending[job_id] = (future, cost)
+        try:
+            with worker.send_lock:
+                worker.conn.send((job_id, kind, payload))
+        except (BrokenPipeError, OSError) as e:
+            self._finish(worker, job_id)
+            future.set_exception(RuntimeError(f"Model worker {worker.index} unavailable: {e}"))
+        return future
+
+    def encode(self, texts: List[str]) -> list:
+        return self.submit("embed", texts).result()
+
+    def score(self, pairs: List[List[str]]) -> List[float]:
+        return self.submit("rerank", pairs).result()
+
+    def _finish(self, worker: _Worker, job_id: int) -> Optional[Future]:
+        with self._lock:
+            entry = worker.pending.pop(job_id, None)
+            if entry is None:
+                return None
+            future, cost = entry
+            worker.inflight_items -= cost
+            worker.load.dec(cost)
+            return future
+
+    def _read_results(self, worker: _Worker):
+        while True:
+            try:
+                job_id, ok, result = worker.conn.recv()
+            except (EOFError, OSError):
+                break
+            if job_id is None:
+                worker.startup = result
+                worker.ready.set()
+                continue
+            future = self._finish(worker, job_id)
+            if future is None:
+                continue
+            worker.jobs.inc()
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+        # The worker died or the pool is shutting down: fail whatever it still owed
+        worker.alive = False
+        worker.ready.set()
+        if self._workers:
+            worker.process.join(timeout=1)
+            logger.error(f"Model worker {worker.index} (pid={worker.process.pid}) exited with code {worker.process.exitcode}")
+        for job_id in list(worker.pending):
+            future = self._finish(worker, job_id)
+            if future is not None:
+                future.set_exception(RuntimeError(f"Model worker {worker.index} exited"))
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [
+            {"worker": w.index, "pid": w.process.pid, "alive": w.alive, "cores": w.cores,
+             "inflight_items": w.inflight_items, "jobs": int(w.jobs.value), "startup": w.startup}
+            for w in self._workers
+        ]
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.conn.close()
+        for worker in workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+worker_pool = ModelWorkerPool()
@@ -0,0 +1,39 @@
+import struct
+from itertools import chain
+from typing import Sequence, Tuple
+import numpy as np
+
+# Compact binary wire format for embeddings, negotiated via the Accept header.
+#
+# Layout (all little-endian):
+#   header   : magic b"BGEV", u8 version, 3 pad bytes, u32 count, u32 dim   (16 bytes)
+#   dense    : f32[count * dim]   row-major, one row per input text
+#   nnz      : u32[count]         number of sparse entries per input text
+#   indices  : u32[sum(nnz)]      sparse token ids, concatenated
+#   values   : f32[sum(nnz)]      sparse weights, concatenated
+MEDIA_TYPE = "application/x-bge-vectors"
+MAGIC = b"BGEV"
+VERSION = 1
+HEADER = struct.Struct("<4sB3xII")
+
+def accepts_binary(accept_header: str) -> bool:
+    return MEDIA_TYPE in (accept_header or "")
+
+def encode_embeddings(embeddings: Sequence[Tuple[np.ndarray, Sequence[int], Sequence[float]]]) -> bytes:
+    count = len(embeddings)
+    if count == 0:
+        return HEADER.pack(MAGIC, VERSION, 0, 0)
+
+    dense = np.ascontiguousarray(np.stack([e[0] for e in embeddings]), dtype="<f4")
+    nnz = np.array([len(e[1]) for e in embeddings], dtype="<u4")
+    total = int(nnz.sum())
+    indices = np.fromiter(chain.from_iterable(e[1] for e in embeddings), dtype="<u4", count=total)
+    values = np.fromiter(chain.from_iterable(e[2] for e in embeddings), dtype="<f4", count=total)
+
+    return b"".join((
+        HEADER.pack(MAGIC, VERSION, count, dense.shape[1]),
+        dense.tobytes(),
+        nnz.tobytes(),
+        indices.tobytes(),
+        values.tobytes(),
+    ))